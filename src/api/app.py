@@ -3,7 +3,7 @@ import time
 from pathlib import Path
 from flask import Flask, render_template, request, jsonify, send_from_directory, session
 
-from src.utils import config, logger, hardware_info
+from src.utils import config, logger, hardware_info, process_pool
 from src.services import ModelServiceFactory, model_manager, auth_service
 from src.modules.knowledge_base import KnowledgeBase
 from src.modules.code_completion import CodeCompletion
@@ -19,6 +19,9 @@ app = Flask(
     static_folder=Path(__file__).parent.parent / "static"
 )
 
+# 代码分析在请求处理线程中执行，服务进程内不创建分析工作进程
+process_pool.set_enabled(False)
+
 # 初始化服务和模块
 model_service = ModelServiceFactory.create_service()
 knowledge_base = KnowledgeBase(embedding_model=config.get("models.embedding.name", "bge-m3"))
@@ -2,19 +2,77 @@
 仓库权限管理相关的API路由
 """
 
+import hashlib
 import logging
-from flask import Blueprint, request, jsonify, session
+from typing import Any, Dict, Tuple
+
+from flask import Blueprint, Response, request, jsonify, session, stream_with_context
 from flask_login import login_required, current_user
+from werkzeug.local import LocalProxy
 
 from src.services.repo_permission_service import get_instance as get_repo_permission_service
 from src.services.user_service import get_instance as get_user_service
+from src.utils import json_utils
 
 logger = logging.getLogger(__name__)
 repo_permission_bp = Blueprint('repo_permission', __name__)
 
-# 获取服务实例
-repo_permission_service = get_repo_permission_service()
-user_service = get_user_service()
+# 服务实例在首次使用时才创建，避免导入蓝图时初始化数据库
+repo_permission_service = LocalProxy(get_repo_permission_service)
+user_service = LocalProxy(get_user_service)
+
+
+# 接口访问所需的角色集合
+_ADMIN_ONLY = frozenset({"admin"})
+_READ_ACCESS = frozenset({"admin", "developer", "reader"})
+
+
+def _static_json(payload: Dict[str, Any], status: int) -> Tuple[bytes, int]:
+    """在模块加载时预先序列化固定内容的响应体"""
+    return json_utils.dumps(payload), status
+
+
+def _cached_response(cached: Tuple[bytes, int]) -> Response:
+    """由预序列化的响应体构造响应，避免每次请求重新构建和序列化字典"""
+    body, status = cached
+    return Response(body, status=status, mimetype='application/json')
+
+
+def _make_etag(*parts: Any) -> str:
+    """根据给定字段生成 ETag"""
+    key = ":".join(str(part) for part in parts)
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _not_modified(etag: str) -> Response:
+    """构造 304 Not Modified 响应"""
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+# 固定内容的错误响应（包含动态信息的错误仍走 jsonify）
+_RESP_FORBIDDEN_LIST_USERS = _static_json({'success': False, 'message': '没有权限查看仓库用户权限列表'}, 403)
+_RESP_FORBIDDEN_LIST_TEAMS = _static_json({'success': False, 'message': '没有权限查看仓库团队权限列表'}, 403)
+_RESP_FORBIDDEN_ASSIGN_USER = _static_json({'success': False, 'message': '没有权限修改用户角色'}, 403)
+_RESP_FORBIDDEN_REMOVE_USER = _static_json({'success': False, 'message': '没有权限移除用户角色'}, 403)
+_RESP_FORBIDDEN_ASSIGN_TEAM = _static_json({'success': False, 'message': '没有权限修改团队角色'}, 403)
+_RESP_FORBIDDEN_REMOVE_TEAM = _static_json({'success': False, 'message': '没有权限移除团队角色'}, 403)
+_RESP_FORBIDDEN_CUSTOM = _static_json({'success': False, 'message': '没有权限设置自定义权限'}, 403)
+_RESP_FORBIDDEN_VIEW_RULES = _static_json({'success': False, 'message': '没有权限查看仓库保护规则'}, 403)
+_RESP_FORBIDDEN_MODIFY_RULES = _static_json({'success': False, 'message': '没有权限修改保护规则'}, 403)
+_RESP_FORBIDDEN_AUDIT_LOGS = _static_json({'success': False, 'message': '没有权限查看审计日志'}, 403)
+_RESP_MISSING_ROLE = _static_json({'success': False, 'message': '缺少角色信息'}, 400)
+_RESP_MISSING_PARAMS = _static_json({'success': False, 'message': '缺少必要参数'}, 400)
+_RESP_MISSING_ASSIGNMENTS = _static_json({'success': False, 'message': '缺少角色分配列表'}, 400)
+_RESP_INVALID_ASSIGNMENTS = _static_json({'success': False, 'message': '角色分配列表的每一项必须是对象'}, 400)
+_RESP_MISSING_RULE_TYPE = _static_json({'success': False, 'message': '缺少规则类型'}, 400)
+_RESP_INVALID_PAGINATION = _static_json({'success': False, 'message': '无效的分页参数'}, 400)
+
+# 审计日志分页参数
+AUDIT_LOG_DEFAULT_LIMIT = 100
+AUDIT_LOG_MAX_LIMIT = 1000
+
 
 @repo_permission_bp.route('/repositories/<repo_id>/permissions/users', methods=['GET'])
 @login_required
@@ -24,11 +82,8 @@ def list_user_permissions(repo_id):
     """
     # 检查当前用户是否有权限查看
     user_role = repo_permission_service.get_user_role(repo_id, current_user.id)
-    if user_role not in ["admin"]:
-        return jsonify({
-            'success': False,
-            'message': '没有权限查看仓库用户权限列表'
-        }), 403
+    if user_role not in _ADMIN_ONLY:
+        return _cached_response(_RESP_FORBIDDEN_LIST_USERS)
     
     permissions = repo_permission_service.list_user_permissions(repo_id)
     
@@ -45,11 +100,8 @@ def list_team_permissions(repo_id):
     """
     # 检查当前用户是否有权限查看
     user_role = repo_permission_service.get_user_role(repo_id, current_user.id)
-    if user_role not in ["admin"]:
-        return jsonify({
-            'success': False,
-            'message': '没有权限查看仓库团队权限列表'
-        }), 403
+    if user_role not in _ADMIN_ONLY:
+        return _cached_response(_RESP_FORBIDDEN_LIST_TEAMS)
     
     permissions = repo_permission_service.list_team_permissions(repo_id)
     
@@ -66,37 +118,29 @@ def assign_user_role(repo_id, user_id):
     """
     # 检查当前用户是否有权限修改
     current_role = repo_permission_service.get_user_role(repo_id, current_user.id)
-    if current_role != "admin":
-        return jsonify({
-            'success': False,
-            'message': '没有权限修改用户角色'
-        }), 403
+    if current_role not in _ADMIN_ONLY:
+        return _cached_response(_RESP_FORBIDDEN_ASSIGN_USER)
     
     data = request.json
     if not data or 'role' not in data:
-        return jsonify({
-            'success': False,
-            'message': '缺少角色信息'
-        }), 400
+        return _cached_response(_RESP_MISSING_ROLE)
     
     role = data['role']
-    if role not in repo_permission_service.ROLES:
+    if role not in repo_permission_service.ROLES_SET:
         return jsonify({
             'success': False,
             'message': f'无效的角色: {role}'
         }), 400
     
-    # 检查目标用户是否存在
-    target_user = user_service.get_user_by_id(user_id)
-    if not target_user:
+    # 分配角色（同时校验目标用户是否存在）
+    success, username = repo_permission_service.assign_role_with_username(repo_id, user_id, role)
+    
+    if username is None:
         return jsonify({
             'success': False,
             'message': f'用户ID {user_id} 不存在'
         }), 404
     
-    # 分配角色
-    success = repo_permission_service.assign_role(repo_id, user_id, role)
-    
     if not success:
         return jsonify({
             'success': False,
@@ -105,9 +149,64 @@ def assign_user_role(repo_id, user_id):
     
     return jsonify({
         'success': True,
-        'message': f'已将用户 {target_user.username} 的角色设置为 {role}'
+        'message': f'已将用户 {username} 的角色设置为 {role}'
     })
 
+@repo_permission_bp.route('/repositories/<repo_id>/permissions/users/bulk', methods=['POST'])
+@login_required
+def bulk_assign_user_roles(repo_id):
+    """
+    批量分配用户在仓库中的角色
+    
+    请求在后台执行，立即返回 202 和任务ID，可通过任务接口查询结果
+    """
+    # 检查当前用户是否有权限修改
+    current_role = repo_permission_service.get_user_role(repo_id, current_user.id)
+    if current_role not in _ADMIN_ONLY:
+        return _cached_response(_RESP_FORBIDDEN_ASSIGN_USER)
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('assignments'), list):
+        return _cached_response(_RESP_MISSING_ASSIGNMENTS)
+    
+    assignments = data['assignments']
+    if not all(isinstance(item, dict) for item in assignments):
+        return _cached_response(_RESP_INVALID_ASSIGNMENTS)
+    
+    task_id = repo_permission_service.submit_bulk_assign_roles(repo_id, assignments)
+    
+    return jsonify({
+        'success': True,
+        'task_id': task_id
+    }), 202
+
+@repo_permission_bp.route('/repositories/<repo_id>/permissions/tasks/<task_id>', methods=['GET'])
+@login_required
+def get_permission_task(repo_id, task_id):
+    """
+    查询后台权限任务的状态
+    """
+    current_role = repo_permission_service.get_user_role(repo_id, current_user.id)
+    if current_role not in _ADMIN_ONLY:
+        return _cached_response(_RESP_FORBIDDEN_ASSIGN_USER)
+    
+    task = repo_permission_service.get_task_status(task_id)
+    if task is None:
+        return jsonify({
+            'success': False,
+            'message': f'任务 {task_id} 不存在'
+        }), 404
+    
+    payload = {
+        'success': True,
+        'task_id': task_id,
+        'status': task['status'],
+        'result': task['result']
+    }
+    if 'error' in task:
+        payload['error'] = task['error']
+    return jsonify(payload)
+
 @repo_permission_bp.route('/repositories/<repo_id>/permissions/users/<int:user_id>', methods=['DELETE'])
 @login_required
 def remove_user_role(repo_id, user_id):
@@ -116,11 +215,8 @@ def remove_user_role(repo_id, user_id):
     """
     # 检查当前用户是否有权限修改
     current_role = repo_permission_service.get_user_role(repo_id, current_user.id)
-    if current_role != "admin":
-        return jsonify({
-            'success': False,
-            'message': '没有权限移除用户角色'
-        }), 403
+    if current_role not in _ADMIN_ONLY:
+        return _cached_response(_RESP_FORBIDDEN_REMOVE_USER)
     
     # 检查目标用户是否存在
     target_user = user_service.get_user_by_id(user_id)
@@ -152,21 +248,15 @@ def assign_team_role(repo_id, team_id):
     """
     # 检查当前用户是否有权限修改
     current_role = repo_permission_service.get_user_role(repo_id, current_user.id)
-    if current_role != "admin":
-        return jsonify({
-            'success': False,
-            'message': '没有权限修改团队角色'
-        }), 403
+    if current_role not in _ADMIN_ONLY:
+        return _cached_response(_RESP_FORBIDDEN_ASSIGN_TEAM)
     
     data = request.json
     if not data or 'role' not in data:
-        return jsonify({
-            'success': False,
-            'message': '缺少角色信息'
-        }), 400
+        return _cached_response(_RESP_MISSING_ROLE)
     
     role = data['role']
-    if role not in repo_permission_service.ROLES:
+    if role not in repo_permission_service.ROLES_SET:
         return jsonify({
             'success': False,
             'message': f'无效的角色: {role}'
@@ -194,11 +284,8 @@ def remove_team_role(repo_id, team_id):
     """
     # 检查当前用户是否有权限修改
     current_role = repo_permission_service.get_user_role(repo_id, current_user.id)
-    if current_role != "admin":
-        return jsonify({
-            'success': False,
-            'message': '没有权限移除团队角色'
-        }), 403
+    if current_role not in _ADMIN_ONLY:
+        return _cached_response(_RESP_FORBIDDEN_REMOVE_TEAM)
     
     # 移除角色
     success = repo_permission_service.remove_team_role(repo_id, team_id)
@@ -222,24 +309,18 @@ def set_custom_permission(repo_id):
     """
     # 检查当前用户是否有权限修改
     current_role = repo_permission_service.get_user_role(repo_id, current_user.id)
-    if current_role != "admin":
-        return jsonify({
-            'success': False,
-            'message': '没有权限设置自定义权限'
-        }), 403
+    if current_role not in _ADMIN_ONLY:
+        return _cached_response(_RESP_FORBIDDEN_CUSTOM)
     
     data = request.json
     if not data or 'user_id' not in data or 'operation' not in data or 'granted' not in data:
-        return jsonify({
-            'success': False,
-            'message': '缺少必要参数'
-        }), 400
+        return _cached_response(_RESP_MISSING_PARAMS)
     
     user_id = data['user_id']
     operation = data['operation']
     granted = data['granted']
     
-    if operation not in repo_permission_service.OPERATIONS:
+    if operation not in repo_permission_service.OPERATIONS_SET:
         return jsonify({
             'success': False,
             'message': f'无效的操作类型: {operation}'
@@ -267,18 +348,24 @@ def get_protection_rules(repo_id):
     """
     # 任何有权访问仓库的用户都可以查看保护规则
     user_role = repo_permission_service.get_user_role(repo_id, current_user.id)
-    if user_role not in ["admin", "developer", "reader"]:
-        return jsonify({
-            'success': False,
-            'message': '没有权限查看仓库保护规则'
-        }), 403
+    if user_role not in _READ_ACCESS:
+        return _cached_response(_RESP_FORBIDDEN_VIEW_RULES)
+    
+    # 规则未变化时直接返回 304，跳过查询和序列化
+    version = repo_permission_service.get_protection_rules_mtime(repo_id)
+    etag = _make_etag(repo_id, version) if version is not None else None
+    if etag and etag in request.if_none_match:
+        return _not_modified(etag)
     
     rules = repo_permission_service.get_protection_rules(repo_id)
     
-    return jsonify({
+    response = jsonify({
         'success': True,
         'rules': rules
     })
+    if etag:
+        response.set_etag(etag)
+    return response
 
 @repo_permission_bp.route('/repositories/<repo_id>/protection_rules', methods=['PUT'])
 @login_required
@@ -288,25 +375,19 @@ def set_protection_rule(repo_id):
     """
     # 检查当前用户是否有权限修改
     current_role = repo_permission_service.get_user_role(repo_id, current_user.id)
-    if current_role != "admin":
-        return jsonify({
-            'success': False,
-            'message': '没有权限修改保护规则'
-        }), 403
+    if current_role not in _ADMIN_ONLY:
+        return _cached_response(_RESP_FORBIDDEN_MODIFY_RULES)
     
     data = request.json
     if not data or 'rule_type' not in data:
-        return jsonify({
-            'success': False,
-            'message': '缺少规则类型'
-        }), 400
+        return _cached_response(_RESP_MISSING_RULE_TYPE)
     
     rule_type = data['rule_type']
     enabled = data.get('enabled')
     target = data.get('target')
     config = data.get('config')
     
-    if rule_type not in repo_permission_service.RULE_TYPES:
+    if rule_type not in repo_permission_service.RULE_TYPES_SET:
         return jsonify({
             'success': False,
             'message': f'无效的规则类型: {rule_type}'
@@ -332,24 +413,38 @@ def set_protection_rule(repo_id):
 def get_audit_logs(repo_id):
     """
     获取仓库的审计日志
+    
+    查询参数:
+        limit: 返回记录数，取值范围 [1, AUDIT_LOG_MAX_LIMIT]，超出部分被截断，默认100
+        offset: 记录偏移量，最小为0，默认0
     """
     # 检查当前用户是否有权限查看
     user_role = repo_permission_service.get_user_role(repo_id, current_user.id)
-    if user_role not in ["admin"]:
-        return jsonify({
-            'success': False,
-            'message': '没有权限查看审计日志'
-        }), 403
-    
-    limit = int(request.args.get('limit', 100))
-    offset = int(request.args.get('offset', 0))
-    
-    logs = repo_permission_service.get_audit_logs(repo_id, limit, offset)
-    
-    return jsonify({
-        'success': True,
-        'logs': logs
-    })
+    if user_role not in _ADMIN_ONLY:
+        return _cached_response(_RESP_FORBIDDEN_AUDIT_LOGS)
+    
+    try:
+        limit = int(request.args.get('limit', AUDIT_LOG_DEFAULT_LIMIT))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return _cached_response(_RESP_INVALID_PAGINATION)
+    
+    # 限制单页大小，避免超大查询和序列化开销
+    limit = min(max(limit, 1), AUDIT_LOG_MAX_LIMIT)
+    offset = max(offset, 0)
+    
+    logs = repo_permission_service.iter_audit_logs(repo_id, limit, offset)
+    
+    def generate():
+        # 逐条序列化输出，避免在内存中缓冲整个结果
+        yield b'{"success":true,"logs":['
+        for index, log in enumerate(logs):
+            if index:
+                yield b','
+            yield json_utils.dumps(log)
+        yield b']}'
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 @repo_permission_bp.route('/repositories/<repo_id>/user_role', methods=['GET'])
 @login_required
@@ -357,10 +452,19 @@ def get_current_user_role(repo_id):
     """
     获取当前用户在仓库中的角色
     """
-    role = repo_permission_service.get_user_role(repo_id, current_user.id)
+    role, permissions = repo_permission_service.get_user_role_with_permissions(
+        repo_id, current_user.id)
     
-    return jsonify({
+    # 权限列表由角色决定，角色未变化时直接返回 304
+    etag = _make_etag(repo_id, current_user.id, role)
+    if etag in request.if_none_match:
+        return _not_modified(etag)
+    
+    # 高频接口：直接以序列化后的字节构造响应，绕过 jsonify
+    response = Response(json_utils.dumps({
         'success': True,
         'role': role,
-        'permissions': repo_permission_service.ROLES.get(role, {}).get('permissions', [])
-    }) 
\ No newline at end of file
+        'permissions': permissions
+    }), status=200, mimetype='application/json')
+    response.set_etag(etag)
+    return response 
\ No newline at end of file
@@ -13,6 +13,12 @@ import argparse
 import logging
 from pathlib import Path
 
+try:
+    import argcomplete
+    ARGCOMPLETE_AVAILABLE = True
+except ImportError:
+    ARGCOMPLETE_AVAILABLE = False
+
 # 设置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -55,13 +61,11 @@ def run_command(args):
         logger.error(f"导入命令模块失败: {module_path}")
         return 1
     except Exception as e:
-        logger.error(f"运行命令时发生错误: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error(f"运行命令时发生错误: {str(e)}", exc_info=True)
         return 1
 
-def main():
-    """主函数"""
+def _build_parser():
+    """构建命令行参数解析器"""
     parser = argparse.ArgumentParser(description="AIgo命令行工具")
     subparsers = parser.add_subparsers(dest="command", help="子命令")
     
@@ -69,9 +73,20 @@ def main():
     for name, info in AVAILABLE_COMMANDS.items():
         subparsers.add_parser(name, help=info["description"])
     
+    return parser
+
+# 解析器在模块加载时构建一次
+_PARSER = _build_parser()
+
+def main():
+    """主函数"""
+    # 可选的命令行补全支持
+    if ARGCOMPLETE_AVAILABLE:
+        argcomplete.autocomplete(_PARSER)
+    
     # 解析命令行参数
     if len(sys.argv) > 1:
-        args = parser.parse_args([sys.argv[1]])
+        args = _PARSER.parse_args([sys.argv[1]])
         remaining_args = sys.argv[2:]
         
         # 运行命令
@@ -81,7 +96,7 @@ def main():
             return run_command(args)
     
     # 如果没有提供命令或命令无效，显示帮助信息
-    parser.print_help()
+    _PARSER.print_help()
     return 1
 
 if __name__ == "__main__":
@@ -14,6 +14,12 @@ import logging
 import argparse
 from pathlib import Path
 
+try:
+    import argcomplete
+    ARGCOMPLETE_AVAILABLE = True
+except ImportError:
+    ARGCOMPLETE_AVAILABLE = False
+
 # 设置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -46,8 +52,10 @@ AVAILABLE_FEATURES = {
 def list_features(args):
     """列出所有可用特性"""
     logger.info("可用特性列表:")
+    # 只读取一次配置文件
+    config = _load_config()
     for name, info in AVAILABLE_FEATURES.items():
-        status = "启用" if is_feature_enabled(name) else "禁用"
+        status = "启用" if is_feature_enabled(name, config) else "禁用"
         logger.info(f"  - {name}: {info['description']} [{status}]")
     return 0
 
@@ -127,24 +135,34 @@ def disable_feature(args):
         logger.error(f"配置文件不存在: {config_path}")
         return 1
 
-def is_feature_enabled(feature_name):
-    """检查特性是否启用"""
+def _load_config():
+    """读取特性配置文件，文件不存在或解析失败时返回空字典"""
+    config_path = Path("config/default/config.json")
+    if not config_path.exists():
+        return {}
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def is_feature_enabled(feature_name, config=None):
+    """
+    检查特性是否启用
+    
+    Args:
+        feature_name: 特性名称
+        config: 已加载的配置字典，为None时从配置文件读取
+    """
     # 获取默认值
     default_enabled = AVAILABLE_FEATURES.get(feature_name, {}).get("enabled_by_default", False)
     
-    # 检查配置
-    config_path = Path("config/default/config.json")
-    if config_path.exists():
-        try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-            
-            # 检查特性配置
-            return config.get("features", {}).get(feature_name, default_enabled)
-        except Exception:
-            return default_enabled
-    else:
-        return default_enabled
+    if config is None:
+        config = _load_config()
+    
+    # 检查特性配置
+    features = config.get("features", {}) if isinstance(config, dict) else {}
+    return features.get(feature_name, default_enabled)
 
 def run_feature_command(args):
     """运行特性命令"""
@@ -173,13 +191,11 @@ def run_feature_command(args):
         logger.error(f"导入命令模块失败: {module_path}")
         return 1
     except Exception as e:
-        logger.error(f"运行命令时发生错误: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error(f"运行命令时发生错误: {str(e)}", exc_info=True)
         return 1
 
-def main():
-    """主函数"""
+def _build_parser():
+    """构建命令行参数解析器"""
     parser = argparse.ArgumentParser(description="特性命令行工具")
     subparsers = parser.add_subparsers(dest="command", help="子命令")
     
@@ -199,7 +215,18 @@ def main():
     run_parser.add_argument("feature", choices=AVAILABLE_FEATURES.keys(), help="要运行的特性名称")
     run_parser.add_argument("args", nargs=argparse.REMAINDER, help="传递给特性命令的参数")
     
-    args = parser.parse_args()
+    return parser
+
+# 解析器在模块加载时构建一次
+_PARSER = _build_parser()
+
+def main():
+    """主函数"""
+    # 可选的命令行补全支持
+    if ARGCOMPLETE_AVAILABLE:
+        argcomplete.autocomplete(_PARSER)
+    
+    args = _PARSER.parse_args()
     
     if args.command == "list":
         return list_features(args)
@@ -210,7 +237,7 @@ def main():
     elif args.command == "run":
         return run_feature_command(args)
     else:
-        parser.print_help()
+        _PARSER.print_help()
         return 1
 
 if __name__ == "__main__":
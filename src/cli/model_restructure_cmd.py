@@ -9,11 +9,8 @@
 
 import os
 import sys
-import json
-import time
 import logging
 import argparse
-from pathlib import Path
 
 # 设置日志
 logging.basicConfig(
@@ -24,6 +21,9 @@ logger = logging.getLogger("model_restructure_cmd")
 
 def analyze_model(args):
     """分析模型结构"""
+    # 仅在实际执行命令时导入，避免 --help 等场景的导入开销
+    import time
+    
     try:
         from src.modules.model_restructuring.model_restructurer import ModelRestructurer
         
@@ -53,6 +53,8 @@ def analyze_model(args):
         
         # 保存分析结果
         if args.output:
+            import json
+            
             output_path = args.output
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             with open(output_path, 'w', encoding='utf-8') as f:
@@ -64,13 +66,13 @@ def analyze_model(args):
         logger.error("导入模型重构模块失败，请先运行 test_model_restructurer.py 创建模块")
         return 1
     except Exception as e:
-        logger.error(f"分析模型时发生错误: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error(f"分析模型时发生错误: {str(e)}", exc_info=True)
         return 1
 
 def optimize_model(args):
     """优化模型结构"""
+    import time
+    
     try:
         from src.modules.model_restructuring.model_restructurer import ModelRestructurer
         
@@ -105,9 +107,7 @@ def optimize_model(args):
         logger.error("导入模型重构模块失败，请先运行 test_model_restructurer.py 创建模块")
         return 1
     except Exception as e:
-        logger.error(f"优化模型时发生错误: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error(f"优化模型时发生错误: {str(e)}", exc_info=True)
         return 1
 
 def main():
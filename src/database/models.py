@@ -1,16 +1,105 @@
+from dataclasses import dataclass
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, create_engine, Table
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, create_engine, Table, Index, event, TypeDecorator, insert, select, func, and_
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.orm import relationship, sessionmaker, column_property
 from pathlib import Path
-from typing import List, Dict, Any
-import json
+from typing import List, Dict, Any, Tuple, Optional
 
-from src.utils import config
+from src.utils import config, json_utils
 
 # 创建基础模型
 Base = declarative_base()
 
+# 时间函数预先绑定为模块级名称，列默认值和 to_dict 中直接调用
+_utcnow = datetime.utcnow
+_iso = datetime.isoformat
+
+class JSONType(TypeDecorator):
+    """
+    以JSON字符串存储的列类型
+    
+    值在加载行时解析一次，之后的属性访问直接返回解析结果。
+    修改时需要赋值新对象，原地修改不会被检测到。
+    """
+    
+    impl = Text
+    cache_ok = True
+    
+    def __init__(self, empty_factory=dict, *args, **kwargs):
+        """
+        Args:
+            empty_factory: 列为空或内容无法解析时返回值的构造函数
+        """
+        super().__init__(*args, **kwargs)
+        self.empty_factory = empty_factory
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return json_utils.dumps(value).decode("utf-8")
+    
+    def process_result_value(self, value, dialect):
+        if not value:
+            return self.empty_factory()
+        try:
+            return json_utils.loads(value)
+        except (ValueError, TypeError):
+            return self.empty_factory()
+
+class ProjectionMixin:
+    """
+    列表查询的轻量投影
+    
+    仅查询 LIST_COLUMNS 中的列并返回 RowMapping，跳过ORM对象构造和属性追踪。
+    """
+    
+    # 列表接口需要的列名
+    LIST_COLUMNS: Tuple[str, ...] = ()
+    
+    @classmethod
+    def list_columns(cls) -> List[Any]:
+        """获取投影列"""
+        return [getattr(cls, name) for name in cls.LIST_COLUMNS]
+    
+    @classmethod
+    def list_rows(cls, session, **filters) -> List[Any]:
+        """
+        按等值条件查询投影行
+        
+        Args:
+            session: 数据库会话
+            **filters: 列名到取值的等值过滤条件
+            
+        Returns:
+            List[RowMapping]: 类字典的结果行
+        """
+        stmt = select(*cls.list_columns()).filter_by(**filters)
+        return session.execute(stmt).mappings().all()
+
+class StreamingMixin:
+    """为可能无限增长的表提供分批流式读取"""
+    
+    @classmethod
+    def stream(cls, session, batch: int = 1000, **filters):
+        """
+        分批迭代表中的记录
+        
+        使用 yield_per 和 stream_results，每次只从数据库取出 batch 行，内存占用与表大小无关。
+        
+        Args:
+            session: 数据库会话
+            batch: 每批读取的行数
+            **filters: 列名到取值的等值过滤条件
+            
+        Returns:
+            ScalarResult: 可迭代的ORM对象结果
+        """
+        stmt = select(cls).filter_by(**filters).execution_options(
+            yield_per=batch, stream_results=True)
+        return session.execute(stmt).scalars()
+
 # 用户团队关联表（多对多）
 user_team_association = Table(
     'user_team_association',
@@ -30,18 +119,18 @@ class User(Base):
     password_hash = Column(String(256), nullable=False)
     full_name = Column(String(100))
     avatar_url = Column(String(256))
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=_utcnow)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
     last_login = Column(DateTime)
     
     # 关系
-    teams = relationship("Team", secondary=user_team_association, back_populates="members")
-    permissions = relationship("UserPermission", back_populates="user")
-    owned_repositories = relationship("Repository", back_populates="owner")
-    api_keys = relationship("ApiKey", back_populates="user")
-    audit_logs = relationship("AuditLog", back_populates="user")
+    teams = relationship("Team", secondary=user_team_association, back_populates="members", lazy="select")
+    permissions = relationship("UserPermission", back_populates="user", lazy="select")
+    owned_repositories = relationship("Repository", back_populates="owner", lazy="select")
+    api_keys = relationship("ApiKey", back_populates="user", lazy="select")
+    audit_logs = relationship("AuditLog", back_populates="user", lazy="select")
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典表示"""
@@ -52,8 +141,8 @@ class User(Base):
             "full_name": self.full_name,
             "avatar_url": self.avatar_url,
             "is_admin": self.is_admin,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "last_login": self.last_login.isoformat() if self.last_login else None
+            "created_at": _iso(self.created_at) if self.created_at else None,
+            "last_login": _iso(self.last_login) if self.last_login else None
         }
         
     def __repr__(self) -> str:
@@ -66,12 +155,12 @@ class Team(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String(50), unique=True, nullable=False)
     description = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=_utcnow)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
     
     # 关系
-    members = relationship("User", secondary=user_team_association, back_populates="teams")
-    permissions = relationship("TeamPermission", back_populates="team")
+    members = relationship("User", secondary=user_team_association, back_populates="teams", lazy="select")
+    permissions = relationship("TeamPermission", back_populates="team", lazy="select")
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典表示"""
@@ -79,13 +168,22 @@ class Team(Base):
             "id": self.id,
             "name": self.name,
             "description": self.description,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "member_count": len(self.members)
+            "created_at": _iso(self.created_at) if self.created_at else None,
+            "member_count": self.member_count
         }
     
     def __repr__(self) -> str:
         return f"<Team {self.name}>"
 
+# 团队成员数量由SQL聚合得到，无需加载全部成员对象；默认延迟加载，列表查询可用 undefer 一并取出
+Team.member_count = column_property(
+    select(func.count(user_team_association.c.user_id))
+    .where(user_team_association.c.team_id == Team.id)
+    .correlate_except(user_team_association)
+    .scalar_subquery(),
+    deferred=True
+)
+
 class Repository(Base):
     """仓库表"""
     __tablename__ = 'repositories'
@@ -97,16 +195,16 @@ class Repository(Base):
     platform = Column(String(50))  # github, gitlab, gitee, etc.
     remote_url = Column(String(256))
     description = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=_utcnow)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
     owner_id = Column(Integer, ForeignKey('users.id'))
     
     # 关系
-    owner = relationship("User", back_populates="owned_repositories")
-    user_permissions = relationship("UserPermission", back_populates="repository")
-    team_permissions = relationship("TeamPermission", back_populates="repository")
-    protection_rules = relationship("ProtectionRule", back_populates="repository")
-    audit_logs = relationship("AuditLog", back_populates="repository")
+    owner = relationship("User", back_populates="owned_repositories", lazy="joined", innerjoin=False)
+    user_permissions = relationship("UserPermission", back_populates="repository", lazy="select")
+    team_permissions = relationship("TeamPermission", back_populates="repository", lazy="select")
+    protection_rules = relationship("ProtectionRule", back_populates="repository", lazy="select")
+    audit_logs = relationship("AuditLog", back_populates="repository", lazy="select")
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典表示"""
@@ -118,7 +216,7 @@ class Repository(Base):
             "platform": self.platform,
             "remote_url": self.remote_url,
             "description": self.description,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "created_at": _iso(self.created_at) if self.created_at else None,
             "owner": self.owner.username if self.owner else None
         }
     
@@ -133,26 +231,18 @@ class UserPermission(Base):
     user_id = Column(Integer, ForeignKey('users.id'))
     repository_id = Column(Integer, ForeignKey('repositories.id'))
     role = Column(String(50), nullable=False)  # admin, developer, reader
-    custom_permissions = Column(Text)  # 自定义权限，JSON字符串
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    custom_permissions = Column(JSONType(list))  # 自定义权限，以JSON字符串存储
+    created_at = Column(DateTime, default=_utcnow)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
     
     # 关系
-    user = relationship("User", back_populates="permissions")
-    repository = relationship("Repository", back_populates="user_permissions")
-    
-    def get_custom_permissions(self) -> List[str]:
-        """获取自定义权限列表"""
-        if not self.custom_permissions:
-            return []
-        try:
-            return json.loads(self.custom_permissions)
-        except:
-            return []
+    user = relationship("User", back_populates="permissions", lazy="select")
+    repository = relationship("Repository", back_populates="user_permissions", lazy="select")
     
-    def set_custom_permissions(self, permissions: List[str]):
-        """设置自定义权限列表"""
-        self.custom_permissions = json.dumps(permissions)
+    __table_args__ = (
+        Index("ix_user_perm_user_repo", "user_id", "repository_id"),
+        Index("ix_user_perm_repo", "repository_id"),
+    )
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典表示"""
@@ -161,8 +251,8 @@ class UserPermission(Base):
             "user_id": self.user_id,
             "repository_id": self.repository_id,
             "role": self.role,
-            "custom_permissions": self.get_custom_permissions(),
-            "created_at": self.created_at.isoformat() if self.created_at else None
+            "custom_permissions": self.custom_permissions,
+            "created_at": _iso(self.created_at) if self.created_at else None
         }
     
     def __repr__(self) -> str:
@@ -176,26 +266,18 @@ class TeamPermission(Base):
     team_id = Column(Integer, ForeignKey('teams.id'))
     repository_id = Column(Integer, ForeignKey('repositories.id'))
     role = Column(String(50), nullable=False)  # admin, developer, reader
-    custom_permissions = Column(Text)  # 自定义权限，JSON字符串
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    custom_permissions = Column(JSONType(list))  # 自定义权限，以JSON字符串存储
+    created_at = Column(DateTime, default=_utcnow)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
     
     # 关系
-    team = relationship("Team", back_populates="permissions")
-    repository = relationship("Repository", back_populates="team_permissions")
-    
-    def get_custom_permissions(self) -> List[str]:
-        """获取自定义权限列表"""
-        if not self.custom_permissions:
-            return []
-        try:
-            return json.loads(self.custom_permissions)
-        except:
-            return []
+    team = relationship("Team", back_populates="permissions", lazy="select")
+    repository = relationship("Repository", back_populates="team_permissions", lazy="select")
     
-    def set_custom_permissions(self, permissions: List[str]):
-        """设置自定义权限列表"""
-        self.custom_permissions = json.dumps(permissions)
+    __table_args__ = (
+        Index("ix_team_perm_team_repo", "team_id", "repository_id"),
+        Index("ix_team_perm_repo", "repository_id"),
+    )
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典表示"""
@@ -204,14 +286,14 @@ class TeamPermission(Base):
             "team_id": self.team_id,
             "repository_id": self.repository_id,
             "role": self.role,
-            "custom_permissions": self.get_custom_permissions(),
-            "created_at": self.created_at.isoformat() if self.created_at else None
+            "custom_permissions": self.custom_permissions,
+            "created_at": _iso(self.created_at) if self.created_at else None
         }
     
     def __repr__(self) -> str:
         return f"<TeamPermission team_id={self.team_id} repo_id={self.repository_id} role={self.role}>"
 
-class ProtectionRule(Base):
+class ProtectionRule(ProjectionMixin, Base):
     """仓库保护规则表"""
     __tablename__ = 'protection_rules'
     
@@ -220,25 +302,18 @@ class ProtectionRule(Base):
     rule_type = Column(String(50), nullable=False)  # require_review, protected_branch, block_force_push
     target = Column(String(100))  # 针对的分支，文件模式等
     enabled = Column(Boolean, default=True)
-    config = Column(Text)  # 配置参数，JSON字符串
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    config = Column(JSONType(dict))  # 配置参数，以JSON字符串存储
+    created_at = Column(DateTime, default=_utcnow)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
     
     # 关系
-    repository = relationship("Repository", back_populates="protection_rules")
+    repository = relationship("Repository", back_populates="protection_rules", lazy="select")
     
-    def get_config(self) -> Dict[str, Any]:
-        """获取规则配置"""
-        if not self.config:
-            return {}
-        try:
-            return json.loads(self.config)
-        except:
-            return {}
+    LIST_COLUMNS = ("id", "repository_id", "rule_type", "target", "enabled", "config", "created_at")
     
-    def set_config(self, config: Dict[str, Any]):
-        """设置规则配置"""
-        self.config = json.dumps(config)
+    __table_args__ = (
+        Index("ix_protection_rule_repo_updated", "repository_id", "updated_at"),
+    )
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典表示"""
@@ -248,14 +323,14 @@ class ProtectionRule(Base):
             "rule_type": self.rule_type,
             "target": self.target,
             "enabled": self.enabled,
-            "config": self.get_config(),
-            "created_at": self.created_at.isoformat() if self.created_at else None
+            "config": self.config,
+            "created_at": _iso(self.created_at) if self.created_at else None
         }
     
     def __repr__(self) -> str:
         return f"<ProtectionRule repo_id={self.repository_id} rule_type={self.rule_type}>"
 
-class AuditLog(Base):
+class AuditLog(ProjectionMixin, StreamingMixin, Base):
     """审计日志表"""
     __tablename__ = 'audit_logs'
     
@@ -265,26 +340,35 @@ class AuditLog(Base):
     operation = Column(String(50), nullable=False)
     operation_description = Column(String(256))
     target = Column(String(256))  # 操作的目标（文件、分支等）
-    details = Column(Text)  # 详细信息，JSON字符串
+    details = Column(JSONType(dict))  # 详细信息，以JSON字符串存储
     ip_address = Column(String(50))
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=_utcnow)
     
     # 关系
-    user = relationship("User", back_populates="audit_logs")
-    repository = relationship("Repository", back_populates="audit_logs")
+    user = relationship("User", back_populates="audit_logs", lazy="joined")
+    repository = relationship("Repository", back_populates="audit_logs", lazy="select")
     
-    def get_details(self) -> Dict[str, Any]:
-        """获取详细信息"""
-        if not self.details:
-            return {}
-        try:
-            return json.loads(self.details)
-        except:
-            return {}
+    LIST_COLUMNS = ("id", "user_id", "repository_id", "operation", "operation_description",
+                    "target", "details", "ip_address", "created_at")
+    
+    __table_args__ = (
+        Index("ix_audit_user_created", "user_id", "created_at"),
+        Index("ix_audit_repo_created", "repository_id", "created_at"),
+    )
     
-    def set_details(self, details: Dict[str, Any]):
-        """设置详细信息"""
-        self.details = json.dumps(details)
+    @classmethod
+    def bulk_create(cls, session, rows: List[Dict[str, Any]]):
+        """
+        批量插入审计日志
+        
+        使用单条 INSERT 语句配合多组参数执行，避免逐条 add 带来的多次往返。
+        
+        Args:
+            session: 数据库会话
+            rows: 审计日志字段字典列表
+        """
+        if rows:
+            session.execute(insert(cls), rows)
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典表示"""
@@ -296,14 +380,85 @@ class AuditLog(Base):
             "operation": self.operation,
             "operation_description": self.operation_description,
             "target": self.target,
-            "details": self.get_details(),
+            "details": self.details,
             "ip_address": self.ip_address,
-            "created_at": self.created_at.isoformat() if self.created_at else None
+            "created_at": _iso(self.created_at) if self.created_at else None
         }
     
     def __repr__(self) -> str:
         return f"<AuditLog user_id={self.user_id} operation={self.operation} created_at={self.created_at}>"
 
+# 需兼容 Python 3.9，不使用 dataclass(slots=True)（3.10 起支持），改为显式声明 __slots__；
+# 字段均无默认值，不会与 __slots__ 冲突
+@dataclass
+class AuditLogUser:
+    """审计日志中的操作用户信息"""
+    __slots__ = ("username", "full_name")
+    
+    username: str
+    full_name: Optional[str]
+
+@dataclass
+class AuditLogRecord:
+    """
+    审计日志列表项
+    
+    由投影查询的结果行直接构造，字段与 AuditLog.LIST_COLUMNS 一致，
+    可由 json_utils.dumps 直接序列化，无需先转换为字典。
+    """
+    __slots__ = (
+        "id", "user_id", "repository_id", "operation", "operation_description",
+        "target", "details", "ip_address", "created_at", "user"
+    )
+    
+    id: int
+    user_id: Optional[int]
+    repository_id: Optional[int]
+    operation: str
+    operation_description: Optional[str]
+    target: Optional[str]
+    details: Dict[str, Any]
+    ip_address: Optional[str]
+    created_at: Optional[datetime]
+    user: Optional[AuditLogUser]
+    
+    @classmethod
+    def from_row(cls, row) -> "AuditLogRecord":
+        """
+        从包含 LIST_COLUMNS 及 username、full_name 的结果行构造
+        
+        Args:
+            row: 查询结果行映射
+            
+        Returns:
+            AuditLogRecord: 审计日志列表项
+        """
+        username = row["username"]
+        return cls(
+            row["id"], row["user_id"], row["repository_id"], row["operation"],
+            row["operation_description"], row["target"], row["details"],
+            row["ip_address"], row["created_at"],
+            AuditLogUser(username, row["full_name"]) if username is not None else None
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典表示"""
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "repository_id": self.repository_id,
+            "operation": self.operation,
+            "operation_description": self.operation_description,
+            "target": self.target,
+            "details": self.details,
+            "ip_address": self.ip_address,
+            "created_at": _iso(self.created_at) if self.created_at else None,
+            "user": {
+                "username": self.user.username,
+                "full_name": self.user.full_name
+            } if self.user else None
+        }
+
 class ApiKey(Base):
     """API密钥表"""
     __tablename__ = 'api_keys'
@@ -313,33 +468,30 @@ class ApiKey(Base):
     key_name = Column(String(100), nullable=False)
     key_hash = Column(String(256), nullable=False)
     key_prefix = Column(String(16), nullable=False)  # 密钥前缀，用于标识展示
-    permissions = Column(Text)  # 权限范围，JSON字符串
-    created_at = Column(DateTime, default=datetime.utcnow)
+    permissions = Column(JSONType(list))  # 权限范围，以JSON字符串存储
+    created_at = Column(DateTime, default=_utcnow)
     expires_at = Column(DateTime)
     last_used_at = Column(DateTime)
     is_active = Column(Boolean, default=True)
     
     # 关系
-    user = relationship("User", back_populates="api_keys")
-    
-    def get_permissions(self) -> List[str]:
-        """获取权限范围"""
-        if not self.permissions:
-            return []
-        try:
-            return json.loads(self.permissions)
-        except:
-            return []
+    user = relationship("User", back_populates="api_keys", lazy="select")
     
-    def set_permissions(self, permissions: List[str]):
-        """设置权限范围"""
-        self.permissions = json.dumps(permissions)
+    __table_args__ = (
+        Index("ix_api_key_prefix", "key_prefix"),
+    )
     
+    @hybrid_property
     def is_expired(self) -> bool:
         """检查是否过期"""
         if not self.expires_at:
             return False
-        return datetime.utcnow() > self.expires_at
+        return _utcnow() > self.expires_at
+    
+    @is_expired.expression
+    def is_expired(cls):
+        """过期判断的SQL表达式，可直接用于查询过滤"""
+        return and_(cls.expires_at.isnot(None), cls.expires_at < _utcnow())
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典表示"""
@@ -348,12 +500,12 @@ class ApiKey(Base):
             "user_id": self.user_id,
             "key_name": self.key_name,
             "key_prefix": self.key_prefix,
-            "permissions": self.get_permissions(),
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
-            "last_used_at": self.last_used_at.isoformat() if self.last_used_at else None,
+            "permissions": self.permissions,
+            "created_at": _iso(self.created_at) if self.created_at else None,
+            "expires_at": _iso(self.expires_at) if self.expires_at else None,
+            "last_used_at": _iso(self.last_used_at) if self.last_used_at else None,
             "is_active": self.is_active,
-            "is_expired": self.is_expired()
+            "is_expired": self.is_expired
         }
     
     def __repr__(self) -> str:
@@ -367,11 +519,12 @@ class KnowledgeBaseEntry(Base):
     id = Column(Integer, primary_key=True)
     text = Column(Text, nullable=False)
     source = Column(String(256))
+    # 注意：不能命名为 metadata，该名称被声明式基类的 Base.metadata 保留
     meta_info = Column(Text)  # 存储为JSON字符串
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=_utcnow)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
 
-class CodeSnippet(Base):
+class CodeSnippet(StreamingMixin, Base):
     """代码片段表，用于存储代码补全历史"""
     __tablename__ = 'code_snippets'
     
@@ -379,9 +532,9 @@ class CodeSnippet(Base):
     language = Column(String(50), nullable=False)
     code = Column(Text, nullable=False)
     completion = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=_utcnow)
 
-class CodeAnalysisResult(Base):
+class CodeAnalysisResult(StreamingMixin, Base):
     """代码分析结果表"""
     __tablename__ = 'code_analysis_results'
     
@@ -390,7 +543,9 @@ class CodeAnalysisResult(Base):
     language = Column(String(50))
     metrics = Column(Text)  # JSON存储指标数据
     quality_score = Column(Float)
-    analysis_date = Column(DateTime, default=datetime.utcnow)
+    analysis_date = Column(DateTime, default=_utcnow)
+    
+    issues = relationship("CodeIssue", back_populates="analysis", lazy="select")
     
 class CodeIssue(Base):
     """代码问题记录表"""
@@ -403,10 +558,10 @@ class CodeIssue(Base):
     severity = Column(String(20))  # error, warning, info
     message = Column(Text)
     code = Column(String(50))  # 问题代码
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=_utcnow)
     analysis_id = Column(Integer, ForeignKey('code_analysis_results.id'))
     
-    analysis = relationship("CodeAnalysisResult")
+    analysis = relationship("CodeAnalysisResult", back_populates="issues", lazy="select")
 
 class UserSettings(Base):
     """用户设置表"""
@@ -415,31 +570,68 @@ class UserSettings(Base):
     id = Column(Integer, primary_key=True)
     key = Column(String(100), unique=True)
     value = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=_utcnow)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
 
 # 数据库工厂
+# 引擎和会话工厂在进程内只创建一次，以便复用连接池
+_ENGINE = None
+_SessionFactory = None
+
+# SQLite 连接参数：WAL 模式下读写互不阻塞，NORMAL 同步减少 fsync 次数
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;"
+    "PRAGMA synchronous=NORMAL;"
+    "PRAGMA temp_store=MEMORY;"
+    "PRAGMA cache_size=-64000;"
+    "PRAGMA mmap_size=268435456;"
+    "PRAGMA foreign_keys=ON;"
+)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """在每个新建的 SQLite 连接上应用性能相关的 PRAGMA 设置"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.executescript(_SQLITE_PRAGMAS)
+    finally:
+        cursor.close()
+
 def get_engine():
-    """获取数据库引擎"""
+    """获取数据库引擎（进程内缓存）"""
+    global _ENGINE
+    if _ENGINE is not None:
+        return _ENGINE
+    
     db_type = config.get("storage.type", "sqlite")
     
     if db_type == "sqlite":
         db_path = config.get("storage.path", "data/user_data/codeassistant.db")
         # 确保目录存在
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-        return create_engine(f"sqlite:///{db_path}")
+        # 连接会在线程间复用（如后台任务线程），需要关闭同线程检查
+        _ENGINE = create_engine(
+            f"sqlite:///{db_path}",
+            connect_args={"check_same_thread": False},
+            pool_size=10,
+            max_overflow=20,
+            insertmanyvalues_page_size=1000
+        )
+        event.listen(_ENGINE, "connect", _set_sqlite_pragmas)
+        return _ENGINE
     else:
         raise ValueError(f"不支持的数据库类型: {db_type}")
 
 def get_session():
     """获取数据库会话"""
-    engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    global _SessionFactory
+    if _SessionFactory is None:
+        # 提交后不使对象过期，调用方在会话关闭后仍可读取已加载的属性
+        _SessionFactory = sessionmaker(bind=get_engine(), expire_on_commit=False)
+    return _SessionFactory()
 
 def init_database():
     """初始化数据库"""
     engine = get_engine()
     Base.metadata.create_all(engine)
     
-    return engine 
\ No newline at end of file
+    return engine
\ No newline at end of file
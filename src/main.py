@@ -23,10 +23,7 @@ from src.utils.init_utils import ensure_directories
 from src.utils.config_validator import validate_config
 from src.utils.dependency_container import get_container
 
-# 导入服务
-from src.services.model_service import ModelService
-from src.services.auth_service import AuthorizationService as AuthService
-from src.api.app import start_web_app
+# 服务和Web应用在使用时才导入，避免 --help 等场景加载 Flask、SQLAlchemy 等重型依赖
 
 def parse_args():
     """解析命令行参数"""
@@ -51,6 +48,9 @@ def init_services(args):
     """初始化服务"""
     logger.info("开始初始化服务...")
     
+    from src.services.model_service import ModelService
+    from src.services.auth_service import AuthorizationService as AuthService
+    
     # 获取依赖容器
     container = get_container()
     
@@ -110,6 +110,7 @@ def main():
     system_monitor = init_services(args)
     
     # 启动Web应用
+    from src.api.app import start_web_app
     start_web_app(
         host=args.host,
         port=args.port,
@@ -1,20 +1,100 @@
 import os
 import sys
+import hmac
 import json
 import time
 import logging
 import threading
 import importlib
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Union, Callable
-import uuid
+from typing import Dict, List, Any, Optional, Union, Callable, Iterator
+from functools import wraps
+import secrets
 
-from src.utils import config, logger
+from src.utils import config, logger, json_utils, process_pool
 from src.modules.filesystem_analyzer import filesystem_analyzer
 from src.modules.network_proxy import network_proxy
 from src.modules.context_manager import context_manager
 from src.services.model_manager import ModelManager
 
+# 固定错误响应的响应体，模块加载时预先序列化
+_UNAUTHORIZED_BODY = json_utils.dumps({"error": "未授权"})
+_INVALID_JSON_BODY = json_utils.dumps({"error": "请求体必须是JSON对象"})
+_MISSING_URL_BODY = json_utils.dumps({"error": "缺少URL参数"})
+_MISSING_NAME_BODY = json_utils.dumps({"error": "缺少名称参数"})
+_MISSING_PROMPT_BODY = json_utils.dumps({"error": "缺少prompt参数"})
+_MISSING_CLIENT_ID_BODY = json_utils.dumps({"error": "缺少client_id参数"})
+
+
+class SessionStore:
+    """
+    按会话ID分片加锁的会话存储
+    
+    会话分散在多个分片中，每个分片由独立的锁保护，
+    并发请求只在访问同一分片时才会互相等待。
+    """
+    
+    SHARD_COUNT = 16  # 必须为2的幂
+    
+    def __init__(self):
+        """初始化会话存储"""
+        self._shards = [({}, threading.Lock()) for _ in range(self.SHARD_COUNT)]
+    
+    def _shard(self, session_id: str):
+        return self._shards[hash(session_id) & (self.SHARD_COUNT - 1)]
+    
+    def add(self, session_id: str, session: Dict[str, Any]) -> None:
+        """添加会话"""
+        sessions, lock = self._shard(session_id)
+        with lock:
+            sessions[session_id] = session
+    
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """获取会话，不存在时返回None"""
+        sessions, lock = self._shard(session_id)
+        with lock:
+            return sessions.get(session_id)
+    
+    def touch(self, session_id: str) -> bool:
+        """
+        更新会话活跃时间
+        
+        Returns:
+            bool: 会话是否存在
+        """
+        sessions, lock = self._shard(session_id)
+        with lock:
+            session = sessions.get(session_id)
+            if session is None:
+                return False
+            session["last_active"] = time.time()
+            return True
+    
+    def remove(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """移除会话，返回被移除的会话"""
+        sessions, lock = self._shard(session_id)
+        with lock:
+            return sessions.pop(session_id, None)
+    
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+    
+    def __getitem__(self, session_id: str) -> Dict[str, Any]:
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        return session
+    
+    def __len__(self) -> int:
+        return sum(len(sessions) for sessions, _ in self._shards)
+    
+    def __iter__(self) -> Iterator[str]:
+        """遍历会话ID（基于各分片的快照）"""
+        for sessions, lock in self._shards:
+            with lock:
+                session_ids = list(sessions)
+            yield from session_ids
+
 
 class MCPServer:
     """
@@ -28,7 +108,12 @@ class MCPServer:
         self.api_host = config.get("mcp_server.api_host", "localhost")
         self.api_port = config.get("mcp_server.api_port", 8765)
         self.auth_enabled = config.get("mcp_server.auth_enabled", True)
-        self.auth_token = config.get("mcp_server.auth_token", self._generate_auth_token())
+        self.version = config.get("app.version", "0.1.0")
+        # 仅在未配置令牌时生成随机令牌
+        auth_token = config.get("mcp_server.auth_token")
+        self.auth_token = auth_token if auth_token is not None else self._generate_auth_token()
+        # 令牌的字节形式只计算一次，供每次请求的常量时间比较使用
+        self._auth_token_bytes = str(self.auth_token).encode("utf-8")
         
         # 模块实例
         self.model_manager = ModelManager()
@@ -38,7 +123,7 @@ class MCPServer:
         self.plugin_routes: Dict[str, Callable] = {}
         
         # 会话管理
-        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.sessions = SessionStore()
         
         # 创建插件目录
         os.makedirs(self.plugins_dir, exist_ok=True)
@@ -48,247 +133,360 @@ class MCPServer:
         
         logger.info("MCP服务器初始化完成")
     
-    def start(self):
-        """启动MCP服务器"""
-        try:
-            from flask import Flask, request, jsonify
+    def create_app(self):
+        """
+        创建MCP服务器的Flask应用
+        
+        Returns:
+            Flask: 注册了全部API与插件路由的应用
+        """
+        from flask import Flask, request, jsonify
+        from src.utils.flask_json import FastJSONProvider
+        
+        # 插件中的代码分析在请求处理线程中执行，服务进程内不创建分析工作进程
+        process_pool.set_enabled(False)
+        
+        app = Flask("MCPServer")
+        app.json = FastJSONProvider(app)
+        # 响应不排序键、不缩进（调试模式下同样保持紧凑输出）
+        app.json.sort_keys = False
+        app.json.compact = True
+        
+        def static_error(body: bytes, status: int):
+            """使用预先序列化的响应体构造错误响应，跳过JSON编码"""
+            return app.response_class(body, status=status, mimetype="application/json")
+        
+        def require_auth(view):
+            """校验请求认证，未通过时直接返回预先序列化的401响应"""
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self._check_auth(request):
+                    return static_error(_UNAUTHORIZED_BODY, 401)
+                return view(*args, **kwargs)
+            return wrapper
+        
+        @app.route("/api/health", methods=["GET"])
+        def health_check():
+            """健康检查接口"""
+            return jsonify({
+                "status": "ok",
+                "version": self.version,
+                "timestamp": time.time()
+            })
+        
+        @app.route("/api/filesystem/scan", methods=["POST"])
+        @require_auth
+        def scan_filesystem():
+            """扫描文件系统"""
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return static_error(_INVALID_JSON_BODY, 400)
+            directory = data.get("directory", ".")
+            incremental = data.get("incremental", True)
             
-            app = Flask("MCPServer")
+            result = filesystem_analyzer.scan_directory(directory, incremental)
+            return jsonify(result)
+        
+        @app.route("/api/filesystem/find", methods=["POST"])
+        @require_auth
+        def find_files():
+            """查找文件"""
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return static_error(_INVALID_JSON_BODY, 400)
+            directory = data.get("directory", ".")
+            pattern = data.get("pattern", "*")
+            recursive = data.get("recursive", True)
             
-            @app.route("/api/health", methods=["GET"])
-            def health_check():
-                """健康检查接口"""
-                return jsonify({
-                    "status": "ok",
-                    "version": config.get("app.version", "0.1.0"),
-                    "timestamp": time.time()
-                })
+            files = filesystem_analyzer.find_files(directory, pattern, recursive)
+            return jsonify({"files": files})
+        
+        @app.route("/api/network/request", methods=["POST"])
+        @require_auth
+        def network_request():
+            """发送网络请求"""
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return static_error(_INVALID_JSON_BODY, 400)
+            url = data.get("url")
+            method = data.get("method", "GET")
+            headers = data.get("headers")
+            params = data.get("params")
+            body = data.get("body")
+            json_data = data.get("json")
             
-            @app.route("/api/filesystem/scan", methods=["POST"])
-            def scan_filesystem():
-                """扫描文件系统"""
-                if not self._check_auth(request):
-                    return jsonify({"error": "未授权"}), 401
-                
-                data = request.json
-                directory = data.get("directory", ".")
-                incremental = data.get("incremental", True)
-                
-                result = filesystem_analyzer.scan_directory(directory, incremental)
-                return jsonify(result)
+            if not url:
+                return static_error(_MISSING_URL_BODY, 400)
             
-            @app.route("/api/filesystem/find", methods=["POST"])
-            def find_files():
-                """查找文件"""
-                if not self._check_auth(request):
-                    return jsonify({"error": "未授权"}), 401
-                
-                data = request.json
-                directory = data.get("directory", ".")
-                pattern = data.get("pattern", "*")
-                recursive = data.get("recursive", True)
-                
-                files = filesystem_analyzer.find_files(directory, pattern, recursive)
-                return jsonify({"files": files})
+            result = network_proxy.request(
+                url=url,
+                method=method,
+                headers=headers,
+                params=params,
+                data=body,
+                json_data=json_data
+            )
             
-            @app.route("/api/network/request", methods=["POST"])
-            def network_request():
-                """发送网络请求"""
-                if not self._check_auth(request):
-                    return jsonify({"error": "未授权"}), 401
-                
-                data = request.json
-                url = data.get("url")
-                method = data.get("method", "GET")
-                headers = data.get("headers")
-                params = data.get("params")
-                body = data.get("body")
-                json_data = data.get("json")
-                
-                if not url:
-                    return jsonify({"error": "缺少URL参数"}), 400
-                
-                result = network_proxy.request(
-                    url=url,
-                    method=method,
-                    headers=headers,
-                    params=params,
-                    data=body,
-                    json_data=json_data
-                )
-                
-                return jsonify(result)
+            return jsonify(result)
+        
+        @app.route("/api/context/create", methods=["POST"])
+        @require_auth
+        def create_context():
+            """创建上下文"""
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return static_error(_INVALID_JSON_BODY, 400)
+            name = data.get("name")
+            level = data.get("level", "file")
+            content = data.get("content", "")
+            metadata = data.get("metadata")
             
-            @app.route("/api/context/create", methods=["POST"])
-            def create_context():
-                """创建上下文"""
-                if not self._check_auth(request):
-                    return jsonify({"error": "未授权"}), 401
-                
-                data = request.json
-                name = data.get("name")
-                level = data.get("level", "file")
-                content = data.get("content", "")
-                metadata = data.get("metadata")
-                
-                if not name:
-                    return jsonify({"error": "缺少名称参数"}), 400
-                
-                context_id = context_manager.create_context(
-                    name=name,
-                    level=level,
-                    content=content,
-                    metadata=metadata
-                )
-                
-                return jsonify({
-                    "context_id": context_id,
-                    "name": name,
-                    "level": level
-                })
+            if not name:
+                return static_error(_MISSING_NAME_BODY, 400)
             
-            @app.route("/api/context/get/<context_id>", methods=["GET"])
-            def get_context(context_id):
-                """获取上下文"""
-                if not self._check_auth(request):
-                    return jsonify({"error": "未授权"}), 401
-                
-                context = context_manager.get_context(context_id)
-                if not context:
-                    return jsonify({"error": f"上下文不存在: {context_id}"}), 404
-                
-                return jsonify(context)
+            context_id = context_manager.create_context(
+                name=name,
+                level=level,
+                content=content,
+                metadata=metadata
+            )
             
-            @app.route("/api/context/update/<context_id>", methods=["POST"])
-            def update_context(context_id):
-                """更新上下文"""
-                if not self._check_auth(request):
-                    return jsonify({"error": "未授权"}), 401
-                
-                data = request.json
-                content = data.get("content")
-                metadata = data.get("metadata")
-                
-                success = context_manager.update_context(
-                    context_id=context_id,
-                    content=content,
-                    metadata=metadata
-                )
-                
-                if not success:
-                    return jsonify({"error": f"更新上下文失败: {context_id}"}), 404
-                
-                return jsonify({"success": True})
+            return jsonify({
+                "context_id": context_id,
+                "name": name,
+                "level": level
+            })
+        
+        @app.route("/api/context/get/<context_id>", methods=["GET"])
+        @require_auth
+        def get_context(context_id):
+            """获取上下文"""
+            context = context_manager.get_context(context_id)
+            if not context:
+                return jsonify({"error": f"上下文不存在: {context_id}"}), 404
             
-            @app.route("/api/context/search", methods=["POST"])
-            def search_contexts():
-                """搜索上下文"""
-                if not self._check_auth(request):
-                    return jsonify({"error": "未授权"}), 401
-                
-                data = request.json
-                query = data.get("query")
-                level = data.get("level")
-                metadata_filter = data.get("metadata_filter")
-                
-                contexts = context_manager.search_contexts(
-                    query=query,
-                    level=level,
-                    metadata_filter=metadata_filter
-                )
-                
-                return jsonify({"contexts": contexts})
+            return jsonify(context)
+        
+        @app.route("/api/context/update/<context_id>", methods=["POST"])
+        @require_auth
+        def update_context(context_id):
+            """更新上下文"""
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return static_error(_INVALID_JSON_BODY, 400)
+            content = data.get("content")
+            metadata = data.get("metadata")
             
-            @app.route("/api/model/generate", methods=["POST"])
-            def generate_text():
-                """生成文本"""
-                if not self._check_auth(request):
-                    return jsonify({"error": "未授权"}), 401
-                
-                data = request.json
-                prompt = data.get("prompt")
-                model = data.get("model")
-                temperature = data.get("temperature")
-                max_tokens = data.get("max_tokens")
-                
-                if not prompt:
-                    return jsonify({"error": "缺少prompt参数"}), 400
-                
-                result = self.model_manager.generate(
-                    prompt=prompt,
-                    model_name=model,
-                    temperature=temperature,
-                    max_tokens=max_tokens
-                )
-                
-                return jsonify({"text": result})
+            success = context_manager.update_context(
+                context_id=context_id,
+                content=content,
+                metadata=metadata
+            )
             
-            @app.route("/api/session/create", methods=["POST"])
-            def create_session():
-                """创建会话"""
-                if not self._check_auth(request):
-                    return jsonify({"error": "未授权"}), 401
-                
-                data = request.json
-                client_id = data.get("client_id")
-                name = data.get("name", "未命名会话")
-                metadata = data.get("metadata", {})
-                
-                if not client_id:
-                    return jsonify({"error": "缺少client_id参数"}), 400
-                
-                # 创建会话
-                session_id = str(uuid.uuid4())
-                self.sessions[session_id] = {
-                    "id": session_id,
-                    "client_id": client_id,
-                    "name": name,
-                    "created_at": time.time(),
-                    "last_active": time.time(),
-                    "metadata": metadata
-                }
-                
-                # 创建上下文会话
-                context_id = context_manager.create_session(
-                    name=name,
-                    metadata={"client_id": client_id, "session_id": session_id}
-                )
-                
-                self.sessions[session_id]["context_id"] = context_id
-                
-                return jsonify({
-                    "session_id": session_id,
-                    "name": name,
-                    "context_id": context_id
-                })
+            if not success:
+                return jsonify({"error": f"更新上下文失败: {context_id}"}), 404
             
-            @app.route("/api/session/<session_id>/ping", methods=["POST"])
-            def ping_session(session_id):
-                """更新会话活跃时间"""
-                if not self._check_auth(request):
-                    return jsonify({"error": "未授权"}), 401
-                
-                if session_id not in self.sessions:
-                    return jsonify({"error": f"会话不存在: {session_id}"}), 404
-                
-                self.sessions[session_id]["last_active"] = time.time()
-                return jsonify({"success": True})
+            return jsonify({"success": True})
+        
+        @app.route("/api/context/search", methods=["POST"])
+        @require_auth
+        def search_contexts():
+            """搜索上下文"""
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return static_error(_INVALID_JSON_BODY, 400)
+            query = data.get("query")
+            level = data.get("level")
+            metadata_filter = data.get("metadata_filter")
+            
+            contexts = context_manager.search_contexts(
+                query=query,
+                level=level,
+                metadata_filter=metadata_filter
+            )
+            
+            return jsonify({"contexts": contexts})
+        
+        @app.route("/api/model/generate", methods=["POST"])
+        @require_auth
+        def generate_text():
+            """生成文本"""
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return static_error(_INVALID_JSON_BODY, 400)
+            prompt = data.get("prompt")
+            model = data.get("model")
+            temperature = data.get("temperature")
+            max_tokens = data.get("max_tokens")
+            
+            if not prompt:
+                return static_error(_MISSING_PROMPT_BODY, 400)
             
-            # 添加插件路由
-            for route, handler in self.plugin_routes.items():
-                app.route(route)(handler)
+            result = self.model_manager.generate(
+                prompt=prompt,
+                model_name=model,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            
+            return jsonify({"text": result})
+        
+        @app.route("/api/session/create", methods=["POST"])
+        @require_auth
+        def create_session():
+            """创建会话"""
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return static_error(_INVALID_JSON_BODY, 400)
+            client_id = data.get("client_id")
+            name = data.get("name", "未命名会话")
+            metadata = data.get("metadata", {})
+            
+            if not client_id:
+                return static_error(_MISSING_CLIENT_ID_BODY, 400)
+            
+            # 创建会话
+            session_id = secrets.token_urlsafe(16)
+            now = time.time()
+            
+            # 创建上下文会话
+            context_id = context_manager.create_session(
+                name=name,
+                metadata={"client_id": client_id, "session_id": session_id}
+            )
+            
+            # 会话信息完整后一次性写入存储
+            self.sessions.add(session_id, {
+                "id": session_id,
+                "client_id": client_id,
+                "name": name,
+                "created_at": now,
+                "last_active": now,
+                "metadata": metadata,
+                "context_id": context_id
+            })
+            
+            return jsonify({
+                "session_id": session_id,
+                "name": name,
+                "context_id": context_id
+            })
+        
+        @app.route("/api/session/<session_id>/ping", methods=["POST"])
+        @require_auth
+        def ping_session(session_id):
+            """更新会话活跃时间"""
+            if not self.sessions.touch(session_id):
+                return jsonify({"error": f"会话不存在: {session_id}"}), 404
+            
+            return jsonify({"success": True})
+        
+        # 添加插件路由
+        for route, handler in self.plugin_routes.items():
+            app.route(route)(handler)
+        
+        return app
+    
+    def start(self):
+        """
+        启动MCP服务器
+        
+        服务器实现由 mcp_server.server 配置决定：
+        werkzeug（默认，多线程开发服务器）、uvicorn（以WSGI接口运行于ASGI服务器）
+        或 gunicorn（默认使用sync worker，仅支持单个worker进程）。
+        """
+        try:
+            app = self.create_app()
+            server = config.get("mcp_server.server", "werkzeug")
             
             # 启动服务器
-            logger.info(f"MCP服务器启动，监听 {self.api_host}:{self.api_port}")
-            app.run(host=self.api_host, port=self.api_port)
+            logger.info(f"MCP服务器启动({server})，监听 {self.api_host}:{self.api_port}")
+            if server == "uvicorn":
+                self._run_uvicorn(app)
+            elif server == "gunicorn":
+                self._run_gunicorn(app)
+            else:
+                app.run(host=self.api_host, port=self.api_port, threaded=True)
             
-        except ImportError:
-            logger.error("缺少Flask库，无法启动MCP服务器")
+        except ImportError as e:
+            logger.error(f"缺少依赖库，无法启动MCP服务器: {str(e)}")
             raise
         except Exception as e:
             logger.error(f"启动MCP服务器失败: {str(e)}")
             raise
     
+    def _run_uvicorn(self, app):
+        """
+        使用Uvicorn运行应用
+        
+        同步的Flask处理函数由Uvicorn的WSGI适配层在线程池中执行，
+        网络请求、模型生成等阻塞调用不会阻塞事件循环和其他请求。
+        
+        Args:
+            app: Flask应用
+        """
+        import uvicorn
+        
+        uvicorn.run(
+            app,
+            host=self.api_host,
+            port=self.api_port,
+            interface="wsgi",
+            loop="auto",
+            log_level=config.get("mcp_server.log_level", "info")
+        )
+    
+    def _run_gunicorn(self, app):
+        """
+        使用Gunicorn运行应用
+        
+        默认使用sync worker：gevent worker会对整个进程打猴子补丁，
+        与代码分析使用的多进程池和numba编译不兼容，需要时可通过 mcp_server.worker_class 显式启用。
+        会话和上下文保存在进程内存中，在有跨进程共享的存储之前只能以单个worker运行：
+        mcp_server.workers 为 "auto" 时按1处理，大于1或小于1时拒绝启动。
+        
+        Args:
+            app: Flask应用
+        """
+        from gunicorn.app.base import BaseApplication
+        
+        workers = config.get("mcp_server.workers", 1)
+        if workers == "auto":
+            # 会话不能跨进程共享，暂不按CPU核心数启动多个worker
+            logger.warning("mcp_server.workers 为 \"auto\"，会话保存在进程内存中，仅启动1个worker进程")
+            workers = 1
+        else:
+            # 配置文件或环境变量中的值可能是字符串（如 "4"），统一转换为整数
+            try:
+                workers = int(workers)
+            except (TypeError, ValueError):
+                logger.error(f"配置项 mcp_server.workers 无效: {workers!r}，应为1或 \"auto\"")
+                raise ValueError(f"mcp_server.workers 配置无效: {workers!r}")
+        if workers < 1:
+            logger.error(f"配置项 mcp_server.workers 无效: {workers}，worker进程数至少为1")
+            raise ValueError(f"mcp_server.workers 配置无效: {workers}")
+        if workers > 1:
+            # 其他worker收到的会话请求找不到会话（404），多worker部署在共享存储实现前不可用
+            logger.error(f"配置项 mcp_server.workers 为{workers}，会话和上下文保存在进程内存中，不支持多个worker进程")
+            raise ValueError(f"mcp_server.workers 不支持大于1: {workers}")
+        
+        options = {
+            "bind": f"{self.api_host}:{self.api_port}",
+            "workers": workers,
+            "worker_class": config.get("mcp_server.worker_class", "sync"),
+            "worker_connections": config.get("mcp_server.worker_connections", 1000),
+        }
+        
+        class MCPApplication(BaseApplication):
+            def load_config(self):
+                for key, value in options.items():
+                    self.cfg.set(key, value)
+            
+            def load(self):
+                return app
+        
+        MCPApplication().run()
+    
     def _check_auth(self, request):
         """检查请求认证"""
         if not self.auth_enabled:
@@ -298,14 +496,12 @@ class MCPServer:
         if not auth_header:
             return False
         
-        try:
-            auth_type, token = auth_header.split(" ", 1)
-            if auth_type.lower() != "bearer":
-                return False
-            
-            return token == self.auth_token
-        except Exception:
+        auth_type, sep, token = auth_header.partition(" ")
+        if not sep or auth_type.lower() != "bearer":
             return False
+        
+        # 常量时间比较，避免通过响应耗时推测令牌内容
+        return hmac.compare_digest(token.encode("utf-8"), self._auth_token_bytes)
     
     def _generate_auth_token(self) -> str:
         """生成认证令牌"""
@@ -314,7 +510,7 @@ class MCPServer:
             return token
         
         # 生成随机令牌
-        token = str(uuid.uuid4())
+        token = secrets.token_urlsafe(16)
         logger.info(f"生成MCP服务器认证令牌: {token}")
         return token
     
@@ -325,6 +521,13 @@ class MCPServer:
         
         # 查找所有插件目录
         plugin_dirs = [d for d in self.plugins_dir.iterdir() if d.is_dir() and (d / "__init__.py").exists()]
+        if not plugin_dirs:
+            return
+        
+        # 添加插件目录到Python路径（所有插件共用，只需检查一次）
+        plugins_root = str(self.plugins_dir.parent)
+        if plugins_root not in sys.path:
+            sys.path.insert(0, plugins_root)
         
         for plugin_dir in plugin_dirs:
             plugin_name = plugin_dir.name
@@ -333,10 +536,6 @@ class MCPServer:
                 # 构建模块路径
                 module_path = f"plugins.{plugin_name}"
                 
-                # 添加插件目录到Python路径
-                if str(self.plugins_dir.parent) not in sys.path:
-                    sys.path.insert(0, str(self.plugins_dir.parent))
-                
                 # 导入插件模块
                 plugin_module = importlib.import_module(module_path)
                 
@@ -362,4 +561,15 @@ class MCPServer:
 
 
 # 创建单例实例
-mcp_server = MCPServer() 
\ No newline at end of file
+mcp_server = MCPServer()
+
+
+def __getattr__(name):
+    """
+    首次访问模块属性 app 时创建Flask应用，供 gunicorn src.mcp_server:app 等WSGI服务器直接加载
+    """
+    if name == "app":
+        app = mcp_server.create_app()
+        globals()["app"] = app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}") 
\ No newline at end of file
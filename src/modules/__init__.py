@@ -4,6 +4,8 @@ AIgo 模块包
 此包包含AIgo系统的核心功能模块，包括代码分析、知识库、提示工程等。
 """
 
+import importlib
+
 # 导入核心模块
 from src.modules.code_analyzer import CodeAnalyzer
 from src.modules.code_completion import CodeCompletion
@@ -19,36 +21,73 @@ from src.modules.repo_integration import *
 from src.modules.developer_preferences import *
 from src.modules.system_monitor import *
 
-# 创建模块实例
-filesystem_analyzer = None
-network_proxy = None
-context_manager = ContextManager()
-
-# 初始化模块实例
-try:
-    from src.modules.filesystem_analyzer import FilesystemAnalyzer
-    filesystem_analyzer = FilesystemAnalyzer()
-except ImportError:
-    # 如果模块不存在，创建一个空的模块
-    class DummyFilesystemAnalyzer:
-        def scan_directory(self, *args, **kwargs):
-            return {"error": "模块未加载"}
-        
-        def find_files(self, *args, **kwargs):
-            return {"files": []}
-            
-    filesystem_analyzer = DummyFilesystemAnalyzer()
-
-try:
-    from src.modules.network_proxy import NetworkProxy
-    network_proxy = NetworkProxy()
-except ImportError:
-    # 如果模块不存在，创建一个空的模块
-    class DummyNetworkProxy:
-        def request(self, *args, **kwargs):
-            return {"error": "模块未加载"}
+# 以下模块实例在首次访问时创建（PEP 562），仅使用代码分析等功能时无需初始化
+_LAZY_INSTANCES = ("context_manager", "filesystem_analyzer", "network_proxy")
+
+# 子模块首次导入时会以同名属性绑定到本包，遮蔽同名的服务实例。
+# 在此先加载这些子模块（其中的单例同样延迟创建，导入开销很小），再移除绑定；
+# 已加载的子模块不会再次绑定，之后访问这些名称始终进入 __getattr__
+for _name in _LAZY_INSTANCES:
+    try:
+        importlib.import_module(f"{__name__}.{_name}")
+    except ImportError:
+        pass
+    globals().pop(_name, None)
+del _name
+
+
+def get_context_manager():
+    """获取上下文管理器实例，与 src.modules.context_manager 中的单例相同"""
+    from src.modules.context_manager import get_instance
+    return get_instance()
+
+
+def get_filesystem_analyzer():
+    """获取文件系统分析器实例，与 src.modules.filesystem_analyzer 中的单例相同，模块不存在时返回空实现"""
+    try:
+        from src.modules.filesystem_analyzer import get_instance
+        return get_instance()
+    except ImportError:
+        # 如果模块不存在，创建一个空的模块
+        class DummyFilesystemAnalyzer:
+            def scan_directory(self, *args, **kwargs):
+                return {"error": "模块未加载"}
             
-    network_proxy = DummyNetworkProxy()
+            def find_files(self, *args, **kwargs):
+                return {"files": []}
+                
+        return DummyFilesystemAnalyzer()
+
+
+def get_network_proxy():
+    """获取网络代理实例，与 src.modules.network_proxy 中的单例相同，模块不存在时返回空实现"""
+    try:
+        from src.modules.network_proxy import get_instance
+        return get_instance()
+    except ImportError:
+        # 如果模块不存在，创建一个空的模块
+        class DummyNetworkProxy:
+            def request(self, *args, **kwargs):
+                return {"error": "模块未加载"}
+                
+        return DummyNetworkProxy()
+
+
+_INSTANCE_GETTERS = {
+    "context_manager": get_context_manager,
+    "filesystem_analyzer": get_filesystem_analyzer,
+    "network_proxy": get_network_proxy,
+}
+
+
+def __getattr__(name):
+    """首次访问模块实例时创建并缓存到模块全局变量，之后直接命中模块字典"""
+    getter = _INSTANCE_GETTERS.get(name)
+    if getter is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    instance = getter()
+    globals()[name] = instance
+    return instance
 
 __all__ = [
     'CodeAnalyzer',
@@ -56,6 +95,9 @@ __all__ = [
     'KnowledgeBase',
     'ContextManager',
     'ErrorChecker',
+    'get_context_manager',
+    'get_filesystem_analyzer',
+    'get_network_proxy',
     'filesystem_analyzer',
     'network_proxy',
     'context_manager'
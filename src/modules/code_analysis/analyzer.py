@@ -3,13 +3,27 @@
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from pickle import PicklingError
+from stat import S_ISREG
 from typing import List, Dict, Any, Optional
 
+from src.utils import process_pool
 from src.modules.code_analysis.metrics import MetricsCalculator
 from src.modules.code_analysis.structure import StructureAnalyzer
 from src.modules.code_analysis.quality import QualityAnalyzer
-from src.modules.code_analysis.utils import detect_language_by_extension, generate_summary, generate_project_summary
+from src.modules.code_analysis.utils import (
+    EXTENSION_LANGUAGES, detect_language_by_extension, generate_summary, generate_project_summary
+)
+
+# 项目分析时读取文件的最大线程数
+IO_MAX_WORKERS = 32
+# 待分析文件数达到该值时使用多进程并行分析，文件较少时进程池的启动开销大于收益
+PARALLEL_MIN_FILES = 32
+# 每次派发给工作进程的文件数
+PARALLEL_CHUNKSIZE = 16
 
 class CodeAnalyzer:
     """
@@ -53,32 +67,41 @@ class CodeAnalyzer:
             Dict[str, Any]: 分析结果
         """
         path = Path(file_path)
-        if not path.exists() or not path.is_file():
+        
+        # 先根据扩展名确定文件语言，不支持的类型无需访问文件系统
+        language = detect_language_by_extension(path.suffix)
+        if not language:
+            return {"error": f"不支持的文件类型: {path.suffix}"}
+        
+        # 一次stat同时判断文件是否存在、是否为普通文件及文件大小
+        try:
+            st = path.stat()
+        except OSError:
+            return {"error": f"文件不存在: {file_path}"}
+        if not S_ISREG(st.st_mode):
             return {"error": f"文件不存在: {file_path}"}
             
         # 检查文件大小
-        file_size = path.stat().st_size
+        file_size = st.st_size
         if file_size > self.max_file_size:
             return {"error": f"文件过大 ({file_size} 字节), 超过限制 ({self.max_file_size} 字节)"}
             
-        # 确定文件语言
-        language = detect_language_by_extension(path.suffix)
-        if not language:
-            return {"error": f"不支持的文件类型: {path.suffix}"}
-            
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
+            
+            # 行列表只切分一次，供度量计算和质量分析共用
+            lines = content.split('\n')
                 
             # 进行文件分析
             result = {
                 "file": str(path),
                 "language": language,
                 "size": file_size,
-                "lines": content.count('\n') + 1,
-                "metrics": self.metrics_calculator.calculate_metrics(content, language),
+                "lines": len(lines),
+                "metrics": self.metrics_calculator.calculate_metrics(content, language, lines),
                 "structure": self.structure_analyzer.analyze(content, language),
-                "quality": self.quality_analyzer.analyze(content, language),
+                "quality": self.quality_analyzer.analyze(content, language, lines),
                 "summary": {},  # 将在最后填充
             }
             
@@ -116,26 +139,35 @@ class CodeAnalyzer:
             "top_large_files": []
         }
         
-        # 分析项目中的每个文件
+        # 收集项目中待分析的文件
+        candidates = []
+        sep = os.sep
         for root, dirs, files in os.walk(project_dir):
             # 排除指定目录
             dirs[:] = [d for d in dirs if d not in exclude_dirs]
+            # os.walk给出的root均为目录，直接拼接文件名即可；仅顶层目录可能自带结尾分隔符
+            prefix = root if root.endswith(sep) else root + sep
             
             for file in files:
-                file_path = os.path.join(root, file)
-                language = detect_language_by_extension(Path(file).suffix)
+                # 直接从文件名截取扩展名查表，不为每个文件构造Path对象
+                dot = file.rfind('.')
+                language = EXTENSION_LANGUAGES.get(file[dot:].lower()) if dot > 0 else None
                 
                 if language:  # 只分析支持的文件类型
-                    file_result = self.analyze_file(file_path)
-                    if "error" not in file_result:
-                        results["files"].append(file_result)
-                        results["file_count"] += 1
-                        
-                        # 更新语言统计
-                        if language in results["language_stats"]:
-                            results["language_stats"][language] += 1
-                        else:
-                            results["language_stats"][language] = 1
+                    candidates.append((prefix + file, language))
+        
+        # 分析每个文件，结果顺序与遍历顺序一致
+        file_results = self._analyze_files([file_path for file_path, _ in candidates])
+        for (file_path, language), file_result in zip(candidates, file_results):
+            if "error" not in file_result:
+                results["files"].append(file_result)
+                results["file_count"] += 1
+                
+                # 更新语言统计
+                if language in results["language_stats"]:
+                    results["language_stats"][language] += 1
+                else:
+                    results["language_stats"][language] = 1
         
         # 生成项目摘要
         results["summary"] = generate_project_summary(results)
@@ -151,6 +183,36 @@ class CodeAnalyzer:
         
         return results
     
+    def _analyze_files(self, file_paths: List[str]) -> List[Dict[str, Any]]:
+        """
+        并行分析多个文件
+        
+        分析过程是纯CPU计算，文件较多时使用共享进程池绕开GIL；文件较少、进程池被禁用
+        （服务进程中，见 src.utils.process_pool）或无法使用工作进程时使用线程池，
+        文件读取期间会释放GIL，使不同文件的I/O相互重叠。
+        各分析组件不保存状态，可在线程间共享，也可序列化到工作进程。
+        
+        Args:
+            file_paths: 文件路径列表
+            
+        Returns:
+            List[Dict[str, Any]]: 与输入顺序一致的分析结果列表
+        """
+        if len(file_paths) < 2:
+            return [self.analyze_file(file_path) for file_path in file_paths]
+        
+        executor = process_pool.get_executor() if len(file_paths) >= PARALLEL_MIN_FILES else None
+        if executor is not None:
+            try:
+                return list(executor.map(self.analyze_file, file_paths,
+                                         chunksize=PARALLEL_CHUNKSIZE))
+            except (OSError, BrokenProcessPool, PicklingError):
+                # 无法创建或使用工作进程时回退为线程池
+                process_pool.discard(executor)
+        
+        with ThreadPoolExecutor(max_workers=min(IO_MAX_WORKERS, len(file_paths))) as executor:
+            return list(executor.map(self.analyze_file, file_paths))
+    
     def suggest_improvements(self, analysis_result: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         基于分析结果提供改进建议
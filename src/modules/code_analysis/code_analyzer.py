@@ -9,14 +9,54 @@
 
 import os
 import ast
+import hashlib
 import logging
-from typing import Dict, List, Any, Optional, Union
+import threading
+import weakref
+from collections import OrderedDict, deque
+from operator import attrgetter
+from concurrent.futures.process import BrokenProcessPool
+from pickle import PicklingError
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple
+
+from src.utils import process_pool
 
 logger = logging.getLogger(__name__)
 
+
+def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """复制分析结果，使调用方修改返回值时不影响缓存
+    
+    复制结果字典及其中的列表和字典（imports、functions、complexity等），
+    列表中的各项信息字典仍与缓存共享。
+    
+    Args:
+        result: 分析结果
+    
+    Returns:
+        Dict[str, Any]: 结果副本
+    """
+    copied = {}
+    for key, value in result.items():
+        if type(value) in (list, dict):
+            value = value.copy()
+        copied[key] = value
+    return copied
+
+
 class CodeAnalyzer:
     """代码分析器类"""
     
+    # 待分析文件数达到该值时使用多进程并行分析，文件较少时进程池的启动开销大于收益
+    PARALLEL_MIN_FILES = 32
+    # 每次派发给工作进程的文件数
+    PARALLEL_CHUNKSIZE = 16
+    # 分析结果缓存的最大条目数
+    CACHE_SIZE = 4096
+    
+    # AST节点具体类型到处理函数的分派表，类定义完成后构建
+    _DISPATCH: Dict[type, Callable[["CodeAnalyzer", ast.AST, Dict[str, Any]], None]] = {}
+    
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         """初始化代码分析器
         
@@ -24,11 +64,36 @@ class CodeAnalyzer:
             config: 配置参数
         """
         self.config = config or {}
+        # 是否对文档字符串做 inspect.cleandoc 清理（去除缩进和首尾空行），不需要时可关闭以省去清理开销
+        self.clean_docstrings = self.config.get("clean_docstrings", True)
+        
+        # 分析结果缓存：文件按路径缓存并以(修改时间ns, 大小)校验，代码片段按内容摘要缓存
+        self._cache: "OrderedDict[Any, Tuple[Any, Dict[str, Any]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # 按AST对象缓存提取结果，树被释放后条目自动移除
+        self._tree_results: "weakref.WeakKeyDictionary[ast.AST, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+        
         logger.info("代码分析器初始化完成")
     
+    def __getstate__(self):
+        """序列化到工作进程时不携带结果缓存和锁"""
+        state = self.__dict__.copy()
+        del state["_cache"]
+        del state["_cache_lock"]
+        del state["_tree_results"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._tree_results = weakref.WeakKeyDictionary()
+    
     def analyze_file(self, file_path: str) -> Dict[str, Any]:
         """分析单个文件
         
+        文件未变化（修改时间和大小均相同）时直接返回缓存的结果。
+        
         Args:
             file_path: 文件路径
         
@@ -38,10 +103,19 @@ class CodeAnalyzer:
         logger.info(f"分析文件: {file_path}")
         
         try:
+            stat = os.stat(file_path)
+            version = (stat.st_mtime_ns, stat.st_size)
+            cached = self._get_cached_result(file_path, version)
+            if cached is not None:
+                return cached
+            
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            return self.analyze_code(content, file_path)
+            result = self.analyze_code(content, file_path)
+            if "error" not in result:
+                self._store_cached_result(file_path, version, result)
+            return result
         except Exception as e:
             logger.error(f"分析文件失败: {file_path}, 错误: {str(e)}")
             return {
@@ -59,36 +133,25 @@ class CodeAnalyzer:
         Returns:
             Dict[str, Any]: 分析结果
         """
+        # 不带文件路径的代码片段按内容摘要缓存（带路径时由 analyze_file 按文件缓存）
+        cache_key = None
+        if not file_path:
+            cache_key = hashlib.blake2b(code.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+            cached = self._get_cached_result(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
             # 解析AST
             tree = ast.parse(code)
             
-            # 提取导入
-            imports = self._extract_imports(tree)
-            
-            # 提取函数
-            functions = self._extract_functions(tree)
-            
-            # 提取类
-            classes = self._extract_classes(tree)
-            
-            # 提取变量
-            variables = self._extract_variables(tree)
-            
-            # 计算复杂度
-            complexity = self._calculate_complexity(tree)
-            
-            # 构建结果
-            result = {
-                "imports": imports,
-                "functions": functions,
-                "classes": classes,
-                "variables": variables,
-                "complexity": complexity
-            }
+            # 单次遍历AST，提取导入、函数、类、变量并计算复杂度
+            result = self._extract_all(tree)
             
             if file_path:
                 result["file_path"] = file_path
+            elif cache_key is not None:
+                self._store_cached_result(cache_key, None, result)
             
             return result
         except Exception as e:
@@ -113,13 +176,9 @@ class CodeAnalyzer:
         
         logger.info(f"分析目录: {directory_path}")
         
-        results = {}
+        file_paths = list(self._iter_files(directory_path, tuple(file_extensions)))
         
-        for root, _, files in os.walk(directory_path):
-            for file in files:
-                if any(file.endswith(ext) for ext in file_extensions):
-                    file_path = os.path.join(root, file)
-                    results[file_path] = self.analyze_file(file_path)
+        results = dict(zip(file_paths, self._analyze_files(file_paths)))
         
         return {
             "directory_path": directory_path,
@@ -127,167 +186,305 @@ class CodeAnalyzer:
             "files": results
         }
     
-    def _extract_imports(self, tree: ast.Module) -> List[Dict[str, str]]:
-        """提取导入语句
+    def _iter_files(self, directory_path: str, file_extensions: Tuple[str, ...]) -> Iterator[str]:
+        """递归遍历目录中指定扩展名的文件
+        
+        基于 os.scandir 遍历，目录判断使用目录项缓存的类型信息，无需额外的stat调用。
+        与 os.walk 的顺序一致：先输出当前目录的文件，再依次进入子目录；不进入符号链接目录。
         
         Args:
-            tree: AST树
+            directory_path: 目录路径
+            file_extensions: 文件扩展名元组
         
-        Returns:
-            List[Dict[str, str]]: 导入语句列表
+        Yields:
+            str: 文件路径
         """
-        imports = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Import):
-                for name in node.names:
-                    imports.append({
-                        "type": "import",
-                        "name": name.name,
-                        "alias": name.asname
-                    })
-            elif isinstance(node, ast.ImportFrom):
-                module = node.module or ""
-                for name in node.names:
-                    imports.append({
-                        "type": "from",
-                        "module": module,
-                        "name": name.name,
-                        "alias": name.asname
-                    })
-        
-        return imports
+        subdirs = []
+        try:
+            with os.scandir(directory_path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                    elif entry.name.endswith(file_extensions):
+                        yield entry.path
+        except OSError:
+            return
+        
+        for subdir in subdirs:
+            yield from self._iter_files(subdir, file_extensions)
     
-    def _extract_functions(self, tree: ast.Module) -> List[Dict[str, Any]]:
-        """提取函数定义
+    def _analyze_files(self, file_paths: List[str]) -> List[Dict[str, Any]]:
+        """批量分析文件，未变化的文件直接使用缓存结果
         
         Args:
-            tree: AST树
+            file_paths: 文件路径列表
         
         Returns:
-            List[Dict[str, Any]]: 函数定义列表
+            List[Dict[str, Any]]: 与输入顺序一致的分析结果列表
         """
-        functions = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                # 获取函数参数
-                args = []
-                for arg in node.args.args:
-                    args.append(arg.arg)
-                
-                # 获取函数文档字符串
-                docstring = ast.get_docstring(node)
-                
-                functions.append({
-                    "name": node.name,
-                    "args": args,
-                    "docstring": docstring,
-                    "line": node.lineno,
-                    "end_line": node.end_lineno
-                })
-        
-        return functions
+        # 未变化的文件直接使用缓存结果，只分析其余文件
+        results: List[Optional[Dict[str, Any]]] = []
+        pending: List[Tuple[int, str, Optional[Tuple[int, int]]]] = []
+        for file_path in file_paths:
+            try:
+                stat = os.stat(file_path)
+                version = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                version = None
+            cached = self._get_cached_result(file_path, version) if version else None
+            if cached is None:
+                pending.append((len(results), file_path, version))
+            results.append(cached)
+        
+        analyzed = self._run_analysis([file_path for _, file_path, _ in pending])
+        for (index, file_path, version), result in zip(pending, analyzed):
+            results[index] = result
+            # 工作进程中的缓存不会带回，在当前进程中补充缓存
+            if version and "error" not in result:
+                self._store_cached_result(file_path, version, result)
+        
+        return results
     
-    def _extract_classes(self, tree: ast.Module) -> List[Dict[str, Any]]:
-        """提取类定义
+    def _run_analysis(self, file_paths: List[str]) -> List[Dict[str, Any]]:
+        """分析文件列表，文件较多时使用共享进程池并行
+        
+        配置项 workers 为1或进程池被禁用（服务进程中，见 src.utils.process_pool）时
+        在当前进程内串行分析。
         
         Args:
-            tree: AST树
+            file_paths: 文件路径列表
         
         Returns:
-            List[Dict[str, Any]]: 类定义列表
+            List[Dict[str, Any]]: 与输入顺序一致的分析结果列表
         """
-        classes = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                # 获取基类
-                bases = []
-                for base in node.bases:
-                    if isinstance(base, ast.Name):
-                        bases.append(base.id)
-                
-                # 获取类文档字符串
-                docstring = ast.get_docstring(node)
-                
-                # 获取类方法
-                methods = []
-                for item in node.body:
-                    if isinstance(item, ast.FunctionDef):
-                        methods.append(item.name)
-                
-                classes.append({
-                    "name": node.name,
-                    "bases": bases,
-                    "methods": methods,
-                    "docstring": docstring,
-                    "line": node.lineno,
-                    "end_line": node.end_lineno
-                })
-        
-        return classes
+        executor = None
+        if len(file_paths) >= self.PARALLEL_MIN_FILES and self.config.get("workers") != 1:
+            executor = process_pool.get_executor()
+        if executor is not None:
+            try:
+                return list(executor.map(self.analyze_file, file_paths,
+                                         chunksize=self.PARALLEL_CHUNKSIZE))
+            except (OSError, BrokenProcessPool, PicklingError):
+                # 无法创建或使用工作进程时回退为串行分析
+                logger.warning("无法使用多进程分析，回退为串行分析")
+                process_pool.discard(executor)
+        
+        return [self.analyze_file(file_path) for file_path in file_paths]
     
-    def _extract_variables(self, tree: ast.Module) -> List[Dict[str, str]]:
-        """提取变量定义
+    def _get_cached_result(self, key: Any, version: Any = None) -> Optional[Dict[str, Any]]:
+        """获取缓存的分析结果
         
         Args:
-            tree: AST树
+            key: 缓存键（文件路径或代码内容摘要）
+            version: 校验值，与缓存时的值不一致时视为未命中
         
         Returns:
-            List[Dict[str, str]]: 变量定义列表
+            Optional[Dict[str, Any]]: 缓存的分析结果副本，未命中时返回None
         """
-        variables = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name):
-                        variables.append({
-                            "name": target.id,
-                            "line": node.lineno
-                        })
-        
-        return variables
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._cache.move_to_end(key)
+        return _copy_result(entry[1])
+    
+    def _store_cached_result(self, key: Any, version: Any, result: Dict[str, Any]) -> None:
+        """缓存分析结果的副本，超出容量时淘汰最久未使用的条目"""
+        result = _copy_result(result)
+        with self._cache_lock:
+            self._cache[key] = (version, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
     
-    def _calculate_complexity(self, tree: ast.Module) -> Dict[str, Union[int, float]]:
-        """计算代码复杂度
+    def _extract_all(self, tree: ast.Module) -> Dict[str, Any]:
+        """单次遍历AST，提取导入、函数、类、变量并计算复杂度
+        
+        每个节点按其具体类型在类级分派表 _DISPATCH 中查找处理函数，只分派一次。
+        同一棵树的结果缓存在 _tree_results 中，重复调用时不再遍历；返回的是缓存结果的副本。
         
         Args:
             tree: AST树
         
         Returns:
-            Dict[str, Union[int, float]]: 复杂度指标
+            Dict[str, Any]: 包含imports、functions、classes、variables和complexity的结果
         """
-        # 计算循环和条件语句数量
-        loops = 0
-        conditions = 0
-        function_count = 0
-        class_count = 0
-        line_count = 0
-        
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.For, ast.While)):
-                loops += 1
-            elif isinstance(node, (ast.If, ast.IfExp)):
-                conditions += 1
-            elif isinstance(node, ast.FunctionDef):
-                function_count += 1
-            elif isinstance(node, ast.ClassDef):
-                class_count += 1
+        cached = self._tree_results.get(tree)
+        if cached is not None:
+            return _copy_result(cached)
+        
+        results = {
+            "imports": [],
+            "functions": [],
+            "classes": [],
+            "variables": [],
+            "complexity": {
+                "loops": 0,
+                "conditions": 0,
+                "functions": 0,
+                "classes": 0,
+                "lines": 0,
+                "cyclomatic_complexity": 1
+            }
+        }
+        
+        # 内联广度优先遍历（与 ast.walk 顺序一致），省去生成器的逐节点开销；
+        # 名称、常量、上下文和运算符等叶子节点不入队，它们不含任何需要处理的节点
+        dispatch = self._DISPATCH
+        skip_types = _LEAF_NODE_TYPES
+        AST = ast.AST
+        queue = deque([tree])
+        popleft = queue.popleft
+        append = queue.append
+        while queue:
+            node = popleft()
+            handler = dispatch.get(type(node))
+            if handler:
+                handler(self, node, results)
+            for field in node._fields:
+                value = getattr(node, field, None)
+                if type(value) is list:
+                    for item in value:
+                        if isinstance(item, AST) and type(item) not in skip_types:
+                            append(item)
+                elif isinstance(value, AST) and type(value) not in skip_types:
+                    append(value)
+        
+        complexity = results["complexity"]
         
         # 计算行数
         if hasattr(tree, 'end_lineno'):
-            line_count = tree.end_lineno
+            complexity["lines"] = tree.end_lineno
         
         # 计算圈复杂度
-        cyclomatic_complexity = 1 + conditions
+        complexity["cyclomatic_complexity"] = 1 + complexity["conditions"]
         
-        return {
-            "loops": loops,
-            "conditions": conditions,
-            "functions": function_count,
-            "classes": class_count,
-            "lines": line_count,
-            "cyclomatic_complexity": cyclomatic_complexity
-        } 
\ No newline at end of file
+        self._tree_results[tree] = results
+        return _copy_result(results)
+    
+    def _handle_import(self, node: ast.Import, results: Dict[str, Any]) -> None:
+        """处理import语句"""
+        imports = results["imports"]
+        for name in node.names:
+            imports.append({
+                "type": "import",
+                "name": name.name,
+                "alias": name.asname
+            })
+    
+    def _handle_import_from(self, node: ast.ImportFrom, results: Dict[str, Any]) -> None:
+        """处理from ... import语句"""
+        imports = results["imports"]
+        module = node.module or ""
+        for name in node.names:
+            imports.append({
+                "type": "from",
+                "module": module,
+                "name": name.name,
+                "alias": name.asname
+            })
+    
+    def _handle_function(self, node: ast.FunctionDef, results: Dict[str, Any]) -> None:
+        """处理函数定义"""
+        # 获取函数参数（按签名顺序：仅位置参数、普通参数、*args、仅关键字参数、**kwargs）
+        arguments = node.args
+        args = list(map(_get_arg_name, arguments.posonlyargs))
+        args.extend(map(_get_arg_name, arguments.args))
+        if arguments.vararg:
+            args.append(arguments.vararg.arg)
+        args.extend(map(_get_arg_name, arguments.kwonlyargs))
+        if arguments.kwarg:
+            args.append(arguments.kwarg.arg)
+        
+        # 获取函数文档字符串
+        docstring = ast.get_docstring(node, clean=self.clean_docstrings)
+        
+        results["functions"].append({
+            "name": node.name,
+            "args": args,
+            "docstring": docstring,
+            "line": node.lineno,
+            "end_line": node.end_lineno
+        })
+        results["complexity"]["functions"] += 1
+    
+    def _handle_class(self, node: ast.ClassDef, results: Dict[str, Any]) -> None:
+        """处理类定义"""
+        # 获取基类
+        bases = [base.id for base in node.bases if type(base) is ast.Name]
+        
+        # 获取类文档字符串
+        docstring = ast.get_docstring(node, clean=self.clean_docstrings)
+        
+        # 获取类方法
+        methods = [item.name for item in node.body if type(item) in _FUNCTION_TYPES]
+        
+        results["classes"].append({
+            "name": node.name,
+            "bases": bases,
+            "methods": methods,
+            "docstring": docstring,
+            "line": node.lineno,
+            "end_line": node.end_lineno
+        })
+        results["complexity"]["classes"] += 1
+    
+    def _handle_assign(self, node: ast.Assign, results: Dict[str, Any]) -> None:
+        """处理赋值语句，记录赋值给名称的变量（含元组/列表解包中的名称）"""
+        variables = results["variables"]
+        # 按源码顺序展开解包目标
+        targets = list(reversed(node.targets))
+        while targets:
+            target = targets.pop()
+            target_type = type(target)
+            if target_type is ast.Name:
+                variables.append({
+                    "name": target.id,
+                    "line": node.lineno
+                })
+            elif target_type is ast.Tuple or target_type is ast.List:
+                targets.extend(reversed(target.elts))
+            elif target_type is ast.Starred:
+                targets.append(target.value)
+    
+    def _handle_loop(self, node: ast.AST, results: Dict[str, Any]) -> None:
+        """处理for/async for/while循环"""
+        results["complexity"]["loops"] += 1
+    
+    def _handle_condition(self, node: ast.AST, results: Dict[str, Any]) -> None:
+        """处理if语句和条件表达式"""
+        results["complexity"]["conditions"] += 1
+
+
+# 遍历时不入队的叶子节点类型：名称、常量、导入别名，以及上下文和各类运算符
+_LEAF_NODE_TYPES = frozenset(
+    [ast.Name, ast.Constant, ast.alias]
+    + [cls for base in (ast.expr_context, ast.operator, ast.unaryop, ast.cmpop, ast.boolop)
+       for cls in base.__subclasses__()]
+)
+
+# 取参数节点的名称
+_get_arg_name = attrgetter("arg")
+
+# 函数定义节点类型（含异步函数）
+_FUNCTION_TYPES = frozenset({ast.FunctionDef, ast.AsyncFunctionDef})
+
+# 分派表在模块导入时构建一次；同步/异步函数、For/AsyncFor/While、If/IfExp 分别注册到同一处理函数
+CodeAnalyzer._DISPATCH = {
+    ast.Import: CodeAnalyzer._handle_import,
+    ast.ImportFrom: CodeAnalyzer._handle_import_from,
+    ast.FunctionDef: CodeAnalyzer._handle_function,
+    ast.AsyncFunctionDef: CodeAnalyzer._handle_function,
+    ast.ClassDef: CodeAnalyzer._handle_class,
+    ast.Assign: CodeAnalyzer._handle_assign,
+    ast.For: CodeAnalyzer._handle_loop,
+    ast.AsyncFor: CodeAnalyzer._handle_loop,
+    ast.While: CodeAnalyzer._handle_loop,
+    ast.If: CodeAnalyzer._handle_condition,
+    ast.IfExp: CodeAnalyzer._handle_condition,
+}
@@ -3,10 +3,104 @@
 """
 
 import re
-from typing import Dict, Any
+from collections import Counter
+from typing import Dict, Any, List, Optional
 
 from src.modules.code_analysis.utils import count_comment_lines
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = NUMPY_AVAILABLE
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# 各语言作为决策点的关键字（整词匹配）
+_C_STYLE_DECISION_KEYWORDS = frozenset(["if", "for", "while", "catch", "case"])
+DECISION_KEYWORDS = {
+    "python": frozenset(["if", "for", "while", "elif", "with", "and", "or"]),
+    "javascript": _C_STYLE_DECISION_KEYWORDS,
+    "typescript": _C_STYLE_DECISION_KEYWORDS,
+    "java": _C_STYLE_DECISION_KEYWORDS,
+    "cpp": _C_STYLE_DECISION_KEYWORDS,
+    "csharp": _C_STYLE_DECISION_KEYWORDS,
+    "go": frozenset(["if", "for", "select", "switch", "case"]),
+}
+
+# C风格语言中两侧紧贴单词的 &&、||、? 也计为决策点
+_C_STYLE_LANGUAGES = frozenset(["javascript", "typescript", "java", "cpp", "csharp"])
+_C_STYLE_DECISION_RE = re.compile(r'\b(?:&&|\|\||\?)\b')
+
+# Halstead操作符中的单字符符号
+_OPERATOR_CHARS = "+-*/=<>!&|%^()[]{}"
+
+_WORD_RE = re.compile(r'\w+')
+# 超过该长度的内容按行边界分块切分单词，限制临时单词列表的内存占用
+_WORD_SCAN_CHUNK_SIZE = 1 << 20
+# 以关键字结尾的单词计为该关键字操作符；前缀惰性匹配，使 for 优先于 or
+_KEYWORD_SUFFIX_RE = re.compile(r'^\w*?(while|for|and|not|or|if)$', re.MULTILINE)
+_NON_ASCII_WORD_RE = re.compile(r'^.*[^\x00-\x7f].*$', re.MULTILINE)
+_ASCII_WORD_RE = re.compile(r'[a-zA-Z0-9_]+')
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _nesting_depth_bytes(buf, is_python):
+        """
+        在UTF-8字节数组上逐字节计算巢状深度，与 MetricsCalculator._calculate_nesting_depth 结果一致
+        
+        Python模式按缩进计算（要求内容为ASCII），其他语言按花括号计算，深度在每行末尾取最大值。
+        """
+        n = buf.shape[0]
+        max_depth = 0
+        current_depth = 0
+        
+        if is_python:
+            indentation_stack = np.empty(n + 1, np.int64)
+            indentation_stack[0] = 0
+            top = 0
+            start = 0
+            while start <= n:
+                # 跳过行首空白（与 str.strip 的ASCII空白一致）
+                pos = start
+                while pos < n and buf[pos] != 10 and (buf[pos] == 32 or 9 <= buf[pos] <= 13 or 28 <= buf[pos] <= 31):
+                    pos += 1
+                indentation = pos - start
+                blank = pos >= n or buf[pos] == 10
+                while pos < n and buf[pos] != 10:
+                    pos += 1
+                
+                if not blank:
+                    if indentation > indentation_stack[top]:
+                        top += 1
+                        indentation_stack[top] = indentation
+                        current_depth += 1
+                    elif indentation < indentation_stack[top]:
+                        while top >= 0 and indentation < indentation_stack[top]:
+                            top -= 1
+                            current_depth -= 1
+                        if top < 0:
+                            top = 0
+                            indentation_stack[0] = 0
+                    if current_depth > max_depth:
+                        max_depth = current_depth
+                start = pos + 1
+        else:
+            # 无分支写法：比较结果直接参与加减，非换行位置取0（max_depth不小于0，不影响结果），
+            # 花括号位置不可预测时避免分支预测失败
+            for i in range(n):
+                c = buf[i]
+                current_depth += (c == 123) - (c == 125)
+                max_depth = max(max_depth, current_depth if c == 10 else 0)
+            max_depth = max(max_depth, current_depth)
+        
+        return max_depth
+
+
 class MetricsCalculator:
     """代码度量计算器，负责计算各种代码度量指标"""
     
@@ -14,26 +108,34 @@ class MetricsCalculator:
         """初始化度量计算器"""
         pass
     
-    def calculate_metrics(self, content: str, language: str) -> Dict[str, Any]:
+    def calculate_metrics(self, content: str, language: str,
+                          split_lines: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         计算代码度量指标
         
         Args:
             content: 代码内容
             language: 编程语言
+            split_lines: 可选，按换行符切分后的行列表，未提供时重新切分
             
         Returns:
             Dict[str, Any]: 度量指标结果
         """
-        lines = content.count('\n') + 1
-        non_blank_lines = len([line for line in content.split('\n') if line.strip()])
+        # 只切分一次：行数即切分结果的长度，空白行由 strip 后为空的行数得到
+        if split_lines is None:
+            split_lines = content.split('\n')
+        lines = len(split_lines)
+        non_blank_lines = lines - list(map(str.strip, split_lines)).count('')
         comment_lines = count_comment_lines(content, language)
         
+        # 一次扫描得到决策点与操作符/操作数统计，供复杂度和Halstead度量共用
+        tokens = self._tokenize(content, language)
+        
         # 计算复杂度
-        complexity = self.calculate_complexity(content, language)
+        complexity = self.calculate_complexity(content, language, tokens)
         
         # 计算其他指标
-        halstead = self.calculate_halstead_metrics(content, language)
+        halstead = self.calculate_halstead_metrics(content, language, tokens)
         maintainability = self.calculate_maintainability_index(complexity, halstead, lines)
         
         return {
@@ -46,32 +148,104 @@ class MetricsCalculator:
             "maintainability": maintainability
         }
     
-    def calculate_complexity(self, content: str, language: str) -> Dict[str, Any]:
+    def _tokenize(self, content: str, language: str) -> Dict[str, int]:
+        """
+        扫描代码，统计决策点及Halstead操作符、操作数
+        
+        只用一次正则切分出全部单词并按单词计数，决策点、关键字操作符和操作数
+        均由去重后的单词得到；符号操作符直接用 str.count 统计。
+        
+        Args:
+            content: 代码内容
+            language: 编程语言
+            
+        Returns:
+            Dict[str, int]: 决策点数、操作符/操作数的总数及不同种类数
+        """
+        words = self._count_words(content)
+        
+        # 决策点：整词匹配的关键字
+        decision_keywords = DECISION_KEYWORDS.get(language, ())
+        decision_points = sum(words[keyword] for keyword in decision_keywords if keyword in words)
+        if language in _C_STYLE_LANGUAGES:
+            decision_points += len(_C_STYLE_DECISION_RE.findall(content))
+        
+        # 操作符：单字符符号及位于单词末尾的关键字
+        operators: Dict[str, int] = {}
+        for char in _OPERATOR_CHARS:
+            count = content.count(char)
+            if count:
+                operators[char] = count
+        
+        # 去重后的单词每行一个，后续匹配只需扫描一遍不同的单词
+        joined = "\n".join(words)
+        for match in _KEYWORD_SUFFIX_RE.finditer(joined):
+            keyword = match.group(1)
+            operators[keyword] = operators.get(keyword, 0) + words[match.group(0)]
+        
+        # 操作数：ASCII字母数字及下划线组成的连续字符，含非ASCII字符的单词按其中的ASCII片段计
+        operand_count = sum(words.values())
+        if joined.isascii():
+            distinct_operands = len(words)
+        else:
+            distinct_operands = len(set(_ASCII_WORD_RE.findall(joined)))
+            for match in _NON_ASCII_WORD_RE.finditer(joined):
+                word = match.group(0)
+                operand_count += words[word] * (len(_ASCII_WORD_RE.findall(word)) - 1)
+        
+        return {
+            "decision_points": decision_points,
+            "operator_count": sum(operators.values()),
+            "distinct_operators": len(operators),
+            "operand_count": operand_count,
+            "distinct_operands": distinct_operands,
+        }
+    
+    @staticmethod
+    def _count_words(content: str) -> Counter:
+        """
+        统计内容中每个单词的出现次数
+        
+        单词不会跨越换行符，大文件按行边界分块统计，结果与整体切分一致。
+        
+        Args:
+            content: 代码内容
+            
+        Returns:
+            Counter: 单词计数
+        """
+        if len(content) <= _WORD_SCAN_CHUNK_SIZE:
+            return Counter(_WORD_RE.findall(content))
+        
+        words = Counter()
+        start = 0
+        length = len(content)
+        while start < length:
+            end = content.find('\n', start + _WORD_SCAN_CHUNK_SIZE)
+            if end == -1:
+                end = length
+            words.update(_WORD_RE.findall(content, start, end))
+            start = end + 1
+        return words
+    
+    def calculate_complexity(self, content: str, language: str,
+                             tokens: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """
         计算代码复杂度指标
         
         Args:
             content: 代码内容
             language: 编程语言
+            tokens: 可选，_tokenize 的统计结果，未提供时重新扫描
             
         Returns:
             Dict[str, Any]: 复杂度指标
         """
-        # 计算圈复杂度：决策点 + 1
-        decision_points = 0
+        if tokens is None:
+            tokens = self._tokenize(content, language)
         
-        if language == "python":
-            # Python的决策点
-            decision_points = len(re.findall(r'\bif\b|\bfor\b|\bwhile\b|\belif\b|\bwith\b|\band\b|\bor\b', content))
-        elif language in ["javascript", "typescript", "java", "cpp", "csharp"]:
-            # C风格语言的决策点
-            decision_points = len(re.findall(r'\bif\b|\bfor\b|\bwhile\b|\b&&\b|\b\|\|\b|\b\?\b|\bcatch\b|\bcase\b', content))
-        elif language == "go":
-            # Go语言的决策点
-            decision_points = len(re.findall(r'\bif\b|\bfor\b|\bselect\b|\bswitch\b|\bcase\b', content))
-        
-        # 圈复杂度
-        cyclomatic_complexity = decision_points + 1
+        # 计算圈复杂度：决策点 + 1
+        cyclomatic_complexity = tokens["decision_points"] + 1
         
         # 巢状深度
         nesting_depth = self._calculate_nesting_depth(content, language)
@@ -92,6 +266,16 @@ class MetricsCalculator:
         Returns:
             int: 巢状深度
         """
+        # 安装numba时使用编译后的逐字节实现；按缩进计算时仅处理ASCII内容，保证空白判断一致
+        is_python = language == "python"
+        if NUMBA_AVAILABLE and (not is_python or content.isascii()):
+            buf = np.frombuffer(content.encode("utf-8", "surrogatepass"), dtype=np.uint8)
+            return int(_nesting_depth_bytes(buf, is_python))
+        
+        # 基于花括号的语言可用NumPy向量化：累加每个字节的深度变化，在各行末尾取最大值
+        if NUMPY_AVAILABLE and not is_python:
+            return self._brace_depth_numpy(content)
+        
         # 简化的巢状深度计算
         lines = content.split('\n')
         max_depth = 0
@@ -135,13 +319,38 @@ class MetricsCalculator:
         
         return max_depth
     
-    def calculate_halstead_metrics(self, content: str, language: str) -> Dict[str, Any]:
+    @staticmethod
+    def _brace_depth_numpy(content: str) -> int:
+        """
+        使用NumPy计算基于花括号的巢状深度，与逐行计数的结果一致
+        
+        Args:
+            content: 代码内容
+            
+        Returns:
+            int: 巢状深度
+        """
+        buf = np.frombuffer(content.encode("utf-8", "surrogatepass"), dtype=np.uint8)
+        if buf.size == 0:
+            return 0
+        
+        delta = (buf == 123).astype(np.int32)  # '{'
+        delta -= buf == 125                    # '}'
+        depth = np.cumsum(delta, dtype=np.int32)
+        
+        # 换行符本身不改变深度，其位置的累计值即该行结束时的深度；最后一行取末尾的值
+        line_end_depths = depth[np.flatnonzero(buf == 10)]
+        return max(int(line_end_depths.max(initial=0)), int(depth[-1]))
+    
+    def calculate_halstead_metrics(self, content: str, language: str,
+                                   tokens: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """
         计算Halstead度量指标
         
         Args:
             content: 代码内容
             language: 编程语言
+            tokens: 可选，_tokenize 的统计结果，未提供时重新扫描
             
         Returns:
             Dict[str, Any]: Halstead度量结果
@@ -149,19 +358,16 @@ class MetricsCalculator:
         # 简化的Halstead度量计算
         # 实际实现中，应该根据不同语言精确识别操作符和操作数
         
-        # 假设操作符包括：+, -, *, /, =, ==, !=, <, >, <=, >=, (, ), [, ], {, }, and, or, not等
-        # 简化的实现，仅计算部分常见操作符
-        operators = re.findall(r'[\+\-\*/=<>!&\|%\^\(\)\[\]\{\}]|and\b|or\b|not\b|if\b|for\b|while\b', content)
-        
-        # 假设操作数包括变量名、常量值等
-        # 简化的实现，使用非空白非操作符的连续字符作为操作数
-        operands = re.findall(r'[a-zA-Z0-9_]+', content)
+        # 操作符包括：+, -, *, /, =, <, >, !, (, ), [, ], {, } 等符号，以及 and, or, not, if, for, while
+        # 操作数为字母数字及下划线组成的连续字符
+        if tokens is None:
+            tokens = self._tokenize(content, language)
         
         # 统计不同的操作符和操作数
-        n1 = len(set(operators))  # 不同操作符的数量
-        n2 = len(set(operands))   # 不同操作数的数量
-        N1 = len(operators)       # 操作符出现的总次数
-        N2 = len(operands)        # 操作数出现的总次数
+        n1 = tokens["distinct_operators"]  # 不同操作符的数量
+        n2 = tokens["distinct_operands"]   # 不同操作数的数量
+        N1 = tokens["operator_count"]      # 操作符出现的总次数
+        N2 = tokens["operand_count"]       # 操作数出现的总次数
         
         # 防止除零错误
         if n1 == 0 or n2 == 0:
@@ -3,11 +3,23 @@
 """
 
 import re
-from typing import Dict, Any, List
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.modules.code_analysis.utils import newline_offsets, offset_to_line
 
 class QualityAnalyzer:
     """代码质量分析器，负责分析代码质量、风格规范和潜在问题"""
     
+    # 命名、文档字符串等检查使用的正则，类加载时编译一次
+    _PY_VAR_RE = re.compile(r"([a-zA-Z0-9_]+)\s*=")
+    _PY_FUNC_RE = re.compile(r"def\s+([a-zA-Z0-9_]+)\s*\(")
+    _PY_NO_DOCSTRING_RE = re.compile(r"def\s+[a-zA-Z0-9_]+\s*\([^)]*\):\s*(?:\n\s*(?!\"\"\")|$)")
+    _PY_COMMENT_BLOCK_RE = re.compile(r"((?:(?:\s*#[^\n]*\n)+))")
+    _JS_VAR_RE = re.compile(r"(?:var|let|const)\s+([a-zA-Z0-9_$]+)\s*=")
+    _JS_FUNC_RE = re.compile(r"function\s+([a-zA-Z0-9_$]+)\s*\(")
+    _JS_FETCH_RE = re.compile(r"fetch\([^)]+\)\.then\([^)]+\)(?!\s*\.catch)")
+    
     def __init__(self):
         """初始化质量分析器"""
         # 代码风格规则
@@ -39,14 +51,23 @@ class QualityAnalyzer:
                 {"pattern": r"try\s*{.*}\s*catch\s*\(\s*\)\s*{", "description": "过于宽泛的异常捕获"}
             ]
         }
+        
+        # 预编译规则中的正则，检查时直接使用编译后的对象
+        for rule_sets in (self.style_rules, self.common_issues):
+            for rules in rule_sets.values():
+                for rule in rules:
+                    if "pattern" in rule:
+                        rule["compiled"] = re.compile(rule["pattern"])
     
-    def analyze(self, content: str, language: str) -> Dict[str, Any]:
+    def analyze(self, content: str, language: str,
+                lines: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         分析代码质量
         
         Args:
             content: 代码内容
             language: 编程语言
+            lines: 可选，按换行符切分后的行列表，未提供时重新切分
             
         Returns:
             Dict[str, Any]: 代码质量分析结果
@@ -54,14 +75,20 @@ class QualityAnalyzer:
         if not content:
             return {"issues": [], "style": {"score": 0}, "problems": []}
             
+        # 换行符位置只计算一次，匹配位置到行号的换算改为二分查找
+        newlines = newline_offsets(content)
+        # 行列表只切分一次，供样式检查和重复检测共用
+        if lines is None:
+            lines = content.split('\n')
+        
         # 检查样式问题
-        style_issues = self._check_style(content, language)
+        style_issues = self._check_style(content, language, newlines, lines)
         
         # 检查潜在问题
-        potential_problems = self._check_issues(content, language)
+        potential_problems = self._check_issues(content, language, newlines)
         
         # 检查代码重复
-        duplicates = self._check_duplicates(content)
+        duplicates = self._check_duplicates(content, lines)
         
         # 计算质量分数
         quality_score = self._calculate_quality_score(content, style_issues, potential_problems, duplicates)
@@ -80,13 +107,17 @@ class QualityAnalyzer:
             }
         }
     
-    def _check_style(self, content: str, language: str) -> List[Dict[str, Any]]:
+    def _check_style(self, content: str, language: str,
+                     newlines: Optional[List[int]] = None,
+                     lines: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         检查代码风格问题
         
         Args:
             content: 代码内容
             language: 编程语言
+            newlines: 可选，换行符位置列表，未提供时重新计算
+            lines: 可选，按换行符切分后的行列表，未提供时重新切分
             
         Returns:
             List[Dict[str, Any]]: 风格问题列表
@@ -97,8 +128,11 @@ class QualityAnalyzer:
         rules = self.style_rules.get(language, [])
         if not rules:
             return issues
-            
-        lines = content.split('\n')
+        
+        if newlines is None:
+            newlines = newline_offsets(content)
+        if lines is None:
+            lines = content.split('\n')
         
         for i, line in enumerate(lines):
             line_number = i + 1
@@ -116,20 +150,18 @@ class QualityAnalyzer:
         # 检查命名规范（变量、函数）
         if language == "python":
             # 简单的变量和函数定义匹配
-            var_pattern = r"([a-zA-Z0-9_]+)\s*="
-            func_pattern = r"def\s+([a-zA-Z0-9_]+)\s*\("
+            snake_rule = next((r for r in rules if r["name"] == "snake_case"), None)
             
-            for pattern in [var_pattern, func_pattern]:
-                for match in re.finditer(pattern, content):
+            for pattern in [self._PY_VAR_RE, self._PY_FUNC_RE]:
+                for match in pattern.finditer(content):
                     name = match.group(1)
                     if name.startswith('__') or name.startswith('_'):
                         continue  # 跳过特殊和私有名称
                         
-                    line_number = content[:match.start()].count('\n') + 1
+                    line_number = offset_to_line(newlines, match.start())
                     
                     # 检查蛇形命名法
-                    snake_rule = next((r for r in rules if r["name"] == "snake_case"), None)
-                    if snake_rule and not re.match(snake_rule["pattern"], name):
+                    if snake_rule and not self._is_snake_case(name):
                         issues.append({
                             "line": line_number,
                             "message": f"'{name}' 不符合蛇形命名法规范",
@@ -139,17 +171,15 @@ class QualityAnalyzer:
         
         elif language in ["javascript", "typescript"]:
             # 检查变量命名
-            var_pattern = r"(?:var|let|const)\s+([a-zA-Z0-9_$]+)\s*="
-            func_pattern = r"function\s+([a-zA-Z0-9_$]+)\s*\("
+            camel_rule = next((r for r in rules if r["name"] == "camelCase"), None)
             
-            for pattern in [var_pattern, func_pattern]:
-                for match in re.finditer(pattern, content):
+            for pattern in [self._JS_VAR_RE, self._JS_FUNC_RE]:
+                for match in pattern.finditer(content):
                     name = match.group(1)
-                    line_number = content[:match.start()].count('\n') + 1
+                    line_number = offset_to_line(newlines, match.start())
                     
                     # 检查驼峰命名法
-                    camel_rule = next((r for r in rules if r["name"] == "camelCase"), None)
-                    if camel_rule and not re.match(camel_rule["pattern"], name):
+                    if camel_rule and not self._is_camel_case(name):
                         issues.append({
                             "line": line_number,
                             "message": f"'{name}' 不符合驼峰命名法规范",
@@ -160,9 +190,8 @@ class QualityAnalyzer:
         # 检查文档字符串
         if language == "python":
             # 简单检查函数和类是否有文档字符串
-            func_pattern = r"def\s+[a-zA-Z0-9_]+\s*\([^)]*\):\s*(?:\n\s*(?!\"\"\")|$)"
-            for match in re.finditer(func_pattern, content):
-                line_number = content[:match.end()].count('\n') + 1
+            for match in self._PY_NO_DOCSTRING_RE.finditer(content):
+                line_number = offset_to_line(newlines, match.end())
                 issues.append({
                     "line": line_number,
                     "message": "函数缺少文档字符串",
@@ -172,13 +201,47 @@ class QualityAnalyzer:
         
         return issues
     
-    def _check_issues(self, content: str, language: str) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _is_snake_case(name: str) -> bool:
+        """
+        判断名称是否符合蛇形命名法
+        
+        名称由 _PY_VAR_RE/_PY_FUNC_RE 匹配得到，只含ASCII字母、数字和下划线，
+        此时与规则 ^[a-z][a-z0-9_]*$ 等价：首字符为小写字母且不含大写字母。
+        
+        Args:
+            name: 变量名或函数名
+            
+        Returns:
+            bool: 是否符合
+        """
+        return name[0].islower() and name.islower()
+    
+    @staticmethod
+    def _is_camel_case(name: str) -> bool:
+        """
+        判断名称是否符合驼峰命名法
+        
+        名称由 _JS_VAR_RE/_JS_FUNC_RE 匹配得到，只含ASCII字母、数字、下划线和$，
+        此时与规则 ^[a-z][a-zA-Z0-9]*$ 等价：首字符为小写字母且只含字母和数字。
+        
+        Args:
+            name: 变量名或函数名
+            
+        Returns:
+            bool: 是否符合
+        """
+        return name[0].islower() and name.isalnum()
+    
+    def _check_issues(self, content: str, language: str,
+                      newlines: Optional[List[int]] = None) -> List[Dict[str, Any]]:
         """
         检查代码中的潜在问题
         
         Args:
             content: 代码内容
             language: 编程语言
+            newlines: 可选，换行符位置列表，未提供时重新计算
             
         Returns:
             List[Dict[str, Any]]: 潜在问题列表
@@ -189,11 +252,14 @@ class QualityAnalyzer:
         rules = self.common_issues.get(language, [])
         if not rules:
             return issues
+        
+        if newlines is None:
+            newlines = newline_offsets(content)
             
         # 检查每条规则
         for rule in rules:
-            for match in re.finditer(rule["pattern"], content):
-                line_number = content[:match.start()].count('\n') + 1
+            for match in rule["compiled"].finditer(content):
+                line_number = offset_to_line(newlines, match.start())
                 issues.append({
                     "line": line_number,
                     "message": rule["description"],
@@ -204,12 +270,12 @@ class QualityAnalyzer:
         # 检查其他常见问题
         if language == "python":
             # 检查大量连续注释但无代码的区域
-            comment_blocks = re.finditer(r"((?:(?:\s*#[^\n]*\n)+))", content)
+            comment_blocks = self._PY_COMMENT_BLOCK_RE.finditer(content)
             for match in comment_blocks:
                 block = match.group(1)
                 lines = block.count('\n')
                 if lines > 5:  # 超过5行连续注释
-                    line_number = content[:match.start()].count('\n') + 1
+                    line_number = offset_to_line(newlines, match.start())
                     issues.append({
                         "line": line_number,
                         "message": f"大段注释代码 ({lines} 行)，考虑重构或清理",
@@ -219,9 +285,8 @@ class QualityAnalyzer:
         
         elif language in ["javascript", "typescript"]:
             # 检查网络请求后没有错误处理
-            fetch_pattern = r"fetch\([^)]+\)\.then\([^)]+\)(?!\s*\.catch)"
-            for match in re.finditer(fetch_pattern, content):
-                line_number = content[:match.start()].count('\n') + 1
+            for match in self._JS_FETCH_RE.finditer(content):
+                line_number = offset_to_line(newlines, match.start())
                 issues.append({
                     "line": line_number,
                     "message": "网络请求缺少错误处理 (.catch)",
@@ -231,39 +296,54 @@ class QualityAnalyzer:
         
         return issues
     
-    def _check_duplicates(self, content: str) -> List[Dict[str, Any]]:
+    def _check_duplicates(self, content: str, lines: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         检查代码重复
         
         Args:
             content: 代码内容
+            lines: 可选，按换行符切分后的行列表，未提供时重新切分
             
         Returns:
             List[Dict[str, Any]]: 重复代码列表
         """
         duplicates = []
-        lines = content.split('\n')
+        if lines is None:
+            lines = content.split('\n')
         
         # 简单的代码重复检测（查找连续5行以上的重复）
         min_duplicate_lines = 5
-        line_hash = {}
         
-        for i in range(len(lines) - min_duplicate_lines + 1):
-            # 计算片段哈希
-            chunk = '\n'.join(lines[i:i+min_duplicate_lines])
-            if len(chunk.strip()) < 20:  # 忽略太短的片段
+        # 每行只哈希一次，相同内容的行映射为同一个编号；片段以行编号元组为键，不拼接片段文本
+        line_ids: Dict[str, int] = {}
+        ids = [line_ids.setdefault(line, len(line_ids)) for line in lines]
+        
+        # 片段首次出现的位置
+        first_seen: Dict[Tuple[int, ...], int] = {}
+        # 片段是否足够长（相同片段结果相同），仅在发现重复时计算一次
+        long_enough: Dict[Tuple[int, ...], bool] = {}
+        
+        windows = zip(*(ids[offset:] for offset in range(min_duplicate_lines)))
+        for i, window in enumerate(windows):
+            first = first_seen.setdefault(window, i)
+            if first == i:
                 continue
-                
-            if chunk in line_hash:
-                # 已经发现重复
-                duplicates.append({
-                    "first_occurrence": line_hash[chunk] + 1,  # 1-based line number
-                    "second_occurrence": i + 1,  # 1-based line number
-                    "lines": min_duplicate_lines,
-                    "message": f"重复代码块 ({min_duplicate_lines} 行)"
-                })
-            else:
-                line_hash[chunk] = i
+            
+            qualified = long_enough.get(window)
+            if qualified is None:
+                # 忽略太短的片段
+                chunk = '\n'.join(lines[i:i+min_duplicate_lines])
+                qualified = long_enough[window] = len(chunk.strip()) >= 20
+            if not qualified:
+                continue
+            
+            # 已经发现重复
+            duplicates.append({
+                "first_occurrence": first + 1,  # 1-based line number
+                "second_occurrence": i + 1,  # 1-based line number
+                "lines": min_duplicate_lines,
+                "message": f"重复代码块 ({min_duplicate_lines} 行)"
+            })
         
         return duplicates
     
@@ -318,13 +398,9 @@ class QualityAnalyzer:
             return []
             
         # 根据问题类型分组
-        by_type = {}
+        by_type = defaultdict(list)
         for issue in issues:
-            msg = issue["message"]
-            if msg in by_type:
-                by_type[msg].append(issue["line"])
-            else:
-                by_type[msg] = [issue["line"]]
+            by_type[issue["message"]].append(issue["line"])
         
         # 生成建议
         suggestions = []
@@ -2,12 +2,187 @@
 代码结构分析器 - 负责分析代码的结构信息（类、函数等）
 """
 
+import ast
+import logging
+import mmap
+import os
 import re
-from typing import Dict, Any, List
+import threading
+import warnings
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.modules.code_analysis.utils import newline_offsets, offset_to_line
+
+logger = logging.getLogger(__name__)
+
+try:
+    from tree_sitter import Parser
+    from tree_sitter_languages import get_language
+    TREE_SITTER_AVAILABLE = True
+except ImportError:
+    TREE_SITTER_AVAILABLE = False
+
+# 可用 tree-sitter 解析的语言及对应的语法名称
+_TREE_SITTER_GRAMMARS = {
+    "javascript": "javascript",
+    "typescript": "typescript",
+    "java": "java",
+    "cpp": "cpp",
+    "csharp": "c_sharp",
+}
+
+# 各语法中视为类和函数的节点类型
+_TREE_SITTER_CLASS_TYPES = frozenset([
+    "class_declaration", "abstract_class_declaration", "class",
+    "interface_declaration", "enum_declaration", "class_specifier",
+])
+_TREE_SITTER_FUNCTION_TYPES = frozenset([
+    "function_declaration", "generator_function_declaration", "method_definition",
+    "arrow_function", "function", "function_expression", "generator_function",
+    "method_declaration", "constructor_declaration", "function_definition",
+])
+# 函数表达式只有赋值给变量时才有名称
+_TREE_SITTER_EXPRESSION_FUNCTION_TYPES = frozenset([
+    "arrow_function", "function", "function_expression", "generator_function",
+])
+
+# 已加载的 tree-sitter 语法（语法对象只读，可在线程间共享），加载失败时记为None
+_tree_sitter_languages: Dict[str, Any] = {}
+_tree_sitter_lock = threading.Lock()
+
+
+def _get_tree_sitter_parser(language: str) -> Optional["Parser"]:
+    """
+    获取指定语言的 tree-sitter 解析器
+    
+    语法只加载一次；解析器不能在线程间共享，每次调用新建（开销很小）。
+    
+    Args:
+        language: 编程语言
+        
+    Returns:
+        Optional[Parser]: 解析器，tree-sitter 不可用或语法加载失败时返回None
+    """
+    grammar = _TREE_SITTER_GRAMMARS.get(language)
+    if not TREE_SITTER_AVAILABLE or grammar is None:
+        return None
+    
+    if grammar not in _tree_sitter_languages:
+        with _tree_sitter_lock:
+            if grammar not in _tree_sitter_languages:
+                try:
+                    with warnings.catch_warnings():
+                        # 旧版 tree_sitter_languages 使用已弃用的 Language(path, name) 接口
+                        warnings.simplefilter("ignore", FutureWarning)
+                        _tree_sitter_languages[grammar] = get_language(grammar)
+                except Exception as e:
+                    logger.warning(f"加载 tree-sitter 语法失败({grammar})，使用正则分析: {str(e)}")
+                    _tree_sitter_languages[grammar] = None
+    
+    tree_sitter_language = _tree_sitter_languages[grammar]
+    if tree_sitter_language is None:
+        return None
+    parser = Parser()
+    parser.set_language(tree_sitter_language)
+    return parser
+
+# 可能包含语句（或 except/case 子句）列表的AST字段
+_STATEMENT_FIELDS = ("body", "handlers", "orelse", "finalbody", "cases")
+
+_BRACE_RE = re.compile(r'[{}]')
+
+
+def _build_brace_map(content: str) -> Dict[int, int]:
+    """
+    一次扫描得到每个左花括号到与之配对的右花括号的位置映射
+    
+    没有配对的左花括号不在映射中，多余的右花括号被忽略。
+    
+    Args:
+        content: 代码内容
+        
+    Returns:
+        Dict[int, int]: 左花括号位置到右花括号位置的映射
+    """
+    brace_map = {}
+    stack = []
+    for match in _BRACE_RE.finditer(content):
+        if match.group() == '{':
+            stack.append(match.start())
+        elif stack:
+            brace_map[stack.pop()] = match.start()
+    return brace_map
+
+
+def _build_class_spans(classes: List[Dict[str, Any]]) -> Tuple[List[int], List[int]]:
+    """
+    构建判断函数是否位于类内部所需的区间索引
+    
+    classes 按源码顺序给出，起始行已有序；同时记录前缀中最大的结束行，
+    这样嵌套或相互重叠的类也只需一次二分查找。
+    
+    Args:
+        classes: 类信息列表
+        
+    Returns:
+        Tuple[List[int], List[int]]: 类起始行列表及对应的前缀最大结束行列表
+    """
+    starts = []
+    max_ends = []
+    max_end = 0
+    for cls in classes:
+        max_end = max(max_end, cls["end_line"])
+        starts.append(cls["line"])
+        max_ends.append(max_end)
+    return starts, max_ends
+
+
+def _is_within_class(class_spans: Tuple[List[int], List[int]], line: int, end_line: int) -> bool:
+    """
+    判断起止行为 line/end_line 的函数是否位于某个类内部
+    
+    等价于存在类满足 cls["line"] < line 且 end_line <= cls["end_line"]。
+    
+    Args:
+        class_spans: _build_class_spans 的结果
+        line: 函数起始行
+        end_line: 函数结束行
+        
+    Returns:
+        bool: 是否为类方法
+    """
+    starts, max_ends = class_spans
+    index = bisect_left(starts, line) - 1
+    return index >= 0 and end_line <= max_ends[index]
+
 
 class StructureAnalyzer:
     """代码结构分析器，负责分析代码的结构信息（类、函数等）"""
     
+    # 各语言结构分析使用的正则，类加载时编译一次
+    _PY_IMPORT_RE = re.compile(r'^import\s+([a-zA-Z0-9_.,\s]+)|^from\s+([a-zA-Z0-9_.]+)\s+import\s+([a-zA-Z0-9_.,\s\*]+)', re.MULTILINE)
+    _PY_CLASS_RE = re.compile(r'class\s+([a-zA-Z0-9_]+)\s*(?:\([^)]*\))?:')
+    _PY_FUNC_RE = re.compile(r'def\s+([a-zA-Z0-9_]+)\s*\([^)]*\)\s*:')
+    _JS_IMPORT_RE = re.compile(r'import\s+(?:{[^}]*}|[a-zA-Z0-9_*]+)\s+from\s+[\'"]([^\'"]*)[\'"](;)?|require\s*\(\s*[\'"]([^\'"]*)[\'"]\s*\)')
+    _JS_CLASS_RE = re.compile(r'class\s+([a-zA-Z0-9_]+)\s*(?:extends\s+[a-zA-Z0-9_.]+\s*)?{')
+    # JavaScript函数定义：普通函数、箭头函数、方法或函数表达式，合并为一个正则按源码顺序扫描一遍；
+    # 各分支只有一个命名分组，匹配到的分支由 lastgroup 给出。方法的参数表不含括号，
+    # 避免 fn(function name() { 中外层调用吞掉内层函数；控制语句和匿名 function 不计为方法
+    _JS_FUNC_RE = re.compile(
+        r'function\s+(?P<function>[a-zA-Z0-9_]+)\s*\([^)]*\)\s*{'  # 普通函数
+        r'|(?:const|let|var)\s+(?P<arrow>[a-zA-Z0-9_]+)\s*=\s*(?:async\s*)?\([^)]*\)\s*=>\s*{'  # 箭头函数
+        r'|\b(?:async\s+)?(?!(?:function|if|for|while|switch|catch)\b)(?P<method>[a-zA-Z0-9_]+)\s*\([^()]*\)\s*{'  # 方法或函数表达式
+    )
+    _JAVA_IMPORT_RE = re.compile(r'import\s+([a-zA-Z0-9_.]+(?:\.[*])?);')
+    _JAVA_CLASS_RE = re.compile(r'(?:public|private|protected)?\s*(?:abstract|final)?\s*(?:class|interface|enum)\s+([a-zA-Z0-9_]+)')
+    # 方法签名从行首开始：修饰符与返回类型是空白分隔、与分隔符字符集互斥的若干词（可省略），
+    # 最后一个词与方法名之间允许换行；词数与参数表长度设上限，避免长类型表达式上的回溯爆炸
+    _JAVA_METHOD_RE = re.compile(r'^[ \t]*(?:(?:[\w<>\[\],.?@]+[ \t]+){0,15}[\w<>\[\],.?@]+\s+)?(?!(?:if|for|while|switch|catch|synchronized)\b)(\w+)\s*\([^)]{0,512}\)\s*(?:throws\s+[\w,.\s]{1,128}?)?\s*{', re.MULTILINE)
+    _C_INCLUDE_RE = re.compile(r'#include\s*[<"]([^>"]+)[>"]')
+    _C_CLASS_RE = re.compile(r'(?:public|private|protected|internal)?\s*(?:abstract|sealed|static)?\s*class\s+([a-zA-Z0-9_]+)')
+    _C_FUNC_RE = re.compile(r'^[ \t]*(?:(?:[\w<>\[\]*&,:]+[ \t]+){0,15}[\w<>\[\]*&,:]+\s+)?(?!(?:if|for|while|switch|catch|foreach|using|lock)\b)(\w+)\s*\([^)]{0,512}\)\s*(?:const)?\s*{', re.MULTILINE)
+    
     def __init__(self):
         """初始化结构分析器"""
         pass
@@ -25,7 +200,13 @@ class StructureAnalyzer:
         """
         if language == "python":
             return self._analyze_python(content)
-        elif language in ["javascript", "typescript"]:
+        
+        # 安装 tree-sitter 时由C实现的解析器分析，正确处理字符串和注释中的花括号
+        parser = _get_tree_sitter_parser(language)
+        if parser is not None:
+            return self._analyze_tree_sitter(parser, content.encode("utf-8", "surrogatepass"), language)
+        
+        if language in ["javascript", "typescript"]:
             return self._analyze_javascript(content)
         elif language == "java":
             return self._analyze_java(content)
@@ -39,34 +220,133 @@ class StructureAnalyzer:
                 "imports": []
             }
     
+    def analyze_path(self, file_path: str, language: str) -> Dict[str, Any]:
+        """
+        分析磁盘上源文件的代码结构
+        
+        可由 tree-sitter 解析的语言直接把文件的内存映射交给解析器，
+        不解码为 str 也不复制内容；其他语言按UTF-8读取后调用 analyze。
+        
+        Args:
+            file_path: 文件路径
+            language: 编程语言
+            
+        Returns:
+            Dict[str, Any]: 代码结构信息
+        """
+        parser = _get_tree_sitter_parser(language)
+        if parser is None:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return self.analyze(f.read(), language)
+        
+        with open(file_path, 'rb') as f:
+            # 空文件无法映射
+            if os.fstat(f.fileno()).st_size == 0:
+                return self._analyze_tree_sitter(parser, b"", language)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as source:
+                return self._analyze_tree_sitter(parser, source, language)
+    
     def _analyze_python(self, content: str) -> Dict[str, Any]:
-        """分析Python代码结构"""
+        """
+        分析Python代码结构
+        
+        解析为AST后按源码顺序遍历一次，行号直接取自节点的 lineno/end_lineno；
+        代码无法解析时退回基于正则的分析。
+        
+        Args:
+            content: 代码内容
+            
+        Returns:
+            Dict[str, Any]: 代码结构信息
+        """
+        try:
+            tree = ast.parse(content)
+        except (SyntaxError, ValueError):
+            return self._analyze_python_regex(content)
+        
         functions = []
         classes = []
         imports = []
         
+        # 深度优先、按源码顺序遍历，同时记录父节点是否为类定义；
+        # 类、函数和导入都是语句，只需沿语句列表字段下行，不进入表达式
+        stack = [(tree, False)]
+        while stack:
+            node, in_class = stack.pop()
+            node_type = type(node)
+            
+            if node_type is ast.Import:
+                imports.append({"type": "import", "module": self._format_aliases(node.names)})
+            elif node_type is ast.ImportFrom:
+                imports.append({
+                    "type": "from",
+                    "module": "." * node.level + (node.module or ""),
+                    "names": self._format_aliases(node.names)
+                })
+            elif node_type is ast.ClassDef:
+                classes.append({
+                    "name": node.name,
+                    "line": node.lineno,
+                    "end_line": node.end_lineno,
+                    "lines": node.end_lineno - node.lineno
+                })
+            elif node_type is ast.FunctionDef or node_type is ast.AsyncFunctionDef:
+                functions.append({
+                    "name": node.name,
+                    "line": node.lineno,
+                    "end_line": node.end_lineno,
+                    "lines": node.end_lineno - node.lineno,
+                    "is_method": in_class
+                })
+            
+            is_class = node_type is ast.ClassDef
+            for field in reversed(_STATEMENT_FIELDS):
+                children = getattr(node, field, None)
+                if type(children) is list:
+                    for child in reversed(children):
+                        stack.append((child, is_class))
+        
+        return {
+            "functions": functions,
+            "classes": classes,
+            "imports": imports
+        }
+    
+    @staticmethod
+    def _format_aliases(names: List[ast.alias]) -> str:
+        """将导入的名称列表格式化为源码形式，如 os, numpy as np"""
+        return ", ".join(
+            f"{alias.name} as {alias.asname}" if alias.asname else alias.name
+            for alias in names
+        )
+    
+    def _analyze_python_regex(self, content: str) -> Dict[str, Any]:
+        """基于正则分析Python代码结构，用于无法解析为AST的代码"""
+        functions = []
+        classes = []
+        imports = []
+        
+        # 换行符位置和行列表只计算一次，匹配位置到行号的换算改为二分查找
+        newlines = newline_offsets(content)
+        all_lines = content.split('\n')
+        
         # 分析导入语句
-        import_pattern = r'^import\s+([a-zA-Z0-9_.,\s]+)|^from\s+([a-zA-Z0-9_.]+)\s+import\s+([a-zA-Z0-9_.,\s\*]+)'
-        for match in re.finditer(import_pattern, content, re.MULTILINE):
+        for match in self._PY_IMPORT_RE.finditer(content):
             if match.group(1):  # import x
                 imports.append({"type": "import", "module": match.group(1).strip()})
             elif match.group(2) and match.group(3):  # from x import y
                 imports.append({"type": "from", "module": match.group(2).strip(), "names": match.group(3).strip()})
         
         # 分析类定义
-        class_pattern = r'class\s+([a-zA-Z0-9_]+)\s*(?:\([^)]*\))?:'
-        for match in re.finditer(class_pattern, content):
+        for match in self._PY_CLASS_RE.finditer(content):
             class_name = match.group(1)
             class_start = match.start()
             
             # 获取类的起始行
-            line_number = content[:class_start].count('\n') + 1
+            line_number = offset_to_line(newlines, class_start)
             
-            # 简单计算代码块结束的位置（通过缩进）
-            lines = content[class_start:].split('\n')
-            
-            # 第一行是类定义，跳过
-            lines = lines[1:]
+            # 简单计算代码块结束的位置（通过缩进）；第一行是类定义，从下一行开始
+            lines = all_lines[line_number:]
             
             # 获取类定义的缩进级别
             if lines and lines[0]:
@@ -82,7 +362,7 @@ class StructureAnalyzer:
                     break
             
             if class_end_line == 0:  # 如果没找到结束位置，假设到文件末尾
-                class_end_line = content.count('\n') + 1
+                class_end_line = len(newlines) + 1
             
             # 计算类长度
             class_length = class_end_line - line_number
@@ -94,20 +374,18 @@ class StructureAnalyzer:
                 "lines": class_length
             })
         
+        class_spans = _build_class_spans(classes)
+        
         # 分析函数定义
-        function_pattern = r'def\s+([a-zA-Z0-9_]+)\s*\([^)]*\)\s*:'
-        for match in re.finditer(function_pattern, content):
+        for match in self._PY_FUNC_RE.finditer(content):
             function_name = match.group(1)
             function_start = match.start()
             
             # 获取函数的起始行
-            line_number = content[:function_start].count('\n') + 1
+            line_number = offset_to_line(newlines, function_start)
             
-            # 简单计算代码块结束的位置（通过缩进）
-            lines = content[function_start:].split('\n')
-            
-            # 第一行是函数定义，跳过
-            lines = lines[1:]
+            # 简单计算代码块结束的位置（通过缩进）；第一行是函数定义，从下一行开始
+            lines = all_lines[line_number:]
             
             # 获取函数定义的缩进级别
             if lines and lines[0]:
@@ -123,17 +401,13 @@ class StructureAnalyzer:
                     break
             
             if function_end_line == 0:  # 如果没找到结束位置，假设到文件末尾
-                function_end_line = content.count('\n') + 1
+                function_end_line = len(newlines) + 1
             
             # 计算函数长度
             function_length = function_end_line - line_number
             
             # 判断是否是类方法
-            is_method = False
-            for cls in classes:
-                if line_number > cls["line"] and function_end_line <= cls["end_line"]:
-                    is_method = True
-                    break
+            is_method = _is_within_class(class_spans, line_number, function_end_line)
             
             functions.append({
                 "name": function_name,
@@ -149,42 +423,177 @@ class StructureAnalyzer:
             "imports": imports
         }
     
+    def _analyze_tree_sitter(self, parser: "Parser", source: Any, language: str) -> Dict[str, Any]:
+        """
+        基于 tree-sitter 语法树分析代码结构
+        
+        按源码顺序深度优先遍历一次语法树，行号取自节点的起止位置；
+        直接定义在类体中的函数记为方法。
+        
+        Args:
+            parser: tree-sitter 解析器
+            source: UTF-8编码的代码内容，可以是 bytes 或内存映射
+            language: 编程语言
+            
+        Returns:
+            Dict[str, Any]: 代码结构信息
+        """
+        functions = []
+        classes = []
+        imports = []
+        
+        tree = parser.parse(source)
+        
+        stack = [(tree.root_node, False)]
+        while stack:
+            node, in_class = stack.pop()
+            node_type = node.type
+            child_in_class = in_class
+            
+            if node_type in _TREE_SITTER_CLASS_TYPES:
+                name = self._tree_sitter_name(node)
+                if name:
+                    classes.append(self._tree_sitter_span(node, name))
+                child_in_class = True
+            elif node_type in _TREE_SITTER_FUNCTION_TYPES:
+                name = self._tree_sitter_name(node)
+                if name:
+                    function = self._tree_sitter_span(node, name)
+                    function["is_method"] = in_class
+                    functions.append(function)
+                child_in_class = False
+            else:
+                module = self._tree_sitter_import(node, node_type)
+                if module:
+                    imports.append({"module": module})
+            
+            children = node.children
+            for child in reversed(children):
+                stack.append((child, child_in_class))
+        
+        return {
+            "functions": functions,
+            "classes": classes,
+            "imports": imports
+        }
+    
+    @staticmethod
+    def _tree_sitter_span(node: Any, name: str) -> Dict[str, Any]:
+        """生成包含名称和起止行号的结构条目"""
+        line = node.start_point[0] + 1
+        end_line = node.end_point[0] + 1
+        return {
+            "name": name,
+            "line": line,
+            "end_line": end_line,
+            "lines": end_line - line
+        }
+    
+    @staticmethod
+    def _tree_sitter_name(node: Any) -> Optional[str]:
+        """
+        获取类或函数节点的名称
+        
+        Args:
+            node: tree-sitter 节点
+            
+        Returns:
+            Optional[str]: 名称，匿名时返回None
+        """
+        if node.type in _TREE_SITTER_EXPRESSION_FUNCTION_TYPES:
+            # 函数表达式取所赋值变量的名称，如 const name = () => {}
+            parent = node.parent
+            if parent is None or parent.type != "variable_declarator":
+                return None
+            name_node = parent.child_by_field_name("name")
+        elif node.type == "function_definition":
+            # C++函数名位于声明符中，可能被指针或引用声明符包裹
+            declarator = node.child_by_field_name("declarator")
+            while declarator is not None and declarator.type != "function_declarator":
+                declarator = declarator.child_by_field_name("declarator")
+            if declarator is None:
+                return None
+            name_node = declarator.child_by_field_name("declarator")
+        else:
+            name_node = node.child_by_field_name("name")
+        
+        if name_node is None:
+            return None
+        return name_node.text.decode("utf-8", "replace")
+    
+    @staticmethod
+    def _tree_sitter_import(node: Any, node_type: str) -> Optional[str]:
+        """
+        获取导入类节点引用的模块名称
+        
+        Args:
+            node: tree-sitter 节点
+            node_type: 节点类型
+            
+        Returns:
+            Optional[str]: 模块名称，不是导入节点时返回None
+        """
+        if node_type == "import_statement":
+            # JavaScript/TypeScript: import x from "module"
+            source = node.child_by_field_name("source")
+            if source is not None:
+                return source.text.decode("utf-8", "replace")[1:-1]
+        elif node_type == "call_expression":
+            # JavaScript: require("module")
+            function = node.child_by_field_name("function")
+            arguments = node.child_by_field_name("arguments")
+            if (function is not None and function.type == "identifier" and function.text == b"require"
+                    and arguments is not None and arguments.named_child_count == 1
+                    and arguments.named_children[0].type == "string"):
+                return arguments.named_children[0].text.decode("utf-8", "replace")[1:-1]
+        elif node_type == "import_declaration":
+            # Java: import a.b.C; / import a.b.*; / import static a.b.C.m;
+            text = node.text.decode("utf-8", "replace")
+            module = text[len("import"):].rstrip(";").strip()
+            if module.startswith("static "):
+                module = module[len("static "):].lstrip()
+            return module
+        elif node_type == "preproc_include":
+            # C++: #include <header> / #include "header"
+            path = node.child_by_field_name("path")
+            if path is not None:
+                return path.text.decode("utf-8", "replace")[1:-1]
+        elif node_type == "using_directive":
+            # C#: using System.Text;
+            text = node.text.decode("utf-8", "replace")
+            return text[len("using"):].rstrip(";").strip()
+        return None
+    
     def _analyze_javascript(self, content: str) -> Dict[str, Any]:
         """分析JavaScript/TypeScript代码结构"""
         functions = []
         classes = []
         imports = []
         
+        # 换行符位置只计算一次，匹配位置到行号的换算改为二分查找
+        newlines = newline_offsets(content)
+        # 花括号配对只计算一次
+        brace_map = _build_brace_map(content)
+        
         # 分析导入语句
-        import_pattern = r'import\s+(?:{[^}]*}|[a-zA-Z0-9_*]+)\s+from\s+[\'"]([^\'"]*)[\'"](;)?|require\s*\(\s*[\'"]([^\'"]*)[\'"]\s*\)'
-        for match in re.finditer(import_pattern, content):
+        for match in self._JS_IMPORT_RE.finditer(content):
             module = match.group(1) or match.group(3)
             if module:
                 imports.append({"module": module.strip()})
         
         # 分析类定义
-        class_pattern = r'class\s+([a-zA-Z0-9_]+)\s*(?:extends\s+[a-zA-Z0-9_.]+\s*)?{'
-        for match in re.finditer(class_pattern, content):
+        for match in self._JS_CLASS_RE.finditer(content):
             class_name = match.group(1)
             class_start = match.start()
             
             # 获取类的起始行
-            line_number = content[:class_start].count('\n') + 1
+            line_number = offset_to_line(newlines, class_start)
             
             # 找到对应的右花括号
-            brace_count = 1
-            class_end = class_start + match.end(0) - match.start(0)
-            for i in range(class_end, len(content)):
-                if content[i] == '{':
-                    brace_count += 1
-                elif content[i] == '}':
-                    brace_count -= 1
-                    if brace_count == 0:
-                        class_end = i
-                        break
+            class_end = brace_map.get(match.end() - 1, match.end())
             
             # 计算类的结束行
-            class_end_line = content[:class_end].count('\n') + 1
+            class_end_line = offset_to_line(newlines, class_end)
             
             # 计算类长度
             class_length = class_end_line - line_number
@@ -196,57 +605,40 @@ class StructureAnalyzer:
                 "lines": class_length
             })
         
+        class_spans = _build_class_spans(classes)
+        
         # 分析函数定义
         # 考虑多种函数定义方式：
         # - 普通函数：function name() {}
         # - 箭头函数：const name = () => {}
         # - 方法：name() {}
-        function_patterns = [
-            r'function\s+([a-zA-Z0-9_]+)\s*\([^)]*\)\s*{',  # 普通函数
-            r'(?:const|let|var)\s+([a-zA-Z0-9_]+)\s*=\s*(?:async\s*)?\([^)]*\)\s*=>\s*{',  # 箭头函数
-            r'(?:async\s+)?([a-zA-Z0-9_]+)\s*\([^)]*\)\s*{'  # 方法或函数表达式
-        ]
-        
-        for pattern in function_patterns:
-            for match in re.finditer(pattern, content):
-                function_name = match.group(1)
-                function_start = match.start()
-                
-                # 获取函数的起始行
-                line_number = content[:function_start].count('\n') + 1
-                
-                # 找到对应的右花括号
-                brace_count = 1
-                function_end = function_start + match.end(0) - match.start(0)
-                for i in range(function_end, len(content)):
-                    if content[i] == '{':
-                        brace_count += 1
-                    elif content[i] == '}':
-                        brace_count -= 1
-                        if brace_count == 0:
-                            function_end = i
-                            break
-                
-                # 计算函数的结束行
-                function_end_line = content[:function_end].count('\n') + 1
-                
-                # 计算函数长度
-                function_length = function_end_line - line_number
-                
-                # 判断是否是类方法
-                is_method = False
-                for cls in classes:
-                    if line_number > cls["line"] and function_end_line <= cls["end_line"]:
-                        is_method = True
-                        break
-                
-                functions.append({
-                    "name": function_name,
-                    "line": line_number,
-                    "end_line": function_end_line,
-                    "lines": function_length,
-                    "is_method": is_method
-                })
+        # 普通函数整体被一次匹配消耗，其中的 name() { 不会再作为方法重复计入
+        for match in self._JS_FUNC_RE.finditer(content):
+            function_name = match.group(match.lastgroup)
+            function_start = match.start()
+            
+            # 获取函数的起始行
+            line_number = offset_to_line(newlines, function_start)
+            
+            # 找到对应的右花括号
+            function_end = brace_map.get(match.end() - 1, match.end())
+            
+            # 计算函数的结束行
+            function_end_line = offset_to_line(newlines, function_end)
+            
+            # 计算函数长度
+            function_length = function_end_line - line_number
+            
+            # 判断是否是类方法
+            is_method = _is_within_class(class_spans, line_number, function_end_line)
+            
+            functions.append({
+                "name": function_name,
+                "line": line_number,
+                "end_line": function_end_line,
+                "lines": function_length,
+                "is_method": is_method
+            })
         
         return {
             "functions": functions,
@@ -261,19 +653,22 @@ class StructureAnalyzer:
         classes = []
         imports = []
         
+        # 换行符位置只计算一次，匹配位置到行号的换算改为二分查找
+        newlines = newline_offsets(content)
+        # 花括号配对只计算一次
+        brace_map = _build_brace_map(content)
+        
         # 分析导入语句
-        import_pattern = r'import\s+([a-zA-Z0-9_.]+(?:\.[*])?);'
-        for match in re.finditer(import_pattern, content):
+        for match in self._JAVA_IMPORT_RE.finditer(content):
             imports.append({"module": match.group(1).strip()})
         
         # 分析类定义
-        class_pattern = r'(?:public|private|protected)?\s*(?:abstract|final)?\s*(?:class|interface|enum)\s+([a-zA-Z0-9_]+)'
-        for match in re.finditer(class_pattern, content):
+        for match in self._JAVA_CLASS_RE.finditer(content):
             class_name = match.group(1)
             class_start = match.start()
             
             # 获取类的起始行
-            line_number = content[:class_start].count('\n') + 1
+            line_number = offset_to_line(newlines, class_start)
             
             # 简单找到类体的开始
             class_body_start = content.find('{', class_start)
@@ -281,19 +676,10 @@ class StructureAnalyzer:
                 continue
             
             # 找到类体的结束
-            brace_count = 1
-            class_end = class_body_start + 1
-            for i in range(class_end, len(content)):
-                if content[i] == '{':
-                    brace_count += 1
-                elif content[i] == '}':
-                    brace_count -= 1
-                    if brace_count == 0:
-                        class_end = i
-                        break
+            class_end = brace_map.get(class_body_start, class_body_start + 1)
             
             # 计算类的结束行
-            class_end_line = content[:class_end].count('\n') + 1
+            class_end_line = offset_to_line(newlines, class_end)
             
             # 计算类长度
             class_length = class_end_line - line_number
@@ -305,14 +691,15 @@ class StructureAnalyzer:
                 "lines": class_length
             })
         
+        class_spans = _build_class_spans(classes)
+        
         # 分析方法定义
-        method_pattern = r'(?:public|private|protected)?\s*(?:static|final|abstract)?\s*(?:[a-zA-Z0-9_<>[\],\s]+)\s+([a-zA-Z0-9_]+)\s*\([^)]*\)\s*(?:throws\s+[a-zA-Z0-9_,\s]+)?\s*{'
-        for match in re.finditer(method_pattern, content):
+        for match in self._JAVA_METHOD_RE.finditer(content):
             method_name = match.group(1)
             method_start = match.start()
             
             # 获取方法的起始行
-            line_number = content[:method_start].count('\n') + 1
+            line_number = offset_to_line(newlines, method_start)
             
             # 找到方法体的开始
             method_body_start = content.find('{', method_start)
@@ -320,29 +707,16 @@ class StructureAnalyzer:
                 continue
             
             # 找到方法体的结束
-            brace_count = 1
-            method_end = method_body_start + 1
-            for i in range(method_end, len(content)):
-                if content[i] == '{':
-                    brace_count += 1
-                elif content[i] == '}':
-                    brace_count -= 1
-                    if brace_count == 0:
-                        method_end = i
-                        break
+            method_end = brace_map.get(method_body_start, method_body_start + 1)
             
             # 计算方法的结束行
-            method_end_line = content[:method_end].count('\n') + 1
+            method_end_line = offset_to_line(newlines, method_end)
             
             # 计算方法长度
             method_length = method_end_line - line_number
             
             # 判断是否是类方法
-            is_method = False
-            for cls in classes:
-                if line_number > cls["line"] and method_end_line <= cls["end_line"]:
-                    is_method = True
-                    break
+            is_method = _is_within_class(class_spans, line_number, method_end_line)
             
             functions.append({
                 "name": method_name,
@@ -364,19 +738,22 @@ class StructureAnalyzer:
         classes = []
         includes = []
         
+        # 换行符位置只计算一次，匹配位置到行号的换算改为二分查找
+        newlines = newline_offsets(content)
+        # 花括号配对只计算一次
+        brace_map = _build_brace_map(content)
+        
         # 分析包含语句
-        include_pattern = r'#include\s*[<"]([^>"]+)[>"]'
-        for match in re.finditer(include_pattern, content):
+        for match in self._C_INCLUDE_RE.finditer(content):
             includes.append({"module": match.group(1).strip()})
         
         # 分析类定义
-        class_pattern = r'(?:public|private|protected|internal)?\s*(?:abstract|sealed|static)?\s*class\s+([a-zA-Z0-9_]+)'
-        for match in re.finditer(class_pattern, content):
+        for match in self._C_CLASS_RE.finditer(content):
             class_name = match.group(1)
             class_start = match.start()
             
             # 获取类的起始行
-            line_number = content[:class_start].count('\n') + 1
+            line_number = offset_to_line(newlines, class_start)
             
             # 简单找到类体的开始
             class_body_start = content.find('{', class_start)
@@ -384,19 +761,10 @@ class StructureAnalyzer:
                 continue
             
             # 找到类体的结束
-            brace_count = 1
-            class_end = class_body_start + 1
-            for i in range(class_end, len(content)):
-                if content[i] == '{':
-                    brace_count += 1
-                elif content[i] == '}':
-                    brace_count -= 1
-                    if brace_count == 0:
-                        class_end = i
-                        break
+            class_end = brace_map.get(class_body_start, class_body_start + 1)
             
             # 计算类的结束行
-            class_end_line = content[:class_end].count('\n') + 1
+            class_end_line = offset_to_line(newlines, class_end)
             
             # 计算类长度
             class_length = class_end_line - line_number
@@ -408,14 +776,15 @@ class StructureAnalyzer:
                 "lines": class_length
             })
         
+        class_spans = _build_class_spans(classes)
+        
         # 分析函数定义
-        function_pattern = r'(?:public|private|protected|internal)?\s*(?:static|virtual|override)?\s*(?:[a-zA-Z0-9_<>[\]*,\s]+)\s+([a-zA-Z0-9_]+)\s*\([^)]*\)\s*(?:const)?\s*{'
-        for match in re.finditer(function_pattern, content):
+        for match in self._C_FUNC_RE.finditer(content):
             function_name = match.group(1)
             function_start = match.start()
             
             # 获取函数的起始行
-            line_number = content[:function_start].count('\n') + 1
+            line_number = offset_to_line(newlines, function_start)
             
             # 简单找到函数体的开始
             function_body_start = content.find('{', function_start)
@@ -423,29 +792,16 @@ class StructureAnalyzer:
                 continue
             
             # 找到函数体的结束
-            brace_count = 1
-            function_end = function_body_start + 1
-            for i in range(function_end, len(content)):
-                if content[i] == '{':
-                    brace_count += 1
-                elif content[i] == '}':
-                    brace_count -= 1
-                    if brace_count == 0:
-                        function_end = i
-                        break
+            function_end = brace_map.get(function_body_start, function_body_start + 1)
             
             # 计算函数的结束行
-            function_end_line = content[:function_end].count('\n') + 1
+            function_end_line = offset_to_line(newlines, function_end)
             
             # 计算函数长度
             function_length = function_end_line - line_number
             
             # 判断是否是类方法
-            is_method = False
-            for cls in classes:
-                if line_number > cls["line"] and function_end_line <= cls["end_line"]:
-                    is_method = True
-                    break
+            is_method = _is_within_class(class_spans, line_number, function_end_line)
             
             functions.append({
                 "name": function_name,
@@ -2,7 +2,19 @@
 代码分析工具函数 - 提供通用工具方法
 """
 
-from typing import Dict, Any, Optional
+import re
+import sys
+from bisect import bisect_left
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional
+
+try:
+    import numpy as np
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 # 支持的编程语言扩展名映射
 LANGUAGE_EXTENSIONS = {
@@ -18,9 +30,21 @@ LANGUAGE_EXTENSIONS = {
     "rust": [".rs"]
 }
 
+def _build_extension_index() -> Dict[str, str]:
+    """构建扩展名到语言的索引，扩展名重复时保留先出现的语言"""
+    index: Dict[str, str] = {}
+    for language, extensions in LANGUAGE_EXTENSIONS.items():
+        for extension in extensions:
+            index.setdefault(extension, language)
+    return index
+
+# 扩展名（小写，含点号）到编程语言的只读映射，供遍历目录时直接查找
+EXTENSION_LANGUAGES = MappingProxyType(_build_extension_index())
+
+@lru_cache(maxsize=128)
 def detect_language_by_extension(extension: str) -> Optional[str]:
     """
-    根据文件扩展名检测编程语言
+    根据文件扩展名检测编程语言（结果按扩展名缓存）
     
     Args:
         extension: 文件扩展名
@@ -28,11 +52,7 @@ def detect_language_by_extension(extension: str) -> Optional[str]:
     Returns:
         Optional[str]: 检测到的语言，如果不支持则返回None
     """
-    extension = extension.lower()
-    for language, extensions in LANGUAGE_EXTENSIONS.items():
-        if extension in extensions:
-            return language
-    return None
+    return EXTENSION_LANGUAGES.get(extension.lower())
 
 def generate_summary(analysis_result: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -69,7 +89,8 @@ def generate_summary(analysis_result: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "function_count": len(structure.get("functions", [])),
         "class_count": len(structure.get("classes", [])),
-        "comment_ratio": f"{comment_ratio:.1f}%",
+        # 注释比例字符串取值有限，驻留后大量文件的摘要共享同一对象
+        "comment_ratio": sys.intern(f"{comment_ratio:.1f}%"),
         "complexity_rating": complexity_rating,
         "has_issues": cyclomatic > 20 or comment_ratio < 10 or code_lines > 500
     }
@@ -89,16 +110,22 @@ def generate_project_summary(project_result: Dict[str, Any]) -> Dict[str, Any]:
     if not files:
         return {"message": "项目中没有可分析的文件"}
     
-    # 统计总行数
-    total_lines = sum(file.get("lines", 0) for file in files)
-    
-    # 统计各种复杂度指标
-    complexity_sum = sum(file.get("metrics", {}).get("complexity", {}).get("cyclomatic", 0) for file in files)
-    complexity_avg = complexity_sum / len(files) if files else 0
+    # 一次遍历同时统计总行数、复杂度以及函数和类的数量
+    total_lines = 0
+    complexity_sum = 0
+    function_count = 0
+    class_count = 0
+    for file in files:
+        total_lines += file.get("lines", 0)
+        complexity_sum += file.get("metrics", {}).get("complexity", {}).get("cyclomatic", 0)
+        structure = file.get("structure", {})
+        function_count += len(structure.get("functions", ()))
+        class_count += len(structure.get("classes", ()))
+    complexity_avg = complexity_sum / len(files)
     
-    # 统计函数和类的数量
-    function_count = sum(len(file.get("structure", {}).get("functions", [])) for file in files)
-    class_count = sum(len(file.get("structure", {}).get("classes", [])) for file in files)
+    # 文件数最多的语言作为主要语言
+    language_stats = project_result.get("language_stats")
+    primary_language = max(language_stats, key=language_stats.get) if language_stats else "未知"
     
     # 生成摘要
     return {
@@ -107,15 +134,97 @@ def generate_project_summary(project_result: Dict[str, Any]) -> Dict[str, Any]:
         "function_count": function_count,
         "class_count": class_count,
         "complexity_avg": f"{complexity_avg:.2f}",
-        "primary_language": max(project_result.get("language_stats", {}).items(), key=lambda x: x[1])[0] if project_result.get("language_stats") else "未知",
+        "primary_language": primary_language,
         "created_at": project_result.get("created_at", ""),
         "updated_at": project_result.get("updated_at", "")
     }
 
+# 换行后（忽略行首空白）以注释符开头的行；以换行符开头便于正则引擎快速定位
+_PY_COMMENT_LINE_RE = re.compile(r'\n[^\S\n]*#')
+_LINE_COMMENT_RE = re.compile(r'\n[^\S\n]*//')
+
+def _count_marked_lines(pattern: "re.Pattern", marker: str, content: str, start: int, end: int) -> int:
+    """
+    统计 [start, end) 范围内去掉行首空白后以 marker 开头的行数
+    
+    Args:
+        pattern: 以换行符开头、匹配 marker 所在行的正则
+        marker: 注释符
+        content: 代码内容
+        start: 起始位置，必须是行首
+        end: 结束位置，必须是行首或内容末尾
+        
+    Returns:
+        int: 匹配的行数
+    """
+    if start:
+        # 行首的前一个字符就是换行符，从它开始匹配
+        return len(pattern.findall(content, start - 1, end))
+    if not end:
+        return 0
+    first_end = content.find('\n')
+    first_line = content if first_end == -1 else content[:first_end]
+    return len(pattern.findall(content, 0, end)) + first_line.lstrip().startswith(marker)
+
+# 非ASCII空白字符；内容中出现时按字符扫描，保证与 str.strip 的空白判断一致
+_NON_ASCII_SPACE_RE = re.compile(r'[^\S\x00-\x7f]')
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _c_comment_lines_bytes(buf):
+        """
+        在UTF-8字节数组上逐行统计C风格注释行数，与 count_comment_lines 的逐行判断结果一致
+        
+        多字节字符的各字节都不小于0x80，不会与 /、*、换行符混淆；行首空白只识别ASCII空白。
+        """
+        n = buf.shape[0]
+        comment_lines = 0
+        in_block_comment = False
+        start = 0
+        while start <= n:
+            end = start
+            while end < n and buf[end] != 10:
+                end += 1
+            
+            if in_block_comment:
+                comment_lines += 1
+                pos = start
+                while pos + 1 < end:
+                    if buf[pos] == 42 and buf[pos + 1] == 47:
+                        in_block_comment = False
+                        break
+                    pos += 1
+            else:
+                # 跳过行首空白（与 str.strip 的ASCII空白一致）
+                pos = start
+                while pos < end and (buf[pos] == 32 or 9 <= buf[pos] <= 13 or 28 <= buf[pos] <= 31):
+                    pos += 1
+                if pos + 1 < end and buf[pos] == 47 and buf[pos + 1] == 47:
+                    comment_lines += 1
+                else:
+                    # 找本行第一个 /*，其后没有 */ 时进入块注释
+                    while pos + 1 < end and not (buf[pos] == 47 and buf[pos + 1] == 42):
+                        pos += 1
+                    if pos + 1 < end:
+                        comment_lines += 1
+                        in_block_comment = True
+                        pos += 2
+                        while pos + 1 < end:
+                            if buf[pos] == 42 and buf[pos + 1] == 47:
+                                in_block_comment = False
+                                break
+                            pos += 1
+            start = end + 1
+        
+        return comment_lines
+
 def count_comment_lines(content: str, language: str) -> int:
     """
     计算代码中的注释行数
     
+    逐行判断改为在整段内容上用正则和 str.find 扫描，只在块注释的起止处
+    做少量 Python 层处理，统计结果与逐行判断一致。
+    
     Args:
         content: 代码内容
         language: 编程语言
@@ -124,26 +233,77 @@ def count_comment_lines(content: str, language: str) -> int:
         int: 注释行数
     """
     # 简单实现，实际中应该根据语言不同使用更精确的方法
+    length = len(content)
+    if language == "python":
+        return _count_marked_lines(_PY_COMMENT_LINE_RE, '#', content, 0, length)
+    if language not in ["javascript", "typescript", "java", "cpp", "csharp"]:
+        return 0
+    
+    # 安装numba时使用编译后的逐字节实现
+    if NUMBA_AVAILABLE and (content.isascii() or not _NON_ASCII_SPACE_RE.search(content)):
+        buf = np.frombuffer(content.encode("utf-8", "surrogatepass"), dtype=np.uint8)
+        return int(_c_comment_lines_bytes(buf))
+    
     comment_lines = 0
-    lines = content.split('\n')
+    pos = 0  # 当前待处理行的起始位置
+    while pos <= length:
+        # 块注释外：找下一个含 "/*" 的行，之前的行只统计 // 开头的注释
+        block_start = content.find("/*", pos)
+        if block_start == -1:
+            comment_lines += _count_marked_lines(_LINE_COMMENT_RE, "//", content, pos, length)
+            break
+        line_start = content.rfind("\n", pos, block_start) + 1 or pos
+        comment_lines += _count_marked_lines(_LINE_COMMENT_RE, "//", content, pos, line_start)
+        line_end = content.find("\n", block_start)
+        if line_end == -1:
+            line_end = length
+        
+        # 含 "/*" 的行计为注释；以 // 开头或本行内闭合时不进入块注释
+        comment_lines += 1
+        pos = line_end + 1
+        if content.find("*/", block_start + 2, line_end) != -1 or \
+                content[line_start:line_end].lstrip().startswith("//"):
+            continue
+        
+        # 块注释内：直到含 "*/" 的行（含）都计为注释
+        block_end = content.find("*/", pos)
+        if block_end == -1:
+            if pos <= length:
+                comment_lines += content.count("\n", pos) + 1
+            break
+        comment_lines += content.count("\n", pos, block_end) + 1
+        line_end = content.find("\n", block_end)
+        pos = (line_end if line_end != -1 else length) + 1
     
-    if language == "python":
-        for line in lines:
-            if line.strip().startswith('#'):
-                comment_lines += 1
-    elif language in ["javascript", "typescript", "java", "cpp", "csharp"]:
-        in_block_comment = False
-        for line in lines:
-            stripped = line.strip()
-            if in_block_comment:
-                comment_lines += 1
-                if "*/" in stripped:
-                    in_block_comment = False
-            elif stripped.startswith('//'):
-                comment_lines += 1
-            elif "/*" in stripped:
-                comment_lines += 1
-                if "*/" not in stripped[stripped.index("/*")+2:]:
-                    in_block_comment = True
+    return comment_lines
+
+def newline_offsets(content: str) -> List[int]:
+    """
+    获取内容中所有换行符的位置
     
-    return comment_lines 
\ No newline at end of file
+    Args:
+        content: 代码内容
+        
+    Returns:
+        List[int]: 升序排列的换行符下标
+    """
+    offsets = []
+    pos = content.find('\n')
+    while pos != -1:
+        offsets.append(pos)
+        pos = content.find('\n', pos + 1)
+    return offsets
+
+
+def offset_to_line(newlines: List[int], offset: int) -> int:
+    """
+    将字符位置换算为行号，等价于 content[:offset].count('\\n') + 1
+    
+    Args:
+        newlines: newline_offsets 得到的换行符位置列表
+        offset: 字符位置
+        
+    Returns:
+        int: 从1开始的行号
+    """
+    return bisect_left(newlines, offset) + 1
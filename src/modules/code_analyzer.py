@@ -1,13 +1,48 @@
 import re
 import os
+import heapq
+import threading
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Set, Tuple
+from pickle import PicklingError
+from stat import S_ISREG
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterator
+
+from src.utils import process_pool
+
+def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    复制分析结果，使调用方修改返回值时不影响缓存
+    
+    复制结果字典及其中的列表和字典（metrics、structure、quality等），更深层的内容仍与缓存共享。
+    
+    Args:
+        result: 分析结果
+        
+    Returns:
+        Dict[str, Any]: 结果副本
+    """
+    copied = {}
+    for key, value in result.items():
+        if type(value) in (list, dict):
+            value = value.copy()
+        copied[key] = value
+    return copied
+
 
 class CodeAnalyzer:
     """
     代码分析模块，提供代码结构分析、质量评估和优化建议
     """
     
+    # 待分析文件数达到该值时使用多进程并行分析，文件较少时进程池的启动开销大于收益
+    PARALLEL_MIN_FILES = 32
+    # 每次派发给工作进程的文件数
+    PARALLEL_CHUNKSIZE = 16
+    # 单文件分析结果缓存的最大条目数
+    FILE_CACHE_SIZE = 4096
+    
     def __init__(self, max_file_size: int = 1_000_000):
         """
         初始化代码分析模块
@@ -42,8 +77,25 @@ class CodeAnalyzer:
             }
         }
         
+        # 单文件分析结果缓存：文件路径 -> (修改时间ns, 文件大小, 分析结果)
+        # 文件未变化时直接复用结果，使重复的项目分析只处理新增或修改过的文件
+        self._file_cache: "OrderedDict[str, Tuple[int, int, Dict[str, Any]]]" = OrderedDict()
+        self._file_cache_lock = threading.Lock()
+        
         print("代码分析模块初始化完成")
     
+    def __getstate__(self):
+        """序列化到工作进程时不携带结果缓存和锁"""
+        state = self.__dict__.copy()
+        del state["_file_cache"]
+        del state["_file_cache_lock"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._file_cache = OrderedDict()
+        self._file_cache_lock = threading.Lock()
+    
     def analyze_file(self, file_path: str) -> Dict[str, Any]:
         """
         分析单个文件
@@ -55,32 +107,65 @@ class CodeAnalyzer:
             Dict[str, Any]: 分析结果
         """
         path = Path(file_path)
-        if not path.exists() or not path.is_file():
+        
+        # 先根据扩展名确定文件语言，不支持的类型无需访问文件系统
+        language = self._detect_language_by_extension(path.suffix)
+        if not language:
+            return {"error": f"不支持的文件类型: {path.suffix}"}
+        
+        # 一次stat同时判断文件是否存在、是否为普通文件及文件大小
+        try:
+            stat = path.stat()
+        except OSError:
+            return {"error": f"文件不存在: {file_path}"}
+        if not S_ISREG(stat.st_mode):
             return {"error": f"文件不存在: {file_path}"}
             
         # 检查文件大小
-        file_size = path.stat().st_size
+        file_size = stat.st_size
         if file_size > self.max_file_size:
             return {"error": f"文件过大 ({file_size} 字节), 超过限制 ({self.max_file_size} 字节)"}
+        
+        cached = self._get_cached_result(file_path, file_size, stat.st_mtime_ns)
+        if cached is not None:
+            return cached
             
-        # 确定文件语言
-        language = self._detect_language_by_extension(path.suffix)
-        if not language:
-            return {"error": f"不支持的文件类型: {path.suffix}"}
+        result = self._analyze_source(file_path, language, file_size)
+        self._store_cached_result(file_path, file_size, stat.st_mtime_ns, result)
+        return result
+    
+    def _analyze_source(self, file_path: str, language: str, file_size: int) -> Dict[str, Any]:
+        """
+        读取并分析已确定语言和大小的源文件
+        
+        Args:
+            file_path: 文件路径
+            language: 文件语言
+            file_size: 文件大小(字节)
             
+        Returns:
+            Dict[str, Any]: 分析结果
+        """
+        path = Path(file_path)
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            with open(file_path, 'rb') as f:
+                content = f.read().decode('utf-8')
+            # 与文本模式读取一致，统一换行符为\n
+            if '\r' in content:
+                content = content.replace('\r\n', '\n').replace('\r', '\n')
+            
+            # 只拆分一次行列表，供各项分析共用
+            lines = content.split('\n')
                 
             # 进行文件分析
             result = {
                 "file": str(path),
                 "language": language,
                 "size": file_size,
-                "lines": content.count('\n') + 1,
-                "metrics": self._calculate_metrics(content, language),
+                "lines": len(lines),
+                "metrics": self._calculate_metrics(content, language, lines),
                 "structure": self._analyze_structure(content, language),
-                "quality": self._analyze_quality(content, language),
+                "quality": self._analyze_quality(content, language, lines),
                 "summary": {},  # 将在最后填充
             }
             
@@ -118,41 +203,129 @@ class CodeAnalyzer:
             "top_large_files": []
         }
         
-        # 分析项目中的每个文件
-        for root, dirs, files in os.walk(project_dir):
-            # 排除指定目录
-            dirs[:] = [d for d in dirs if d not in exclude_dirs]
-            
-            for file in files:
-                file_path = os.path.join(root, file)
-                language = self._detect_language_by_extension(Path(file).suffix)
+        # 收集支持的源文件，超过大小限制的文件直接跳过
+        sources = [source for source in self._iter_source_files(project_dir, set(exclude_dirs))
+                   if source[2] <= self.max_file_size]
+        
+        # 命中缓存的文件直接复用结果，只分析新增或修改过的文件
+        file_results = [self._get_cached_result(file_path, file_size, mtime_ns)
+                        for file_path, _, file_size, mtime_ns in sources]
+        pending = [i for i, file_result in enumerate(file_results) if file_result is None]
+        analyzed = self._analyze_sources([sources[i][:3] for i in pending])
+        for i, file_result in zip(pending, analyzed):
+            file_path, _, file_size, mtime_ns = sources[i]
+            self._store_cached_result(file_path, file_size, mtime_ns, file_result)
+            file_results[i] = file_result
+        
+        # 汇总每个文件的分析结果
+        for (file_path, language, _, _), file_result in zip(sources, file_results):
+            if "error" not in file_result:
+                results["files"].append(file_result)
+                results["file_count"] += 1
                 
-                if language:  # 只分析支持的文件类型
-                    file_result = self.analyze_file(file_path)
-                    if "error" not in file_result:
-                        results["files"].append(file_result)
-                        results["file_count"] += 1
-                        
-                        # 更新语言统计
-                        if language in results["language_stats"]:
-                            results["language_stats"][language] += 1
-                        else:
-                            results["language_stats"][language] = 1
+                # 更新语言统计
+                if language in results["language_stats"]:
+                    results["language_stats"][language] += 1
+                else:
+                    results["language_stats"][language] = 1
         
         # 生成项目摘要
         results["summary"] = self._generate_project_summary(results)
         
-        # 找出最复杂的文件和最大的文件
-        sorted_by_complexity = sorted(results["files"], 
-                                     key=lambda x: x["metrics"].get("complexity", {}).get("cyclomatic", 0), 
-                                     reverse=True)
-        results["top_complex_files"] = sorted_by_complexity[:5]
-        
-        sorted_by_size = sorted(results["files"], key=lambda x: x["size"], reverse=True)
-        results["top_large_files"] = sorted_by_size[:5]
+        # 找出最复杂的文件和最大的文件（只需前5个，无需对全部文件排序）
+        results["top_complex_files"] = heapq.nlargest(
+            5, results["files"], key=lambda x: x["metrics"].get("complexity", {}).get("cyclomatic", 0))
+        results["top_large_files"] = heapq.nlargest(5, results["files"], key=lambda x: x["size"])
         
         return results
     
+    def _iter_source_files(self, directory: str, exclude_dirs: Set[str]) -> Iterator[Tuple[str, str, int, int]]:
+        """
+        递归遍历目录中支持分析的源文件
+        
+        基于 os.scandir 遍历，文件大小和修改时间取自目录项自带的 stat 信息。
+        与 os.walk 的顺序一致：先输出当前目录的文件，再依次进入子目录。
+        
+        Args:
+            directory: 目录路径
+            exclude_dirs: 要排除的目录名集合
+            
+        Yields:
+            Tuple[str, str, int, int]: (文件路径, 语言, 文件大小, 修改时间ns)
+        """
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            if entry.name not in exclude_dirs:
+                                subdirs.append(entry.path)
+                            continue
+                        language = self._detect_language_by_extension(os.path.splitext(entry.name)[1])
+                        if language:  # 只分析支持的文件类型
+                            stat = entry.stat()
+                            yield entry.path, language, stat.st_size, stat.st_mtime_ns
+                    except OSError:
+                        continue
+        except OSError:
+            return
+        
+        for subdir in subdirs:
+            yield from self._iter_source_files(subdir, exclude_dirs)
+    
+    def _analyze_sources(self, sources: List[Tuple[str, str, int]]) -> List[Dict[str, Any]]:
+        """
+        批量分析源文件，文件较多时使用共享进程池并行
+        
+        进程池在服务进程中被禁用（见 src.utils.process_pool），此时在当前进程内串行分析。
+        
+        Args:
+            sources: (文件路径, 语言, 文件大小) 列表
+            
+        Returns:
+            List[Dict[str, Any]]: 与输入顺序一致的分析结果列表
+        """
+        executor = process_pool.get_executor() if len(sources) >= self.PARALLEL_MIN_FILES else None
+        if executor is not None:
+            try:
+                return list(executor.map(self._analyze_source, *zip(*sources),
+                                         chunksize=self.PARALLEL_CHUNKSIZE))
+            except (OSError, BrokenProcessPool, PicklingError):
+                # 无法创建或使用工作进程时回退为串行分析
+                process_pool.discard(executor)
+        
+        return [self._analyze_source(*source) for source in sources]
+    
+    def _get_cached_result(self, file_path: str, file_size: int, mtime_ns: int) -> Optional[Dict[str, Any]]:
+        """
+        获取文件未变化时缓存的分析结果
+        
+        Args:
+            file_path: 文件路径
+            file_size: 当前文件大小
+            mtime_ns: 当前修改时间(纳秒)
+            
+        Returns:
+            Optional[Dict[str, Any]]: 缓存的分析结果副本，未命中或文件已变化时返回None
+        """
+        with self._file_cache_lock:
+            entry = self._file_cache.get(file_path)
+            if entry is None or entry[0] != mtime_ns or entry[1] != file_size:
+                return None
+            self._file_cache.move_to_end(file_path)
+        return _copy_result(entry[2])
+    
+    def _store_cached_result(self, file_path: str, file_size: int, mtime_ns: int,
+                             result: Dict[str, Any]) -> None:
+        """缓存文件分析结果的副本，超出容量时淘汰最久未使用的条目"""
+        result = _copy_result(result)
+        with self._file_cache_lock:
+            self._file_cache[file_path] = (mtime_ns, file_size, result)
+            self._file_cache.move_to_end(file_path)
+            while len(self._file_cache) > self.FILE_CACHE_SIZE:
+                self._file_cache.popitem(last=False)
+    
     def suggest_improvements(self, analysis_result: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         基于分析结果提供改进建议
@@ -225,14 +398,16 @@ class CodeAnalyzer:
                 return language
         return None
     
-    def _calculate_metrics(self, content: str, language: str) -> Dict[str, Any]:
-        """计算代码度量指标"""
+    def _calculate_metrics(self, content: str, language: str,
+                           lines: Optional[List[str]] = None) -> Dict[str, Any]:
+        """计算代码度量指标，lines 为已拆分的行列表，未提供时从 content 拆分"""
         # 这里是简化的度量计算
         # 实际实现中会根据语言特性进行更精确的计算
         
-        lines = content.count('\n') + 1
-        non_blank_lines = len([line for line in content.split('\n') if line.strip()])
-        comment_lines = self._count_comment_lines(content, language)
+        if lines is None:
+            lines = content.split('\n')
+        non_blank_lines = sum(1 for line in lines if line.strip())
+        comment_lines = self._count_comment_lines(content, language, lines)
         
         # 简化的圈复杂度计算
         if language == "python":
@@ -246,7 +421,7 @@ class CodeAnalyzer:
         cyclomatic_complexity = decision_points + 1
         
         return {
-            "lines": lines,
+            "lines": len(lines),
             "non_blank_lines": non_blank_lines,
             "comment_lines": comment_lines,
             "comment_ratio": comment_lines / non_blank_lines if non_blank_lines > 0 else 0,
@@ -345,8 +520,9 @@ class CodeAnalyzer:
         
         return structure
     
-    def _analyze_quality(self, content: str, language: str) -> Dict[str, Any]:
-        """分析代码质量"""
+    def _analyze_quality(self, content: str, language: str,
+                         lines: Optional[List[str]] = None) -> Dict[str, Any]:
+        """分析代码质量，lines 为已拆分的行列表，未提供时从 content 拆分"""
         quality = {
             "issues": []
         }
@@ -354,7 +530,8 @@ class CodeAnalyzer:
         # 检查代码气味
         if language == "python":
             # 检查过长的行
-            lines = content.split('\n')
+            if lines is None:
+                lines = content.split('\n')
             for i, line in enumerate(lines):
                 if len(line) > 100:  # PEP8建议最大行长度
                     quality["issues"].append({
@@ -410,14 +587,17 @@ class CodeAnalyzer:
         
         return quality
     
-    def _count_comment_lines(self, content: str, language: str) -> int:
+    def _count_comment_lines(self, content: str, language: str,
+                             lines: Optional[List[str]] = None) -> int:
         """计算注释行数"""
+        if lines is None:
+            lines = content.split('\n')
         if language == "python":
             # 简化: 只计算#开头的注释行
-            return len([line for line in content.split('\n') if line.strip().startswith('#')])
+            return sum(1 for line in lines if line.lstrip().startswith('#'))
         elif language in ["javascript", "typescript", "java", "cpp", "csharp"]:
             # 简化计算: 只计算//开头的注释行
-            return len([line for line in content.split('\n') if line.strip().startswith('//')])
+            return sum(1 for line in lines if line.lstrip().startswith('//'))
         else:
             return 0
     
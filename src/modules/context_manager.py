@@ -529,5 +529,19 @@ class ContextManager:
             logger.error(f"加载上下文失败: {str(e)}")
 
 
-# 创建单例实例
-context_manager = ContextManager() 
\ No newline at end of file
+# 单例实例，首次访问时创建
+_instance = None
+
+def get_instance() -> ContextManager:
+    """获取上下文管理器单例实例"""
+    global _instance
+    if _instance is None:
+        _instance = ContextManager()
+    return _instance
+
+
+def __getattr__(name):
+    """兼容 from ... import context_manager 的写法，首次访问时才创建实例（PEP 562）"""
+    if name == "context_manager":
+        return get_instance()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
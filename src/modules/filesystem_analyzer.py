@@ -315,4 +315,22 @@ class FilesystemAnalyzer:
             return True
         except Exception as e:
             logger.error(f"导出目录结构失败: {str(e)}")
-            return False 
\ No newline at end of file
+            return False 
+
+
+# 单例实例，首次访问时创建
+_instance = None
+
+def get_instance() -> FilesystemAnalyzer:
+    """获取文件系统分析器单例实例"""
+    global _instance
+    if _instance is None:
+        _instance = FilesystemAnalyzer()
+    return _instance
+
+
+def __getattr__(name):
+    """兼容 from ... import filesystem_analyzer 的写法，首次访问时才创建实例（PEP 562）"""
+    if name == "filesystem_analyzer":
+        return get_instance()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
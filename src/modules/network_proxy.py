@@ -644,5 +644,19 @@ class NetworkProxy:
         log.info("NetworkProxy closed")
 
 
-# 创建单例实例
-network_proxy = NetworkProxy()
\ No newline at end of file
+# 单例实例，首次访问时创建
+_instance = None
+
+def get_instance() -> NetworkProxy:
+    """获取网络代理单例实例"""
+    global _instance
+    if _instance is None:
+        _instance = NetworkProxy()
+    return _instance
+
+
+def __getattr__(name):
+    """兼容 from ... import network_proxy 的写法，首次访问时才创建实例（PEP 562）"""
+    if name == "network_proxy":
+        return get_instance()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
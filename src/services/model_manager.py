@@ -9,7 +9,10 @@ import psutil
 from pathlib import Path
 
 from src.utils import config, logger
-from src.services.model_service import ModelService, OllamaService, ModelServiceFactory
+from src.services.model_service import ModelService, OllamaService, ModelServiceFactory, get_probe_session
+
+# Ollama 服务探测的 (连接, 读取) 超时秒数
+OLLAMA_PROBE_TIMEOUT = (1.0, 2.0)
 
 # 创建日志记录器
 log = logger.get_logger("model_manager")
@@ -82,8 +85,9 @@ class ModelManager:
         embedding_models = config.get("models.embedding.available_models", [])
         self._available_models = {m.get("name"): m for m in inference_models + embedding_models}
         
-        # 检查模型服务和可用模型
-        self._check_model_service()
+        # 检查模型服务和可用模型（在后台线程中探测，不阻塞启动）
+        self._service_probe_thread = threading.Thread(target=self._check_model_service, daemon=True)
+        self._service_probe_thread.start()
         
         # 开始自动卸载定时器
         if self._auto_unload:
@@ -382,29 +386,25 @@ class ModelManager:
     
     def _check_model_service(self):
         """检查模型服务状态和可用模型"""
+        api_base = config.get("models.inference.api_base", "http://localhost:11434")
+        
         try:
-            api_base = config.get("models.inference.api_base", "http://localhost:11434")
-            import requests
-            
-            try:
-                response = requests.get(f"{api_base}/api/tags")
-                if response.status_code == 200:
-                    models_data = response.json().get("models", [])
-                    loaded_models = {m.get("name", "").split(":")[0] for m in models_data}
-                    logger.info(f"检测到已加载模型: {', '.join(loaded_models)}")
-                    
-                    # 更新已加载模型集合
+            response = get_probe_session().get(f"{api_base}/api/tags", timeout=OLLAMA_PROBE_TIMEOUT)
+            if response.status_code == 200:
+                models_data = response.json().get("models", [])
+                loaded_models = {m.get("name", "").split(":")[0] for m in models_data}
+                logger.info(f"检测到已加载模型: {', '.join(loaded_models)}")
+                
+                # 更新已加载模型集合（探测在后台线程运行，需要加锁）
+                with self._lock:
                     for model in loaded_models:
                         if any(model in avail_model for avail_model in self._available_models.keys()):
                             self._loaded_models.add(model)
                             self._model_last_used[model] = time.time()
-                else:
-                    logger.warning(f"Ollama服务响应异常: {response.status_code}")
-            except Exception as e:
-                logger.warning(f"无法连接到Ollama服务({api_base}): {str(e)}")
-                
-        except ImportError:
-            logger.error("缺少请求库: requests")
+            else:
+                logger.warning(f"Ollama服务响应异常: {response.status_code}")
+        except Exception as e:
+            logger.warning(f"无法连接到Ollama服务({api_base}): {str(e)}")
     
     def _start_unload_timer(self):
         """启动自动卸载定时器"""
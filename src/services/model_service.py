@@ -1,11 +1,37 @@
 import requests
 import json
 import time
+import threading
 from abc import ABC, abstractmethod
 from typing import Dict, List, Any, Optional, Union, Generator, Callable
 
+from requests.adapters import HTTPAdapter
+
 from src.utils import config, logger
 
+# 健康探测共享的HTTP会话（保持长连接，避免每次探测重新建立TCP连接）
+_probe_session: Optional[requests.Session] = None
+_probe_session_lock = threading.Lock()
+
+
+def get_probe_session() -> requests.Session:
+    """
+    获取用于Ollama健康探测的共享HTTP会话
+    
+    Returns:
+        requests.Session: 启用连接复用的会话
+    """
+    global _probe_session
+    if _probe_session is None:
+        with _probe_session_lock:
+            if _probe_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _probe_session = session
+    return _probe_session
+
 
 class ModelService(ABC):
     """
@@ -75,8 +101,7 @@ class ModelService(ABC):
         try:
             # 尝试简单请求以检查服务状态
             if self.provider == "ollama":
-                import requests
-                response = requests.get(f"{self.api_base}/api/tags", timeout=2)
+                response = get_probe_session().get(f"{self.api_base}/api/tags", timeout=2)
                 return response.status_code == 200
             elif self.provider == "openai":
                 # 不实际调用API，只检查是否有token
@@ -109,6 +134,10 @@ class OllamaService(ModelService):
         self.chat_endpoint = f"{self.api_base}/api/chat"
         self.max_retries = config.get("models.inference.max_retries", 3)
         self.retry_delay = config.get("models.inference.retry_delay_seconds", 1)
+        # 请求默认参数在初始化时读取一次，避免每次请求重复查询配置
+        self.default_temperature = config.get("models.inference.temperature", 0.2)
+        self.default_timeout = config.get("models.inference.timeout_seconds", None)
+        self.embedding_timeout = config.get("models.embedding.timeout_seconds", 30)
         
         logger.info(f"初始化Ollama模型服务，推理模型: {self.inference_model}，嵌入模型: {self.embedding_model}")
     
@@ -133,8 +162,8 @@ class OllamaService(ModelService):
             str: 生成的文本
         """
         model = model or self.inference_model
-        temperature = temperature or config.get("models.inference.temperature", 0.2)
-        timeout = timeout or config.get("models.inference.timeout_seconds", 30)
+        temperature = temperature or self.default_temperature
+        timeout = timeout or self.default_timeout or 30
         
         # 准备请求数据
         data = {
@@ -196,8 +225,8 @@ class OllamaService(ModelService):
             str: 生成的文本片段
         """
         model = model or self.inference_model
-        temperature = temperature or config.get("models.inference.temperature", 0.2)
-        timeout = timeout or config.get("models.inference.timeout_seconds", 60)
+        temperature = temperature or self.default_temperature
+        timeout = timeout or self.default_timeout or 60
         
         # 准备请求数据
         data = {
@@ -270,7 +299,7 @@ class OllamaService(ModelService):
             List[List[float]]: 嵌入向量列表
         """
         model = model or self.embedding_model
-        timeout = timeout or config.get("models.embedding.timeout_seconds", 30)
+        timeout = timeout or self.embedding_timeout
         
         # 确保texts是列表
         if isinstance(texts, str):
@@ -319,7 +348,7 @@ class OllamaService(ModelService):
         """
         try:
             # 检查API是否可访问
-            response = requests.get(f"{self.api_base}/api/tags", timeout=5)
+            response = get_probe_session().get(f"{self.api_base}/api/tags", timeout=5)
             
             if response.status_code != 200:
                 logger.warning(f"Ollama健康检查失败，状态码: {response.status_code}")
@@ -332,16 +361,16 @@ class OllamaService(ModelService):
                 return False
                 
             # 检查推理模型是否可用
-            inference_base_name = self.inference_model.split(":")[0]
-            embedding_base_name = self.embedding_model.split(":")[0]
+            inference_base_name = self.inference_model.split(":", 1)[0]
+            embedding_base_name = self.embedding_model.split(":", 1)[0]
             
-            model_names = [m.get("name", "").split(":")[0] for m in models]
+            model_names = {m.get("name", "").split(":", 1)[0] for m in models}
             
-            if not any(inference_base_name == name for name in model_names):
+            if inference_base_name not in model_names:
                 logger.warning(f"Ollama健康检查: 未找到推理模型 {inference_base_name}")
                 return False
                 
-            if not any(embedding_base_name == name for name in model_names):
+            if embedding_base_name not in model_names:
                 logger.warning(f"Ollama健康检查: 未找到嵌入模型 {embedding_base_name}")
                 return False
             
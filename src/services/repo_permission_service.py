@@ -8,23 +8,29 @@ import os
 import json
 import time
 import logging
+import threading
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 from datetime import datetime
 
-from sqlalchemy import and_, or_
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, func, select
+from sqlalchemy.orm import Session, raiseload, undefer
 
 from src.utils import config
 from src.database.models import (
     get_session, User, Repository, UserPermission,
-    TeamPermission, ProtectionRule, AuditLog, Team
+    TeamPermission, ProtectionRule, AuditLog, AuditLogRecord, Team
 )
 from src.services.user_service import get_instance as get_user_service
 
 logger = logging.getLogger(__name__)
 
+# 流式读取审计日志时每批从游标获取的行数
+AUDIT_LOG_FETCH_BATCH = 200
+
 class RepoPermissionService:
     """
     仓库权限管理服务
@@ -68,6 +74,11 @@ class RepoPermissionService:
         "block_force_push": "阻止强制推送"
     }
     
+    # 用于合法性校验的不可变集合
+    ROLES_SET = frozenset(ROLES)
+    OPERATIONS_SET = frozenset(OPERATIONS)
+    RULE_TYPES_SET = frozenset(RULE_TYPES)
+    
     def __init__(self):
         """初始化仓库权限服务"""
         # 加载配置
@@ -83,6 +94,15 @@ class RepoPermissionService:
         # 用户服务
         self._user_service = get_user_service()
         
+        # 后台任务（批量角色分配等），单线程执行以串行化写入
+        self._task_executor = ThreadPoolExecutor(
+            max_workers=self._permission_config.get("background_workers", 1),
+            thread_name_prefix="repo-permission-task"
+        )
+        self._tasks: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tasks_lock = threading.Lock()
+        self._max_tracked_tasks = self._permission_config.get("max_tracked_tasks", 1000)
+        
         # 初始化数据库（确保表已创建）
         self._init_database()
     
@@ -251,7 +271,7 @@ class RepoPermissionService:
         Returns:
             bool: 是否成功分配
         """
-        if role not in self.ROLES:
+        if role not in self.ROLES_SET:
             logger.error(f"无效的角色: {role}")
             return False
             
@@ -261,26 +281,7 @@ class RepoPermissionService:
                 return False
                 
             with get_session() as session:
-                # 检查是否已存在权限记录
-                perm = session.query(UserPermission).filter(
-                    and_(
-                        UserPermission.repository_id == repo.id,
-                        UserPermission.user_id == user_id
-                    )
-                ).first()
-                
-                if perm:
-                    # 更新现有权限
-                    perm.role = role
-                else:
-                    # 创建新权限
-                    perm = UserPermission(
-                        repository_id=repo.id,
-                        user_id=user_id,
-                        role=role
-                    )
-                    session.add(perm)
-                
+                self._upsert_user_permission(session, repo.id, user_id, role)
                 session.commit()
                 return True
                 
@@ -288,6 +289,183 @@ class RepoPermissionService:
             logger.error(f"分配用户角色失败: {str(e)}")
             return False
     
+    def assign_role_with_username(self, repo_id: str, user_id: int, role: str) -> Tuple[bool, Optional[str]]:
+        """
+        分配用户角色，并在同一会话中返回目标用户名
+        
+        供需要校验用户存在性并回显用户名的调用方使用，避免额外的用户查询。
+        
+        Args:
+            repo_id: 仓库ID
+            user_id: 用户ID
+            role: 角色名称
+            
+        Returns:
+            (是否成功分配, 用户名)，用户不存在时用户名为 None
+        """
+        if role not in self.ROLES_SET:
+            logger.error(f"无效的角色: {role}")
+            return False, None
+        
+        # 查询失败时返回空字符串，以区别于用户不存在的 None
+        username = ""
+        try:
+            with get_session() as session:
+                row = session.query(User.username).filter(User.id == user_id).first()
+                if not row:
+                    return False, None
+                username = row.username
+                
+                repo = session.query(Repository.id).filter(Repository.repo_id == repo_id).first()
+                if not repo:
+                    return False, username
+                
+                self._upsert_user_permission(session, repo.id, user_id, role)
+                session.commit()
+                return True, username
+                
+        except Exception as e:
+            logger.error(f"分配用户角色失败: {str(e)}")
+            return False, username
+    
+    def _upsert_user_permission(self, session: Session, repository_id: int, user_id: int, role: str):
+        """在给定会话中创建或更新用户权限记录"""
+        # 检查是否已存在权限记录
+        perm = session.query(UserPermission).filter(
+            and_(
+                UserPermission.repository_id == repository_id,
+                UserPermission.user_id == user_id
+            )
+        ).first()
+        
+        if perm:
+            # 更新现有权限
+            perm.role = role
+        else:
+            # 创建新权限
+            perm = UserPermission(
+                repository_id=repository_id,
+                user_id=user_id,
+                role=role
+            )
+            session.add(perm)
+    
+    def bulk_assign_roles(self, repo_id: str, assignments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        批量分配用户角色
+        
+        在同一个会话中一次查询已有权限记录并一次提交全部更改。
+        
+        Args:
+            repo_id: 仓库ID
+            assignments: 分配列表，每项包含 user_id 和 role
+            
+        Returns:
+            Dict[str, Any]: 包含成功数量 assigned 和失败用户ID列表 failed（格式错误的项记为None）
+        """
+        valid = {}
+        failed = []
+        for item in assignments:
+            if not isinstance(item, dict):
+                failed.append(None)
+                continue
+            user_id = item.get("user_id")
+            role = item.get("role")
+            # bool 是 int 的子类，需排除，否则 true 会被当作用户ID 1
+            if type(user_id) is not int or role not in self.ROLES_SET:
+                failed.append(user_id)
+                continue
+            valid[user_id] = role
+        
+        try:
+            repo = self.get_repository_by_id(repo_id)
+            if not repo:
+                return {"assigned": 0, "failed": failed + list(valid)}
+            
+            with get_session() as session:
+                existing_users = {
+                    row.id for row in session.query(User.id).filter(User.id.in_(valid))
+                }
+                existing_perms = {
+                    perm.user_id: perm for perm in session.query(UserPermission).filter(
+                        and_(
+                            UserPermission.repository_id == repo.id,
+                            UserPermission.user_id.in_(valid)
+                        )
+                    )
+                }
+                
+                assigned = 0
+                for user_id, role in valid.items():
+                    if user_id not in existing_users:
+                        failed.append(user_id)
+                        continue
+                    perm = existing_perms.get(user_id)
+                    if perm:
+                        perm.role = role
+                    else:
+                        session.add(UserPermission(
+                            repository_id=repo.id,
+                            user_id=user_id,
+                            role=role
+                        ))
+                    assigned += 1
+                
+                session.commit()
+                return {"assigned": assigned, "failed": failed}
+                
+        except Exception as e:
+            logger.error(f"批量分配用户角色失败: {str(e)}")
+            return {"assigned": 0, "failed": failed + list(valid)}
+    
+    def submit_bulk_assign_roles(self, repo_id: str, assignments: List[Dict[str, Any]]) -> str:
+        """
+        提交后台批量角色分配任务
+        
+        Args:
+            repo_id: 仓库ID
+            assignments: 分配列表，每项包含 user_id 和 role
+            
+        Returns:
+            str: 任务ID，可通过 get_task_status 查询结果
+        """
+        task_id = uuid.uuid4().hex
+        self._set_task(task_id, {"status": "pending", "result": None})
+        
+        def run():
+            # 线程池中的异常只会保存在 Future 里，需在此记录为失败，否则任务状态停留在 running
+            try:
+                self._set_task(task_id, {"status": "running", "result": None})
+                result = self.bulk_assign_roles(repo_id, assignments)
+                self._set_task(task_id, {"status": "finished", "result": result})
+            except Exception as e:
+                logger.error(f"批量分配用户角色任务失败: {str(e)}", exc_info=True)
+                self._set_task(task_id, {"status": "failed", "result": None, "error": str(e)})
+        
+        self._task_executor.submit(run)
+        return task_id
+    
+    def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取后台任务状态
+        
+        Args:
+            task_id: 任务ID
+            
+        Returns:
+            Optional[Dict[str, Any]]: 任务状态，任务不存在时返回 None
+        """
+        with self._tasks_lock:
+            task = self._tasks.get(task_id)
+            return dict(task) if task else None
+    
+    def _set_task(self, task_id: str, state: Dict[str, Any]):
+        """更新任务状态，超出上限时丢弃最早的任务记录"""
+        with self._tasks_lock:
+            self._tasks[task_id] = state
+            while len(self._tasks) > self._max_tracked_tasks:
+                self._tasks.popitem(last=False)
+    
     def assign_team_role(self, repo_id: str, team_id: int, role: str) -> bool:
         """
         分配团队角色
@@ -300,7 +478,7 @@ class RepoPermissionService:
         Returns:
             bool: 是否成功分配
         """
-        if role not in self.ROLES:
+        if role not in self.ROLES_SET:
             logger.error(f"无效的角色: {role}")
             return False
             
@@ -407,8 +585,8 @@ class RepoPermissionService:
                 return self._default_role
                 
             with get_session() as session:
-                # 检查用户直接权限
-                user_perm = session.query(UserPermission).filter(
+                # 检查用户直接权限（只读取本表字段，禁止任何关系加载）
+                user_perm = session.query(UserPermission).options(raiseload("*")).filter(
                     and_(
                         UserPermission.repository_id == repo.id,
                         UserPermission.user_id == user_id
@@ -446,6 +624,22 @@ class RepoPermissionService:
             logger.error(f"获取用户角色失败: {str(e)}")
             return self._default_role
     
+    def get_user_role_with_permissions(self, repo_id: str, user_id: int) -> Tuple[str, List[str]]:
+        """
+        获取用户在仓库中的角色及该角色的权限列表
+        
+        角色权限来自预定义的 ROLES，无需额外查询，调用方只需一次调用即可同时拿到两者。
+        
+        Args:
+            repo_id: 仓库ID
+            user_id: 用户ID
+            
+        Returns:
+            (角色名称, 权限列表)
+        """
+        role = self.get_user_role(repo_id, user_id)
+        return role, list(self.ROLES.get(role, {}).get("permissions", []))
+    
     def get_team_role(self, repo_id: str, team_id: int) -> str:
         """获取团队在仓库中的角色"""
         try:
@@ -492,7 +686,7 @@ class RepoPermissionService:
                         "full_name": user.full_name,
                         "email": user.email,
                         "role": perm.role,
-                        "custom_permissions": perm.get_custom_permissions()
+                        "custom_permissions": perm.custom_permissions
                     })
                     
                 return result
@@ -511,6 +705,8 @@ class RepoPermissionService:
             with get_session() as session:
                 perms = session.query(TeamPermission, Team).join(
                     Team, TeamPermission.team_id == Team.id
+                ).options(
+                    undefer(Team.member_count)
                 ).filter(
                     TeamPermission.repository_id == repo.id
                 ).all()
@@ -522,8 +718,8 @@ class RepoPermissionService:
                         "team_name": team.name,
                         "description": team.description,
                         "role": perm.role,
-                        "custom_permissions": perm.get_custom_permissions(),
-                        "member_count": len(team.members)
+                        "custom_permissions": perm.custom_permissions,
+                        "member_count": team.member_count
                     })
                     
                 return result
@@ -544,7 +740,7 @@ class RepoPermissionService:
         Returns:
             bool: 是否有权限
         """
-        if operation not in self.OPERATIONS:
+        if operation not in self.OPERATIONS_SET:
             logger.warning(f"未知的操作类型: {operation}")
             return False
             
@@ -562,8 +758,8 @@ class RepoPermissionService:
                 return False
                 
             with get_session() as session:
-                # 检查用户直接权限
-                user_perm = session.query(UserPermission).filter(
+                # 检查用户直接权限（只读取本表字段，禁止任何关系加载）
+                user_perm = session.query(UserPermission).options(raiseload("*")).filter(
                     and_(
                         UserPermission.repository_id == repo.id,
                         UserPermission.user_id == user_id
@@ -571,8 +767,7 @@ class RepoPermissionService:
                 ).first()
                 
                 if user_perm and user_perm.custom_permissions:
-                    custom_perms = user_perm.get_custom_permissions()
-                    if operation in custom_perms:
+                    if operation in user_perm.custom_permissions:
                         return True
             
             return False
@@ -594,7 +789,7 @@ class RepoPermissionService:
         Returns:
             bool: 是否成功设置
         """
-        if operation not in self.OPERATIONS:
+        if operation not in self.OPERATIONS_SET:
             logger.warning(f"未知的操作类型: {operation}")
             return False
             
@@ -621,15 +816,15 @@ class RepoPermissionService:
                     )
                     session.add(perm)
                 
-                # 更新自定义权限
-                custom_perms = perm.get_custom_permissions()
+                # 更新自定义权限（赋值新列表，以便变更被检测到）
+                custom_perms = list(perm.custom_permissions or [])
                 
                 if granted and operation not in custom_perms:
                     custom_perms.append(operation)
                 elif not granted and operation in custom_perms:
                     custom_perms.remove(operation)
                 
-                perm.set_custom_permissions(custom_perms)
+                perm.custom_permissions = custom_perms
                 session.commit()
                 
                 return True
@@ -712,7 +907,7 @@ class RepoPermissionService:
                 )
                 
                 if details:
-                    log.set_details(details)
+                    log.details = details
                     
                 session.add(log)
                 session.commit()
@@ -723,6 +918,47 @@ class RepoPermissionService:
             logger.error(f"记录审计日志失败: {str(e)}")
             return False
     
+    def log_operations(self, repo_id: str, records: List[Dict[str, Any]]) -> bool:
+        """
+        批量记录操作审计日志
+        
+        Args:
+            repo_id: 仓库ID
+            records: 日志列表，每项包含 user_id、operation，可选 details、target
+            
+        Returns:
+            bool: 是否成功记录
+        """
+        if not records:
+            return True
+            
+        try:
+            repo = self.get_repository_by_id(repo_id)
+            if not repo:
+                return False
+                
+            rows = [
+                {
+                    "user_id": record.get("user_id"),
+                    "repository_id": repo.id,
+                    "operation": record["operation"],
+                    "operation_description": self.OPERATIONS.get(record["operation"], record["operation"]),
+                    "target": record.get("target"),
+                    "details": record.get("details") or None
+                }
+                for record in records
+            ]
+            
+            with get_session() as session:
+                AuditLog.bulk_create(session, rows)
+                session.commit()
+                
+            return True
+                
+        except Exception as e:
+            logger.error(f"批量记录审计日志失败: {str(e)}")
+            return False
+    
     def get_audit_logs(self, repo_id: str, limit: int = 100, offset: int = 0) -> List[Dict]:
         """
         获取仓库审计日志
@@ -735,37 +971,47 @@ class RepoPermissionService:
         Returns:
             List[Dict]: 审计日志列表
         """
+        return [record.to_dict() for record in self.iter_audit_logs(repo_id, limit, offset)]
+    
+    def iter_audit_logs(self, repo_id: str, limit: int = 100, offset: int = 0) -> Iterator[AuditLogRecord]:
+        """
+        逐条迭代仓库审计日志
+        
+        直接遍历数据库游标，不在内存中构建完整结果列表，适用于流式输出。
+        
+        Args:
+            repo_id: 仓库ID
+            limit: 返回记录数量限制
+            offset: 记录偏移量
+            
+        Yields:
+            AuditLogRecord: 审计日志列表项
+        """
         try:
             repo = self.get_repository_by_id(repo_id)
             if not repo:
-                return []
+                return
                 
             with get_session() as session:
-                # 查询审计日志，关联用户信息
-                logs = session.query(AuditLog, User).outerjoin(
+                # 只查询需要的列，关联用户信息，不构造ORM对象
+                stmt = select(
+                    *AuditLog.list_columns(), User.username, User.full_name
+                ).outerjoin(
                     User, AuditLog.user_id == User.id
-                ).filter(
+                ).where(
                     AuditLog.repository_id == repo.id
                 ).order_by(
                     AuditLog.created_at.desc()
-                ).offset(offset).limit(limit).all()
-                
-                # 格式化结果
-                result = []
-                for log, user in logs:
-                    log_data = log.to_dict()
-                    if user:
-                        log_data["user"] = {
-                            "username": user.username,
-                            "full_name": user.full_name
-                        }
-                    result.append(log_data)
+                ).offset(offset).limit(limit).execution_options(
+                    yield_per=AUDIT_LOG_FETCH_BATCH, stream_results=True
+                )
                 
-                return result
+                # 按批从游标读取，每行构造为轻量的 slots 数据对象
+                for row in session.execute(stmt).mappings():
+                    yield AuditLogRecord.from_row(row)
                 
         except Exception as e:
             logger.error(f"获取审计日志失败: {str(e)}")
-            return []
     
     def set_protection_rule(self, repo_id: str, rule_type: str, 
                            enabled: bool = None, target: str = None,
@@ -820,9 +1066,7 @@ class RepoPermissionService:
                 
                 # 更新配置
                 if config:
-                    current_config = rule.get_config()
-                    current_config.update(config)
-                    rule.set_config(current_config)
+                    rule.config = {**(rule.config or {}), **config}
                 
                 session.commit()
                 return True
@@ -847,16 +1091,49 @@ class RepoPermissionService:
                 return []
                 
             with get_session() as session:
-                rules = session.query(ProtectionRule).filter(
-                    ProtectionRule.repository_id == repo.id
-                ).all()
+                rows = ProtectionRule.list_rows(session, repository_id=repo.id)
                 
-                return [rule.to_dict() for rule in rules]
+                return [
+                    {**row, "created_at": row["created_at"].isoformat() if row["created_at"] else None}
+                    for row in rows
+                ]
                 
         except Exception as e:
             logger.error(f"获取保护规则失败: {str(e)}")
             return []
     
+    def get_protection_rules_mtime(self, repo_id: str) -> Optional[str]:
+        """
+        获取仓库保护规则的版本标识
+        
+        由规则数量和最近更新时间组成，用于生成 ETag 以判断规则是否发生变化。
+        
+        Args:
+            repo_id: 仓库ID
+            
+        Returns:
+            Optional[str]: 版本标识，仓库不存在或查询失败时返回 None
+        """
+        try:
+            repo = self.get_repository_by_id(repo_id)
+            if not repo:
+                return None
+                
+            with get_session() as session:
+                last_modified, count = session.query(
+                    func.max(ProtectionRule.updated_at),
+                    func.count(ProtectionRule.id)
+                ).filter(
+                    ProtectionRule.repository_id == repo.id
+                ).one()
+                
+                timestamp = last_modified.isoformat() if last_modified else ""
+                return f"{count}:{timestamp}"
+                
+        except Exception as e:
+            logger.error(f"获取保护规则版本失败: {str(e)}")
+            return None
+    
     def check_protection_rule(self, repo_id: str, rule_type: str, params: Dict = None) -> Tuple[bool, str]:
         """
         检查保护规则
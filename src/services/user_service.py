@@ -389,7 +389,7 @@ class UserService:
                 )
                 
                 if permissions:
-                    new_key.set_permissions(permissions)
+                    new_key.permissions = list(permissions)
                 
                 session.add(new_key)
                 session.commit()
@@ -417,11 +417,12 @@ class UserService:
                 return False, None
                 
             with get_session() as session:
-                # 根据前缀查询可能的密钥
+                # 根据前缀查询可能的密钥，已过期的密钥直接在数据库中排除
                 key_prefix = api_key[:16]
                 possible_keys = session.query(ApiKey).filter(
                     ApiKey.key_prefix == key_prefix,
-                    ApiKey.is_active == True
+                    ApiKey.is_active == True,
+                    ~ApiKey.is_expired
                 ).all()
                 
                 if not possible_keys:
@@ -430,10 +431,6 @@ class UserService:
                 # 验证完整密钥
                 for key in possible_keys:
                     if self._verify_api_key(api_key, key.key_hash):
-                        # 检查是否过期
-                        if key.is_expired():
-                            return False, None
-                        
                         # 更新最后使用时间
                         key.last_used_at = datetime.utcnow()
                         session.commit()
@@ -0,0 +1,72 @@
+"""
+Flask JSON提供者
+
+基于 json_utils 的 Flask JSON 提供者，安装 orjson 时 jsonify 与 request.json
+均走 orjson 进行编解码；遇到 orjson 无法处理的类型时回退到 Flask 默认实现。
+"""
+
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+from src.utils import json_utils
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    使用 json_utils 编解码的 Flask JSON 提供者
+
+    orjson 按字典插入顺序输出，不对键排序。
+    """
+
+    sort_keys = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """
+        序列化为JSON字符串
+
+        Args:
+            obj: 待序列化对象
+            **kwargs: 传给标准库 json.dumps 的参数，指定时使用默认实现
+
+        Returns:
+            str: JSON字符串
+        """
+        if kwargs or self.sort_keys:
+            return super().dumps(obj, **kwargs)
+        try:
+            return json_utils.dumps(obj).decode("utf-8")
+        except TypeError:
+            return super().dumps(obj)
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        """
+        解析JSON字符串或字节串
+
+        Args:
+            s: JSON数据
+            **kwargs: 传给标准库 json.loads 的参数，指定时使用默认实现
+
+        Returns:
+            Any: 解析结果
+        """
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return json_utils.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """
+        序列化参数并构造JSON响应
+
+        调试模式或关闭紧凑输出时使用默认实现，以保留缩进格式。
+        """
+        if (self.compact is None and self._app.debug) or self.compact is False or self.sort_keys:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = json_utils.dumps(obj)
+        except TypeError:
+            body = super().dumps(obj, separators=(",", ":")).encode("utf-8")
+
+        return self._app.response_class(body, mimetype=self.mimetype)
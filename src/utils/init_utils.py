@@ -49,17 +49,17 @@ def ensure_directories():
         "data/exports"
     ]
     
-    # 确保所有目录都存在
-    for dir_path in dirs_to_create:
+    # 确保所有目录都存在（直接mkdir，已存在时由FileExistsError判断，省去一次exists()调用）
+    for dir_path in dict.fromkeys(dirs_to_create):
         if not dir_path:
             continue
             
-        path = Path(dir_path)
-        if not path.exists():
-            try:
-                path.mkdir(parents=True, exist_ok=True)
-                logger.info(f"创建目录: {dir_path}")
-            except Exception as e:
-                logger.error(f"创建目录 {dir_path} 失败: {str(e)}")
+        try:
+            Path(dir_path).mkdir(parents=True)
+            logger.info(f"创建目录: {dir_path}")
+        except FileExistsError:
+            pass
+        except Exception as e:
+            logger.error(f"创建目录 {dir_path} 失败: {str(e)}")
                 
     logger.info("已完成数据目录结构初始化") 
\ No newline at end of file
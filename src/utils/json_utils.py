@@ -0,0 +1,59 @@
+"""
+JSON序列化工具
+
+优先使用 orjson（可选依赖）进行序列化，未安装时回退到标准库 json。
+所有序列化结果统一为紧凑的 UTF-8 字节串，可直接作为响应体使用。
+dataclass 实例与 datetime 在两种实现下均可直接序列化。
+"""
+
+import json
+import dataclasses
+from datetime import date, datetime
+from typing import Any, Union
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _default(obj: Any) -> Any:
+    """标准库 json 回退路径下处理 dataclass 与日期时间类型"""
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {field.name: getattr(obj, field.name) for field in dataclasses.fields(obj)}
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    将对象序列化为紧凑的 UTF-8 JSON 字节串
+
+    Args:
+        obj: 待序列化对象
+
+    Returns:
+        bytes: JSON 字节串
+    """
+    if ORJSON_AVAILABLE:
+        # 与标准库行为一致：非字符串键（如整数）转换为字符串
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"),
+                      default=_default).encode("utf-8")
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """
+    解析 JSON 字节串或字符串
+
+    Args:
+        data: JSON 数据
+
+    Returns:
+        Any: 解析结果
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,81 @@
+"""
+代码分析共用的进程池
+
+进程池在首次使用时创建并在进程内复用，多次分析不会重复启动工作进程。
+工作进程以 spawn 方式启动：在多线程进程中 fork 会把其他线程持有的锁（如 logging 的锁）
+原样复制到子进程，子进程可能因此死锁，Python 3.12 起也会对此发出警告。
+Web 服务在请求处理线程中调用分析功能，应在启动时调用 set_enabled(False)，
+使分析在当前进程内完成，不在服务进程中创建工作进程。
+"""
+
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_enabled = True
+
+
+def set_enabled(enabled: bool) -> None:
+    """
+    启用或禁用共享进程池，禁用时关闭已创建的进程池
+
+    Args:
+        enabled: 是否允许使用进程池
+    """
+    global _enabled
+    _enabled = enabled
+    if not enabled:
+        shutdown()
+
+
+def get_executor() -> Optional[ProcessPoolExecutor]:
+    """
+    获取共享进程池，首次调用时创建
+
+    Returns:
+        Optional[ProcessPoolExecutor]: 进程池，已禁用或只有一个CPU核心时返回None
+    """
+    global _executor
+    if not _enabled:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            workers = os.cpu_count() or 1
+            if workers < 2:
+                return None
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def discard(executor: ProcessPoolExecutor) -> None:
+    """
+    丢弃无法继续使用的进程池（如工作进程异常退出），下次获取时重新创建
+
+    Args:
+        executor: 由 get_executor 返回的进程池
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def shutdown() -> None:
+    """关闭共享进程池并等待工作进程退出"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+atexit.register(shutdown)
@@ -0,0 +1,242 @@
+"""
+Tests for the repository permission API routes.
+
+The permission service is replaced by an in-memory fake so the routes can be
+exercised without a database; the background task bookkeeping uses the real
+RepoPermissionService methods.
+"""
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from pathlib import Path
+import threading
+
+# Add the project root to sys.path for direct imports
+project_root = Path(__file__).resolve().parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import pytest
+from flask import Flask
+from flask_login import LoginManager, UserMixin
+
+from src.api import repo_permission_routes
+from src.services.repo_permission_service import RepoPermissionService
+
+
+class FakeUser(UserMixin):
+    id = 1
+
+
+class FakePermissionService(RepoPermissionService):
+    """RepoPermissionService without database access."""
+
+    def __init__(self, role="admin"):
+        # Only the state needed by the task helpers; skips config and DB setup
+        self.role = role
+        self.assigned = []
+        self.audit_log_args = None
+        self.rules_mtime = 1700000000.0
+        self._task_executor = ThreadPoolExecutor(max_workers=1)
+        self._tasks = OrderedDict()
+        self._tasks_lock = threading.Lock()
+        self._max_tracked_tasks = 10
+
+    def get_user_role(self, repo_id, user_id):
+        return self.role
+
+    def get_user_role_with_permissions(self, repo_id, user_id):
+        return self.role, self.ROLES[self.role]["permissions"]
+
+    def bulk_assign_roles(self, repo_id, assignments):
+        self.assigned.extend(assignments)
+        return {"assigned": len(assignments), "failed": []}
+
+    def get_protection_rules_mtime(self, repo_id):
+        return self.rules_mtime
+
+    def get_protection_rules(self, repo_id):
+        return [{"rule_type": "require_review", "enabled": True}]
+
+    def iter_audit_logs(self, repo_id, limit=100, offset=0):
+        self.audit_log_args = (limit, offset)
+        return iter([{"id": offset + i, "operation": "push"} for i in range(min(limit, 3))])
+
+
+@pytest.fixture
+def service(monkeypatch):
+    fake = FakePermissionService()
+    monkeypatch.setattr(repo_permission_routes, "repo_permission_service", fake)
+    yield fake
+    fake._task_executor.shutdown(wait=True)
+
+
+@pytest.fixture
+def client(service):
+    app = Flask(__name__)
+    app.config["TESTING"] = True
+    app.secret_key = "test"
+    login_manager = LoginManager(app)
+    login_manager.request_loader(lambda request: FakeUser())
+    app.register_blueprint(repo_permission_routes.repo_permission_bp, url_prefix="/api")
+    return app.test_client()
+
+
+def _wait_for_task(client, task_id, timeout=5.0):
+    """Poll the task endpoint until the task leaves the pending/running states."""
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get(f"/api/repositories/r1/permissions/tasks/{task_id}")
+        assert response.status_code == 200
+        data = response.get_json()
+        if data["status"] not in ("pending", "running") or time.monotonic() > deadline:
+            return data
+        time.sleep(0.01)
+
+
+def test_bulk_assign_returns_task_and_finishes(client, service):
+    """A valid bulk request is accepted with 202 and the task reports its result."""
+    assignments = [{"user_id": 2, "role": "reader"}, {"user_id": 3, "role": "developer"}]
+    response = client.post("/api/repositories/r1/permissions/users/bulk",
+                           json={"assignments": assignments})
+    assert response.status_code == 202
+    task_id = response.get_json()["task_id"]
+
+    data = _wait_for_task(client, task_id)
+    assert data["status"] == "finished"
+    assert data["result"] == {"assigned": 2, "failed": []}
+    assert service.assigned == assignments
+
+
+@pytest.mark.parametrize("body", [
+    {"assignments": ["junk"]},
+    {"assignments": [{"user_id": 2, "role": "reader"}, 5]},
+    {"assignments": "junk"},
+    ["junk"],
+    {},
+])
+def test_bulk_assign_rejects_malformed_body(client, service, body):
+    """Bodies that are not a list of objects are rejected before a task is created."""
+    response = client.post("/api/repositories/r1/permissions/users/bulk", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+    assert not service._tasks
+
+
+def test_bulk_assign_rejects_invalid_json(client, service):
+    """A body that is not JSON is rejected with 400."""
+    response = client.post("/api/repositories/r1/permissions/users/bulk",
+                           data="not json", content_type="application/json")
+    assert response.status_code == 400
+    assert not service._tasks
+
+
+def test_bulk_assign_task_failure_is_reported(client, service, monkeypatch):
+    """An exception inside the background task marks the task as failed."""
+    def boom(repo_id, assignments):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(service, "bulk_assign_roles", boom)
+    response = client.post("/api/repositories/r1/permissions/users/bulk",
+                           json={"assignments": [{"user_id": 2, "role": "reader"}]})
+    assert response.status_code == 202
+
+    data = _wait_for_task(client, response.get_json()["task_id"])
+    assert data["status"] == "failed"
+    assert data["error"] == "database unavailable"
+
+
+def test_bulk_assign_service_skips_non_dict_items():
+    """bulk_assign_roles reports malformed items as failed instead of raising."""
+    service = RepoPermissionService.__new__(RepoPermissionService)
+    service.get_repository_by_id = lambda repo_id: None
+    assert service.bulk_assign_roles("r1", ["junk"]) == {"assigned": 0, "failed": [None]}
+    # bool is a subclass of int; true must not be taken as user ID 1
+    assignments = [{"user_id": True, "role": "reader"}, {"user_id": "2", "role": "reader"}]
+    assert service.bulk_assign_roles("r1", assignments) == {"assigned": 0, "failed": [True, "2"]}
+
+
+def test_bulk_assign_requires_admin(client, service):
+    service.role = "reader"
+    response = client.post("/api/repositories/r1/permissions/users/bulk",
+                           json={"assignments": []})
+    assert response.status_code == 403
+
+
+def test_unknown_task_returns_404(client):
+    response = client.get("/api/repositories/r1/permissions/tasks/missing")
+    assert response.status_code == 404
+
+
+def test_user_role_etag(client):
+    """The user role response carries an ETag and revalidates to 304."""
+    response = client.get("/api/repositories/r1/user_role")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert response.get_json()["role"] == "admin"
+
+    response = client.get("/api/repositories/r1/user_role", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+def test_user_role_etag_changes_with_role(client, service):
+    etag = client.get("/api/repositories/r1/user_role").headers["ETag"]
+    service.role = "reader"
+    response = client.get("/api/repositories/r1/user_role", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_protection_rules_etag_follows_mtime(client, service):
+    response = client.get("/api/repositories/r1/protection_rules")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    assert client.get("/api/repositories/r1/protection_rules",
+                      headers={"If-None-Match": etag}).status_code == 304
+
+    service.rules_mtime += 1
+    response = client.get("/api/repositories/r1/protection_rules", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_json()["rules"]
+
+
+def test_audit_logs_stream_valid_json(client, service):
+    """The streamed audit log body is a single valid JSON document."""
+    response = client.get("/api/repositories/r1/audit_logs?limit=3&offset=10")
+    assert response.status_code == 200
+    assert response.is_streamed
+    data = json.loads(response.get_data())
+    assert data == {"success": True, "logs": [
+        {"id": 10, "operation": "push"},
+        {"id": 11, "operation": "push"},
+        {"id": 12, "operation": "push"},
+    ]}
+    assert service.audit_log_args == (3, 10)
+
+
+def test_audit_logs_empty_stream(client, service):
+    service.iter_audit_logs = lambda repo_id, limit=100, offset=0: iter([])
+    response = client.get("/api/repositories/r1/audit_logs")
+    assert json.loads(response.get_data()) == {"success": True, "logs": []}
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("", (repo_permission_routes.AUDIT_LOG_DEFAULT_LIMIT, 0)),
+    ("?limit=0&offset=-5", (1, 0)),
+    ("?limit=999999", (repo_permission_routes.AUDIT_LOG_MAX_LIMIT, 0)),
+])
+def test_audit_logs_pagination_is_clamped(client, service, query, expected):
+    response = client.get(f"/api/repositories/r1/audit_logs{query}")
+    assert response.status_code == 200
+    response.get_data()
+    assert service.audit_log_args == expected
+
+
+def test_audit_logs_invalid_pagination(client, service):
+    response = client.get("/api/repositories/r1/audit_logs?limit=abc")
+    assert response.status_code == 400
+    assert service.audit_log_args is None
@@ -11,6 +11,7 @@ AIgo 配置更新工具
 import os
 import sys
 import json
+import hashlib
 import argparse
 from pathlib import Path
 import shutil
@@ -123,6 +124,46 @@ def set_in_nested_dict(d: Dict[str, Any], path: str, value: Any) -> None:
         current = current[key]
     current[keys[-1]] = value
 
+def _file_sha256(path: Path) -> Optional[str]:
+    """
+    计算文件的SHA-256摘要
+    
+    Args:
+        path: 文件路径
+        
+    Returns:
+        Optional[str]: 十六进制摘要，文件不存在时返回None
+    """
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _copy_file_atomic(src: Path, dst: Path) -> None:
+    """
+    将文件复制到临时文件后原子替换目标文件
+    
+    shutil.copyfile 会按平台选择内核态快速复制（Linux 的 sendfile、macOS 的 fcopyfile），
+    不可用时自动回退到普通读写；复制后保留源文件的权限位。
+    
+    Args:
+        src: 源文件路径
+        dst: 目标文件路径
+    """
+    dst = Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dst.with_name(dst.name + ".tmp")
+    try:
+        shutil.copyfile(src, tmp_path)
+        shutil.copymode(src, tmp_path)
+        os.replace(tmp_path, dst)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
 def create_default_config():
     """创建默认配置文件"""
     if not DEFAULT_CONFIG_FILE.exists():
@@ -131,7 +172,10 @@ def create_default_config():
         
     # 复制默认配置到用户配置
     try:
-        shutil.copy(DEFAULT_CONFIG_FILE, USER_CONFIG_FILE)
+        if _file_sha256(DEFAULT_CONFIG_FILE) == _file_sha256(USER_CONFIG_FILE):
+            print(f"用户配置文件已是最新: {USER_CONFIG_FILE}")
+            return True
+        _copy_file_atomic(DEFAULT_CONFIG_FILE, USER_CONFIG_FILE)
         print(f"已创建用户配置文件: {USER_CONFIG_FILE}")
         return True
     except Exception as e: